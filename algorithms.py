@@ -1,5 +1,9 @@
+from functools import lru_cache
+
 import numpy as np
 
+from pixelbuffer import PixelBuffer
+
 
 def dda(x0, y0, x1, y1):
     """
@@ -49,23 +53,141 @@ def transform(x0, y0, x1, y1, transformation_matrix):
         tuple: A tuple containing the trasnformed points (x0t, y0t, x1t, y1t).
 
     """
-    # Create homogeneous coordinates
-    points = np.array([[x0, y0, 1], [x1, y1, 1]])
-
-    # Apply translation matrix
-    transformedPoints = [np.matmul(transformation_matrix, point) for point in points]
-
-    # Extract translated coordinates
-    x0t, y0t, _ = transformedPoints[0]
-    x1t, y1t, _ = transformedPoints[1]
+    transformedPoints = transformPoints([[x0, y0], [x1, y1]], transformation_matrix)
 
     # Cast translated points to integers
-    x0t, y0t = int(x0t), int(y0t)
-    x1t, y1t = int(x1t), int(y1t)
+    (x0t, y0t), (x1t, y1t) = transformedPoints.astype(int).tolist()
 
     return x0t, y0t, x1t, y1t
 
 
+def transformPoints(points, transformation_matrix, out=None, dtype=None):
+    """
+    Applies homogeneous transformation matrices to arrays of points in a single matmul.
+
+    Cartesian (..., N, 2) points are treated as (x, y, 1) and only the x and y
+    rows of the matrix are applied, like `transform`. Homogeneous (..., N, 3)
+    points are multiplied by the full matrix. A stack of (..., 3, 3) matrices
+    broadcasts against a stack of point sets, transforming each set with its
+    own matrix.
+
+    Args:
+        points (array_like): An (..., N, 2) or (..., N, 3) array of points.
+        transformation_matrix (array_like): A (3, 3) or (..., 3, 3) transformation matrix.
+        out (numpy.ndarray, optional): An array of the result's shape to write into. It may be points itself.
+        dtype (numpy.dtype, optional): The dtype of the computation, e.g. numpy.float32.
+            Defaults to the dtype of out, or float64.
+
+    Returns:
+        numpy.ndarray: The transformed points, with the same shape as points.
+
+    """
+    if dtype is None:
+        dtype = out.dtype if out is not None else np.float64
+    points = np.asarray(points, dtype=dtype)
+    matrix = np.asarray(transformation_matrix, dtype=dtype)
+    if points.shape[-1] not in (2, 3):
+        raise ValueError("points must have 2 or 3 columns, got %d" % points.shape[-1])
+    if matrix.shape[-2:] != (3, 3):
+        raise ValueError("transformation_matrix must be 3x3, got %s" % (matrix.shape,))
+
+    if points.shape[-1] == 3:
+        return np.matmul(points, np.swapaxes(matrix, -1, -2), out=out)
+
+    linear = np.swapaxes(matrix[..., :2, :2], -1, -2)
+    translation = matrix[..., None, :2, 2]
+    result = np.matmul(points, linear, out=out)
+    result += translation
+    return result
+
+
+def translationMatrix(tx, ty):
+    """
+    Creates a 3x3 homogeneous translation matrix.
+
+    Args:
+        tx (float): The translation along the x-axis.
+        ty (float): The translation along the y-axis.
+
+    Returns:
+        numpy.ndarray: The 3x3 translation matrix.
+
+    """
+    return np.array([[1.0, 0.0, tx], [0.0, 1.0, ty], [0.0, 0.0, 1.0]])
+
+
+def scaleMatrix(sx, sy=None):
+    """
+    Creates a 3x3 homogeneous scaling matrix.
+
+    Args:
+        sx (float): The scale factor along the x-axis.
+        sy (float, optional): The scale factor along the y-axis. Defaults to sx.
+
+    Returns:
+        numpy.ndarray: The 3x3 scaling matrix.
+
+    """
+    sy = sx if sy is None else sy
+    return np.array([[sx, 0.0, 0.0], [0.0, sy, 0.0], [0.0, 0.0, 1.0]])
+
+
+def shearMatrix(shx, shy=0.0):
+    """
+    Creates a 3x3 homogeneous shearing matrix.
+
+    Args:
+        shx (float): The shear factor of x along y.
+        shy (float, optional): The shear factor of y along x. Defaults to 0.
+
+    Returns:
+        numpy.ndarray: The 3x3 shearing matrix.
+
+    """
+    return np.array([[1.0, shx, 0.0], [shy, 1.0, 0.0], [0.0, 0.0, 1.0]])
+
+
+@lru_cache(maxsize=360)
+def rotationMatrix(angle):
+    """
+    Creates a 3x3 homogeneous rotation matrix, computing each angle only once.
+
+    The returned matrix is cached and read-only, copy it before modifying it.
+
+    Args:
+        angle (float): The angle of rotation in degrees.
+
+    Returns:
+        numpy.ndarray: The 3x3 rotation matrix.
+
+    """
+    radians = np.radians(angle)
+    cos, sin = np.cos(radians), np.sin(radians)
+    matrix = np.array([[cos, -sin, 0.0], [sin, cos, 0.0], [0.0, 0.0, 1.0]])
+    matrix.setflags(write=False)
+    return matrix
+
+
+def composeMatrices(*matrices):
+    """
+    Composes 3x3 transformation matrices into a single matrix.
+
+    The matrices are applied in the order given, so composeMatrices(A, B)
+    transforms points by A first and then by B.
+
+    Args:
+        *matrices (array_like): The 3x3 transformation matrices.
+
+    Returns:
+        numpy.ndarray: The composed 3x3 matrix.
+
+    """
+    composed = np.eye(3)
+    for matrix in matrices:
+        composed = np.asarray(matrix, dtype=np.float64) @ composed
+    return composed
+
+
 def rotateWithAngle(x0, y0, x1, y1, angle):
     """
     Rotates the points (x0, y0) and (x1, y1) by a given angle.
@@ -81,19 +203,7 @@ def rotateWithAngle(x0, y0, x1, y1, angle):
         tuple: A tuple containing the rotated points (x0r, y0r, x1r, y1r).
 
     """
-    # Convert angle to radians
-    angle = np.radians(angle)
-
-    # Create rotation matrix
-    transformation_matrix = np.array(
-        [
-            [np.cos(angle), -np.sin(angle), 0],
-            [np.sin(angle), np.cos(angle), 0],
-            [0, 0, 1],
-        ]
-    )
-
-    return transform(x0, y0, x1, y1, transformation_matrix)
+    return transform(x0, y0, x1, y1, rotationMatrix(float(angle)))
 
 
 def offsetToOrigin(x0, y0, x1, y1):
@@ -224,6 +334,37 @@ def bresenhamCircle(x_center, y_center, r):
 
 # Viewport / Line Clipping
 
+# Cohen-Sutherland outcode bits
+INSIDE, LEFT, RIGHT, BOTTOM, TOP = 0, 1, 2, 4, 8
+
+
+def computeOutCode(x, y, x_min, y_min, x_max, y_max):
+    """
+    Computes the Cohen-Sutherland outcode of a point relative to a viewport.
+
+    Args:
+        x (int): The x-coordinate of the point.
+        y (int): The y-coordinate of the point.
+        x_min (int): The minimum x-coordinate of the viewport.
+        y_min (int): The minimum y-coordinate of the viewport.
+        x_max (int): The maximum x-coordinate of the viewport.
+        y_max (int): The maximum y-coordinate of the viewport.
+
+    Returns:
+        int: A combination of the LEFT, RIGHT, BOTTOM and TOP bits, or INSIDE.
+
+    """
+    code = INSIDE
+    if x < x_min:
+        code |= LEFT
+    elif x > x_max:
+        code |= RIGHT
+    if y < y_min:
+        code |= BOTTOM
+    elif y > y_max:
+        code |= TOP
+    return code
+
 
 def cohenSutherlandClip(x0, y0, x1, y1, x_min, y_min, x_max, y_max):
     """
@@ -244,19 +385,10 @@ def cohenSutherlandClip(x0, y0, x1, y1, x_min, y_min, x_max, y_max):
         tuple: A tuple containing the clipped points (x0, y0, x1, y1).
 
     """
-    INSIDE, LEFT, RIGHT, BOTTOM, TOP = 0, 1, 2, 4, 8
+    viewport = x_min, y_min, x_max, y_max
 
     def computeCode(x, y):
-        code = INSIDE
-        if x < x_min:
-            code |= LEFT
-        elif x > x_max:
-            code |= RIGHT
-        if y < y_min:
-            code |= BOTTOM
-        elif y > y_max:
-            code |= TOP
-        return code
+        return computeOutCode(x, y, *viewport)
 
     code0, code1 = computeCode(x0, y0), computeCode(x1, y1)
     while True:
@@ -317,3 +449,1866 @@ def liangBarskyClip(x0, y0, x1, y1, xmin, ymin, xmax, ymax):
     y1_clip = y0 + u2 * dy
 
     return x0_clip, y0_clip, x1_clip, y1_clip
+
+
+# Batch Line Rasterization
+
+
+def _asSegments(segments, dtype):
+    """
+    Validates and converts an array of segments to an (N, 4) array.
+
+    Args:
+        segments (array_like): The segments as rows of (x0, y0, x1, y1).
+        dtype (numpy.dtype): The dtype of the returned array.
+
+    Returns:
+        numpy.ndarray: An (N, 4) array of segments.
+
+    """
+    segments = np.asarray(segments, dtype=dtype)
+    if segments.ndim != 2 or segments.shape[1] != 4:
+        raise ValueError(
+            "segments must be an (N, 4) array, got shape %s" % (segments.shape,)
+        )
+    return segments
+
+
+def _segmentOffsets(counts):
+    """
+    Computes the offsets of each segment's pixels in a concatenated pixel array.
+
+    Args:
+        counts (numpy.ndarray): The number of pixels of each segment.
+
+    Returns:
+        numpy.ndarray: An (N + 1,) array where the pixels of segment i are
+        pixels[offsets[i]:offsets[i + 1]].
+
+    """
+    offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    return offsets
+
+
+def bresenhamBatch(segments):
+    """
+    Rasterizes many lines at once with Bresenham's line algorithm.
+
+    The error term of `bresenham` stays within [0, major), so the minor
+    coordinate of the k-th pixel is ceil((2 * k * minor - major) / (2 * major)).
+    This closed form is evaluated for every pixel of every segment in a single
+    pass, giving exactly the pixels of `bresenham`.
+
+    Args:
+        segments (array_like): An (N, 4) array of integer segments (x0, y0, x1, y1).
+
+    Returns:
+        tuple: A tuple (pixels, offsets) where pixels is a contiguous (M, 2) int32
+        array of points and offsets is an (N + 1,) array such that the pixels of
+        segment i are pixels[offsets[i]:offsets[i + 1]].
+
+    """
+    segments = _asSegments(segments, np.int64)
+    x0, y0, x1, y1 = segments.T
+    counts = np.maximum(np.abs(x1 - x0), np.abs(y1 - y0)) + 1
+    return bresenhamRangeBatch(segments, np.zeros(len(segments), np.int64), counts)
+
+
+def bresenhamRangeBatch(segments, first, counts):
+    """
+    Rasterizes a run of pixels of many lines at once with Bresenham's line algorithm.
+
+    The pixels are evaluated with the closed form of `bresenhamBatch`, so a
+    run costs its own length whatever the length of its line.
+
+    Args:
+        segments (array_like): An (N, 4) array of integer segments (x0, y0, x1, y1).
+        first (array_like): The (N,) index of the first pixel of every run, pixel 0
+            being (x0, y0).
+        counts (array_like): The (N,) number of pixels of every run.
+
+    Returns:
+        tuple: A tuple (pixels, offsets) where pixels is a contiguous (M, 2) int32
+        array of points and offsets is an (N + 1,) array such that the pixels of
+        run i are pixels[offsets[i]:offsets[i + 1]], pixels first[i] to
+        first[i] + counts[i] - 1 of `bresenham` for segment i.
+
+    """
+    segments = _asSegments(segments, np.int64)
+    first = np.asarray(first, dtype=np.int64)
+    counts = np.asarray(counts, dtype=np.int64)
+    x0, y0, x1, y1 = segments.T
+
+    dx = np.abs(x1 - x0)
+    dy = np.abs(y1 - y0)
+    sx = np.where(x0 > x1, -1, 1)
+    sy = np.where(y0 > y1, -1, 1)
+
+    # bresenham steps along x only when dx > dy, ties step along y
+    x_major = dx > dy
+    major = np.where(x_major, dx, dy)
+    minor = np.where(x_major, dy, dx)
+
+    offsets = _segmentOffsets(counts)
+
+    # Index of every pixel within its own segment
+    seg = np.repeat(np.arange(len(segments)), counts)
+    k = np.arange(offsets[-1], dtype=np.int64) - offsets[seg] + first[seg]
+
+    # ceil(a / b) == -(-a // b), guarding the b == 0 single point case
+    major_s = major[seg]
+    n = -((major_s - 2 * k * minor[seg]) // np.maximum(2 * major_s, 1))
+
+    x_major_s = x_major[seg]
+    pixels = np.empty((len(k), 2), dtype=np.int32)
+    pixels[:, 0] = x0[seg] + sx[seg] * np.where(x_major_s, k, n)
+    pixels[:, 1] = y0[seg] + sy[seg] * np.where(x_major_s, n, k)
+    return pixels, offsets
+
+
+def ddaBatch(segments):
+    """
+    Rasterizes many lines at once with the DDA algorithm.
+
+    The increments of every segment are accumulated with a cumulative sum in
+    the same order as `dda`, so the rounded pixels are identical. Segments are
+    grouped by power-of-two step counts so the padded work stays within twice
+    the number of pixels. A zero-length segment yields its single point instead
+    of raising like `dda`.
+
+    Args:
+        segments (array_like): An (N, 4) array of segments (x0, y0, x1, y1).
+
+    Returns:
+        tuple: A tuple (pixels, offsets) where pixels is a contiguous (M, 2) int32
+        array of points and offsets is an (N + 1,) array such that the pixels of
+        segment i are pixels[offsets[i]:offsets[i + 1]].
+
+    """
+    segments = _asSegments(segments, np.float64)
+    x0, y0, x1, y1 = segments.T
+
+    dx = x1 - x0
+    dy = y1 - y0
+    steps = np.maximum(np.abs(dx), np.abs(dy)).astype(np.int64)
+    safe_steps = np.maximum(steps, 1)
+    x_increment = dx / safe_steps
+    y_increment = dy / safe_steps
+
+    counts = steps + 1
+    offsets = _segmentOffsets(counts)
+    pixels = np.empty((offsets[-1], 2), dtype=np.int32)
+
+    _, buckets = np.frexp(counts)
+    for bucket in np.unique(buckets):
+        (idx,) = np.nonzero(buckets == bucket)
+        width = counts[idx].max()
+        valid = np.arange(width) < counts[idx, None]
+        rows, cols = np.nonzero(valid)
+        dest = offsets[idx][rows] + cols
+
+        for axis, start, increment in ((0, x0, x_increment), (1, y0, y_increment)):
+            acc = np.empty((len(idx), width), dtype=np.float64)
+            acc[:] = increment[idx, None]
+            acc[:, 0] = start[idx]
+            np.cumsum(acc, axis=1, out=acc)
+            pixels[dest, axis] = np.rint(acc[valid])
+    return pixels, offsets
+
+
+# Batch Viewport / Line Clipping
+
+
+def computeOutCodes(x, y, x_min, y_min, x_max, y_max):
+    """
+    Computes the Cohen-Sutherland outcodes of arrays of points.
+
+    Args:
+        x (numpy.ndarray): The x-coordinates of the points.
+        y (numpy.ndarray): The y-coordinates of the points.
+        x_min (int): The minimum x-coordinate of the viewport.
+        y_min (int): The minimum y-coordinate of the viewport.
+        x_max (int): The maximum x-coordinate of the viewport.
+        y_max (int): The maximum y-coordinate of the viewport.
+
+    Returns:
+        numpy.ndarray: The uint8 outcodes of the points, as in `computeOutCode`.
+
+    """
+    left = x < x_min
+    bottom = y < y_min
+    code = left.astype(np.uint8)
+    code |= (~left & (x > x_max)).astype(np.uint8) << 1
+    code |= bottom.astype(np.uint8) << 2
+    code |= (~bottom & (y > y_max)).astype(np.uint8) << 3
+    return code
+
+
+def cohenSutherlandClipBatch(segments, x_min, y_min, x_max, y_max):
+    """
+    Clips many lines at once with the Cohen-Sutherland algorithm.
+
+    Every iteration moves one endpoint of every unresolved segment to a
+    viewport edge, with the same edge priority and integer truncation as
+    `cohenSutherlandClip`, so the results are identical.
+
+    Args:
+        segments (array_like): An (N, 4) array of segments (x0, y0, x1, y1).
+        x_min (int): The minimum x-coordinate of the viewport.
+        y_min (int): The minimum y-coordinate of the viewport.
+        x_max (int): The maximum x-coordinate of the viewport.
+        y_max (int): The maximum y-coordinate of the viewport.
+
+    Returns:
+        tuple: A tuple (clipped, accept) where clipped is an (N, 4) float64 array of
+        clipped segments and accept is an (N,) boolean mask of the segments that
+        intersect the viewport. Rows of rejected segments are NaN.
+
+    """
+    clipped = _asSegments(segments, np.float64).copy()
+    viewport = x_min, y_min, x_max, y_max
+    code0 = computeOutCodes(clipped[:, 0], clipped[:, 1], *viewport)
+    code1 = computeOutCodes(clipped[:, 2], clipped[:, 3], *viewport)
+
+    accept = np.zeros(len(clipped), dtype=bool)
+    active = np.ones(len(clipped), dtype=bool)
+    while True:
+        inside = active & (code0 == 0) & (code1 == 0)
+        accept |= inside
+        active &= ~inside & ((code0 & code1) == 0)
+        (idx,) = np.nonzero(active)
+        if not len(idx):
+            break
+
+        c0, c1 = code0[idx], code1[idx]
+        code_out = np.where(c1 > c0, c1, c0)
+        x0, y0, x1, y1 = clipped[idx].T
+
+        top = (code_out & TOP) != 0
+        bottom = ~top & ((code_out & BOTTOM) != 0)
+        right = ~top & ~bottom & ((code_out & RIGHT) != 0)
+        vertical = top | bottom
+        y_edge = np.where(top, y_max, y_min)
+        x_edge = np.where(right, x_max, x_min)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x = np.where(vertical, x0 + (x1 - x0) * (y_edge - y0) / (y1 - y0), x_edge)
+            y = np.where(vertical, y_edge, y0 + (y1 - y0) * (x_edge - x0) / (x1 - x0))
+        x, y = np.trunc(x), np.trunc(y)
+        codes = computeOutCodes(x, y, *viewport)
+
+        first = code_out == c0
+        clipped[idx[first], 0] = x[first]
+        clipped[idx[first], 1] = y[first]
+        code0[idx[first]] = codes[first]
+        clipped[idx[~first], 2] = x[~first]
+        clipped[idx[~first], 3] = y[~first]
+        code1[idx[~first]] = codes[~first]
+
+    clipped[~accept] = np.nan
+    return clipped, accept
+
+
+def liangBarskyClipBatch(segments, xmin, ymin, xmax, ymax):
+    """
+    Clips many lines at once with the Liang-Barsky algorithm.
+
+    The parameters u1 and u2 of every segment are masked max and min
+    reductions over its four boundary ratios, giving the same results as
+    `liangBarskyClip`.
+
+    Args:
+        segments (array_like): An (N, 4) array of segments (x0, y0, x1, y1).
+        xmin (int): The minimum x-coordinate of the viewport.
+        ymin (int): The minimum y-coordinate of the viewport.
+        xmax (int): The maximum x-coordinate of the viewport.
+        ymax (int): The maximum y-coordinate of the viewport.
+
+    Returns:
+        tuple: A tuple (clipped, accept) where clipped is an (N, 4) float64 array of
+        clipped segments and accept is an (N,) boolean mask of the segments that
+        intersect the viewport. Rows of rejected segments are NaN.
+
+    """
+    segments = _asSegments(segments, np.float64)
+    x0, y0, x1, y1 = segments.T
+    dx = x1 - x0
+    dy = y1 - y0
+
+    p = np.stack([-dx, dx, -dy, dy], axis=1)
+    q = np.stack([x0 - xmin, xmax - x0, y0 - ymin, ymax - y0], axis=1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = q / p
+    u1 = np.max(np.where(p < 0, t, 0.0), axis=1, initial=0.0)
+    u2 = np.min(np.where(p > 0, t, 1.0), axis=1, initial=1.0)
+    accept = ~np.any((p == 0) & (q < 0), axis=1) & (u1 <= u2)
+
+    clipped = np.stack([x0 + u1 * dx, y0 + u1 * dy, x0 + u2 * dx, y0 + u2 * dy], axis=1)
+    clipped[~accept] = np.nan
+    return clipped, accept
+
+
+# Filled Circles and Ellipses
+
+
+def _isqrt(n):
+    """
+    Computes the integer square root of every element of an int64 array.
+
+    Args:
+        n (numpy.ndarray): An array of non-negative integers below 2**52.
+
+    Returns:
+        numpy.ndarray: The largest integers s such that s * s <= n.
+
+    """
+    s = np.floor(np.sqrt(n.astype(np.float64))).astype(np.int64)
+    s -= s * s > n
+    s += (s + 1) * (s + 1) <= n
+    return s
+
+
+def _circleOctantY(x, r):
+    """
+    Computes the y-coordinates chosen by `bresenhamCircle` in its first octant.
+
+    The decision parameter of `bresenhamCircle` keeps, for every x, the
+    largest y with y * (y - 1) <= r * r - x * x - 1.
+
+    Args:
+        x (numpy.ndarray): The int64 x-coordinates, relative to the center.
+        r (numpy.ndarray): The int64 radii.
+
+    Returns:
+        numpy.ndarray: The y-coordinates, relative to the center. Only those
+        with x <= y belong to the octant.
+
+    """
+    k = r * r - x * x - 1
+    return np.where(x == 0, r, (_isqrt(np.maximum(4 * k + 1, 0)) + 1) // 2)
+
+
+def _asRows(rows, columns, name, dtype=np.int64):
+    """
+    Validates and converts an array of primitive parameters to an (N, columns) array.
+
+    Args:
+        rows (array_like): The parameters of the primitives, one per row.
+        columns (int): The number of parameters of each primitive.
+        name (str): The name of the argument, for error messages.
+        dtype (numpy.dtype, optional): The dtype of the returned array. Defaults to int64.
+
+    Returns:
+        numpy.ndarray: An (N, columns) array.
+
+    """
+    rows = np.asarray(rows, dtype=dtype)
+    if rows.ndim != 2 or rows.shape[1] != columns:
+        raise ValueError(
+            "%s must be an (N, %d) array, got shape %s" % (name, columns, rows.shape)
+        )
+    return rows
+
+
+def filledCircleSpansBatch(circles):
+    """
+    Rasterizes many filled circles at once as horizontal spans.
+
+    The first octant of `bresenhamCircle` is evaluated in closed form and
+    each row of a disk spans the outermost outline pixels of
+    `bresenhamCircle` on that row.
+
+    Args:
+        circles (array_like): An (N, 3) array of integer circles (x_center, y_center, r).
+
+    Returns:
+        tuple: A tuple (spans, offsets) where spans is a (K, 3) int32 array of
+        inclusive spans (y, x_start, x_end) ordered by y and offsets is an
+        (N + 1,) array such that the spans of circle i are spans[offsets[i]:offsets[i + 1]].
+        Circles with a negative radius have no spans.
+
+    """
+    circles = _asRows(circles, 3, "circles")
+    x_center, y_center, r = circles.T
+    r_valid = np.maximum(r, -1)
+
+    # First octant points (x, y) of every circle, with x <= y
+    counts = np.where(r_valid >= 0, _isqrt(r_valid * r_valid // 2) + 2, 0)
+    octant_offsets = _segmentOffsets(counts)
+    owner = np.repeat(np.arange(len(circles)), counts)
+    x = np.arange(octant_offsets[-1], dtype=np.int64) - octant_offsets[owner]
+    r_owner = r_valid[owner]
+    y = _circleOctantY(x, r_owner)
+    keep = x <= y
+    owner, x, y, r_owner = owner[keep], x[keep], y[keep], r_owner[keep]
+
+    # Half width of every row dy in [-r, r], from the points and their reflections
+    rows = 2 * r_valid + 1
+    span_offsets = _segmentOffsets(np.maximum(rows, 0))
+    half_width = np.full(span_offsets[-1], -1, dtype=np.int64)
+    base = span_offsets[owner] + r_owner
+    for row, width in ((y, x), (x, y)):
+        np.maximum.at(half_width, base + row, width)
+        np.maximum.at(half_width, base - row, width)
+
+    owner = np.repeat(np.arange(len(circles)), np.maximum(rows, 0))
+    dy = np.arange(span_offsets[-1], dtype=np.int64) - span_offsets[owner] - r[owner]
+    spans = np.empty((len(dy), 3), dtype=np.int32)
+    spans[:, 0] = y_center[owner] + dy
+    spans[:, 1] = x_center[owner] - half_width
+    spans[:, 2] = x_center[owner] + half_width
+    return spans, span_offsets
+
+
+def filledCircleSpans(x_center, y_center, r):
+    """
+    Rasterizes a filled circle as horizontal spans.
+
+    Args:
+        x_center (int): The x-coordinate of the center of the circle.
+        y_center (int): The y-coordinate of the center of the circle.
+        r (int): The radius of the circle.
+
+    Returns:
+        numpy.ndarray: A (2r + 1, 3) int32 array of inclusive spans (y, x_start, x_end).
+
+    """
+    return filledCircleSpansBatch([[x_center, y_center, r]])[0]
+
+
+def filledEllipseSpansBatch(ellipses):
+    """
+    Rasterizes many filled axis-aligned ellipses at once as horizontal spans.
+
+    A pixel (x, y) relative to the center is inside when
+    x * x * b * b + y * y * a * a <= a * a * b * b, evaluated in integers.
+
+    Args:
+        ellipses (array_like): An (N, 4) array of integer ellipses (x_center, y_center, a, b),
+            where a and b are the semi-axes along x and y.
+
+    Returns:
+        tuple: A tuple (spans, offsets) where spans is a (K, 3) int32 array of
+        inclusive spans (y, x_start, x_end) ordered by y and offsets is an
+        (N + 1,) array such that the spans of ellipse i are spans[offsets[i]:offsets[i + 1]].
+        Ellipses with a negative semi-axis have no spans.
+
+    """
+    ellipses = _asRows(ellipses, 4, "ellipses")
+    x_center, y_center, a, b = ellipses.T
+    valid = (a >= 0) & (b >= 0)
+
+    rows = np.where(valid, 2 * b + 1, 0)
+    offsets = _segmentOffsets(rows)
+    owner = np.repeat(np.arange(len(ellipses)), rows)
+    a_owner, b_owner = a[owner], b[owner]
+    dy = np.arange(offsets[-1], dtype=np.int64) - offsets[owner] - b_owner
+
+    # largest x with x * x * b * b <= a * a * (b * b - dy * dy)
+    bb = np.maximum(b_owner * b_owner, 1)
+    half_width = _isqrt(a_owner * a_owner * (b_owner * b_owner - dy * dy) // bb)
+    half_width = np.where(b_owner == 0, a_owner, half_width)
+
+    spans = np.empty((len(dy), 3), dtype=np.int32)
+    spans[:, 0] = y_center[owner] + dy
+    spans[:, 1] = x_center[owner] - half_width
+    spans[:, 2] = x_center[owner] + half_width
+    return spans, offsets
+
+
+def filledEllipseSpans(x_center, y_center, a, b):
+    """
+    Rasterizes a filled axis-aligned ellipse as horizontal spans.
+
+    Args:
+        x_center (int): The x-coordinate of the center of the ellipse.
+        y_center (int): The y-coordinate of the center of the ellipse.
+        a (int): The semi-axis along x.
+        b (int): The semi-axis along y.
+
+    Returns:
+        numpy.ndarray: A (2b + 1, 3) int32 array of inclusive spans (y, x_start, x_end).
+
+    """
+    return filledEllipseSpansBatch([[x_center, y_center, a, b]])[0]
+
+
+# Streaming Rasterization
+
+
+def ddaIter(x0, y0, x1, y1):
+    """
+    Lazily generates the points of a line with the DDA algorithm.
+
+    Yields the same points as `dda` without building a list.
+
+    Args:
+        x0 (float): The x-coordinate of the starting point.
+        y0 (float): The y-coordinate of the starting point.
+        x1 (float): The x-coordinate of the ending point.
+        y1 (float): The y-coordinate of the ending point.
+
+    Yields:
+        tuple: The points (x, y) of the line.
+
+    """
+    dx = x1 - x0
+    dy = y1 - y0
+
+    steps = abs(dx) if abs(dx) > abs(dy) else abs(dy)
+
+    x_increment = dx / float(steps)
+    y_increment = dy / float(steps)
+    x, y = x0, y0
+
+    yield round(x), round(y)
+    for _ in range(steps):
+        x += x_increment
+        y += y_increment
+        yield round(x), round(y)
+
+
+def bresenhamIter(x0, y0, x1, y1):
+    """
+    Lazily generates the points of a line with Bresenham's line algorithm.
+
+    Yields the same points as `bresenham` without building a list.
+
+    Args:
+        x0 (int): The x-coordinate of the starting point.
+        y0 (int): The y-coordinate of the starting point.
+        x1 (int): The x-coordinate of the ending point.
+        y1 (int): The y-coordinate of the ending point.
+
+    Yields:
+        tuple: The points (x, y) of the line.
+
+    """
+    dx = abs(x1 - x0)
+    dy = abs(y1 - y0)
+    x, y = x0, y0
+    sx = -1 if x0 > x1 else 1
+    sy = -1 if y0 > y1 else 1
+
+    if dx > dy:
+        err = dx / 2.0
+        while x != x1:
+            yield x, y
+            err -= dy
+            if err < 0:
+                y += sy
+                err += dx
+            x += sx
+    else:
+        err = dy / 2.0
+        while y != y1:
+            yield x, y
+            err -= dx
+            if err < 0:
+                x += sx
+                err += dy
+            y += sy
+
+    yield x, y
+
+
+def bresenhamCircleIter(x_center, y_center, r):
+    """
+    Lazily generates the points of a circle with Bresenham's circle algorithm.
+
+    Yields the same points, in the same order, as `bresenhamCircle` without
+    building a list.
+
+    Args:
+        x_center (int): The x-coordinate of the center of the circle.
+        y_center (int): The y-coordinate of the center of the circle.
+        r (int): The radius of the circle.
+
+    Yields:
+        tuple: The points (x, y) of the circle.
+
+    """
+    x, y = 0, r
+
+    # Initial value of decision parameter
+    d = 3 - 2 * r
+
+    while x <= y:
+        yield x_center + x, y_center + y
+        yield x_center + x, y_center - y
+        yield x_center - x, y_center + y
+        yield x_center - x, y_center - y
+        yield x_center + y, y_center + x
+        yield x_center + y, y_center - x
+        yield x_center - y, y_center + x
+        yield x_center - y, y_center - x
+
+        # update the value of decision parameter
+        if d < 0:
+            d += 4 * x + 6
+        else:
+            d += 4 * (x - y) + 10
+            y -= 1
+        x += 1
+
+
+def bresenhamChunks(x0, y0, x1, y1, chunk_size=4096):
+    """
+    Generates the points of a line with Bresenham's line algorithm in fixed-size blocks.
+
+    Every block is computed with the closed form of `bresenhamBatch`, so
+    memory stays bounded by the chunk size whatever the length of the line.
+
+    Args:
+        x0 (int): The x-coordinate of the starting point.
+        y0 (int): The y-coordinate of the starting point.
+        x1 (int): The x-coordinate of the ending point.
+        y1 (int): The y-coordinate of the ending point.
+        chunk_size (int, optional): The maximum number of points per block. Defaults to 4096.
+
+    Yields:
+        numpy.ndarray: Consecutive (M, 2) int32 blocks of the points of `bresenham`.
+
+    """
+    dx = abs(x1 - x0)
+    dy = abs(y1 - y0)
+    sx = -1 if x0 > x1 else 1
+    sy = -1 if y0 > y1 else 1
+    x_major = dx > dy
+    major, minor = (dx, dy) if x_major else (dy, dx)
+
+    for start in range(0, major + 1, chunk_size):
+        k = np.arange(start, min(start + chunk_size, major + 1), dtype=np.int64)
+        n = -((major - 2 * k * minor) // max(2 * major, 1))
+        block = np.empty((len(k), 2), dtype=np.int32)
+        block[:, 0] = x0 + sx * (k if x_major else n)
+        block[:, 1] = y0 + sy * (n if x_major else k)
+        yield block
+
+
+def ddaChunks(x0, y0, x1, y1, chunk_size=4096):
+    """
+    Generates the points of a line with the DDA algorithm in fixed-size blocks.
+
+    Each block continues the cumulative sum of the previous one, so the
+    points are identical to those of `dda`. A zero-length line yields its
+    single point instead of raising like `dda`.
+
+    Args:
+        x0 (float): The x-coordinate of the starting point.
+        y0 (float): The y-coordinate of the starting point.
+        x1 (float): The x-coordinate of the ending point.
+        y1 (float): The y-coordinate of the ending point.
+        chunk_size (int, optional): The maximum number of points per block. Defaults to 4096.
+
+    Yields:
+        numpy.ndarray: Consecutive (M, 2) int32 blocks of the points of `dda`.
+
+    """
+    dx = x1 - x0
+    dy = y1 - y0
+    steps = int(max(abs(dx), abs(dy)))
+    increment = np.array([dx, dy], dtype=np.float64) / max(steps, 1)
+
+    position = np.array([x0, y0], dtype=np.float64)
+    acc = np.empty((min(chunk_size, steps + 1), 2), dtype=np.float64)
+    for start in range(0, steps + 1, chunk_size):
+        block = acc[: min(chunk_size, steps + 1 - start)]
+        block[:] = increment
+        block[0] = position if start == 0 else position + increment
+        np.cumsum(block, axis=0, out=block)
+        position = block[-1].copy()
+        yield np.rint(block).astype(np.int32)
+
+
+def bresenhamCircleChunks(x_center, y_center, r, chunk_size=4096):
+    """
+    Generates the points of a circle with Bresenham's circle algorithm in fixed-size blocks.
+
+    The first octant is evaluated in closed form one block of steps at a
+    time and reflected in the same order as `bresenhamCircle`.
+
+    Args:
+        x_center (int): The x-coordinate of the center of the circle.
+        y_center (int): The y-coordinate of the center of the circle.
+        r (int): The radius of the circle.
+        chunk_size (int, optional): The maximum number of points per block,
+            rounded down to a multiple of 8 (at least 8). Defaults to 4096.
+
+    Yields:
+        numpy.ndarray: Consecutive (M, 2) int32 blocks of the points of `bresenhamCircle`.
+
+    """
+    if r < 0:
+        return
+    steps_per_chunk = max(chunk_size // 8, 1)
+    signs = np.array([[1, 1], [1, -1], [-1, 1], [-1, -1]], dtype=np.int64)
+
+    start = 0
+    while True:
+        x = np.arange(start, start + steps_per_chunk, dtype=np.int64)
+        y = _circleOctantY(x, np.int64(r))
+        inside = x <= y
+        x, y = x[inside], y[inside]
+        if not len(x):
+            return
+
+        block = np.empty((len(x), 8, 2), dtype=np.int64)
+        block[:, :4, 0] = x[:, None] * signs[:, 0]
+        block[:, :4, 1] = y[:, None] * signs[:, 1]
+        block[:, 4:, 0] = y[:, None] * signs[:, 0]
+        block[:, 4:, 1] = x[:, None] * signs[:, 1]
+        block += [x_center, y_center]
+        yield block.reshape(-1, 2).astype(np.int32)
+
+        if not inside.all():
+            return
+        start += steps_per_chunk
+
+
+# Polygon Rasterization
+
+
+def _asVertices(vertices):
+    """
+    Validates and converts an array of vertices to an (N, 2) float64 array.
+
+    Args:
+        vertices (array_like): The vertices as rows of (x, y).
+
+    Returns:
+        numpy.ndarray: An (N, 2) array of vertices.
+
+    """
+    vertices = np.asarray(vertices, dtype=np.float64)
+    if vertices.ndim != 2 or vertices.shape[1] != 2:
+        raise ValueError(
+            "vertices must be an (N, 2) array, got shape %s" % (vertices.shape,)
+        )
+    return vertices
+
+
+def polygonEdges(vertices, closed=True):
+    """
+    Builds the edges joining consecutive vertices of a polygon.
+
+    Args:
+        vertices (array_like): An (N, 2) array of vertices.
+        closed (bool, optional): Whether the last vertex is joined to the first. Defaults to True.
+
+    Returns:
+        numpy.ndarray: An (E, 4) array of edges (x0, y0, x1, y1).
+
+    """
+    vertices = _asVertices(vertices)
+    ends = np.roll(vertices, -1, axis=0) if closed else vertices[1:]
+    starts = vertices if closed else vertices[:-1]
+    return np.hstack([starts, ends])
+
+
+def _edgeSpans(edges, owner, count, rule, rows=None):
+    """
+    Rasterizes the regions bounded by the edges of many shapes as horizontal spans.
+
+    Args:
+        edges (numpy.ndarray): An (E, 4) float64 array of edges (x0, y0, x1, y1).
+        owner (numpy.ndarray): The (E,) index of the shape of every edge.
+        count (int): The number of shapes.
+        rule (str): The fill rule, "evenodd" or "nonzero".
+        rows (tuple, optional): The half-open range (y_min, y_max) of the scanlines to rasterize. Defaults to all of them.
+
+    Returns:
+        tuple: A tuple (spans, offsets) where spans is a (K, 3) int32 array of
+        inclusive spans (y, x_start, x_end) ordered by shape, y and x, and
+        offsets is a (count + 1,) array such that the spans of shape i are
+        spans[offsets[i]:offsets[i + 1]].
+
+    """
+    if rule not in ("evenodd", "nonzero"):
+        raise ValueError("Unknown fill rule: %r" % rule)
+    x0, y0, x1, y1 = edges.T
+
+    # Edge table: every edge oriented downwards, with its winding direction
+    direction = np.where(y1 > y0, 1, -1)
+    top_x = np.where(y1 > y0, x0, x1)
+    top_y = np.minimum(y0, y1)
+    bottom_y = np.maximum(y0, y1)
+    first = np.ceil(top_y).astype(np.int64)
+    last = np.ceil(bottom_y).astype(np.int64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = np.where(last > first, (x1 - x0) / (y1 - y0), 0.0)
+    if rows is not None:
+        first, last = np.maximum(first, rows[0]), np.minimum(last, rows[1])
+    counts = np.maximum(last - first, 0)
+
+    # One crossing per active edge and scanline
+    offsets = _segmentOffsets(counts)
+    edge = np.repeat(np.arange(len(counts)), counts)
+    y = first[edge] + np.arange(offsets[-1], dtype=np.int64) - offsets[edge]
+    x = top_x[edge] + (y - top_y[edge]) * slope[edge]
+    shape = owner[edge]
+    order = np.lexsort((x, y, shape))
+    y, x, direction, shape = (
+        y[order],
+        np.ceil(x[order]).astype(np.int64),
+        direction[edge][order],
+        shape[order],
+    )
+
+    if rule == "evenodd":
+        y, x_start, x_end, shape = y[0::2], x[0::2], x[1::2] - 1, shape[0::2]
+    else:
+        # Running winding number after each crossing, restarted on every scanline
+        winding = np.cumsum(direction)
+        same_row = (y[1:] == y[:-1]) & (shape[1:] == shape[:-1])
+        row_start = np.r_[True, ~same_row]
+        row = np.maximum.accumulate(np.where(row_start, np.arange(len(y)), 0))
+        winding -= (winding - direction)[row]
+        inside = (winding[:-1] != 0) & same_row
+        # Merge consecutive inside intervals of a scanline into one span
+        opens = inside & ~np.r_[False, inside[:-1]]
+        closes = inside & ~np.r_[inside[1:], False]
+        y, x_start, x_end = y[:-1][opens], x[:-1][opens], x[1:][closes] - 1
+        shape = shape[:-1][opens]
+
+    visible = x_start <= x_end
+    spans = np.empty((np.count_nonzero(visible), 3), dtype=np.int32)
+    spans[:, 0] = y[visible]
+    spans[:, 1] = x_start[visible]
+    spans[:, 2] = x_end[visible]
+    return spans, _segmentOffsets(np.bincount(shape[visible], minlength=count))
+
+
+def polygonSpans(vertices, rule="evenodd", rows=None):
+    """
+    Rasterizes a filled polygon as horizontal spans with an active edge table.
+
+    Pixel (x, y) is filled when the point (x, y) is inside the polygon. Every
+    non-horizontal edge is active on the scanlines ceil(y_min) to
+    ceil(y_max) - 1, where it crosses the scanline once. The active edge table
+    of every scanline is built at once by expanding each edge over its
+    scanlines, and the crossings are sorted by scanline and x. Even-odd
+    filling pairs consecutive crossings, nonzero filling keeps the intervals
+    where the running sum of edge directions is not zero. The cost is
+    O(edges + crossings) plus the sort, with no per-scanline Python work.
+
+    Args:
+        vertices (array_like): An (N, 2) array of polygon vertices. The polygon is implicitly closed.
+        rule (str, optional): The fill rule, "evenodd" or "nonzero". Defaults to "evenodd".
+        rows (tuple, optional): The half-open range (y_min, y_max) of the scanlines to
+            rasterize, for drawing a band of a large polygon. Defaults to all of them.
+
+    Returns:
+        numpy.ndarray: A (K, 3) int32 array of inclusive spans (y, x_start, x_end) ordered by y and x.
+
+    """
+    if rule not in ("evenodd", "nonzero"):
+        raise ValueError("Unknown fill rule: %r" % rule)
+    edges = polygonEdges(vertices)
+    owner = np.zeros(len(edges), dtype=np.int64)
+    return _edgeSpans(edges, owner, 1, rule, rows)[0]
+
+
+def polygonOutline(vertices, closed=True):
+    """
+    Rasterizes the outline of a polygon with Bresenham's line algorithm.
+
+    The outline is rasterized by `polyline`, so the pixels of the vertices
+    are only produced once.
+
+    Args:
+        vertices (array_like): An (N, 2) array of vertices.
+        closed (bool, optional): Whether the last vertex is joined to the first. Defaults to True.
+
+    Returns:
+        numpy.ndarray: An (M, 2) int32 array of points.
+
+    """
+    return polyline(vertices, closed)
+
+
+# Polylines
+
+# The batch line rasterizers polylines can be drawn with
+POLYLINE_ALGORITHMS = {"bresenham": bresenhamBatch, "dda": ddaBatch}
+
+
+def polylineBatch(vertices, offsets, closed=False, algorithm="bresenham"):
+    """
+    Rasterizes many polylines at once, without repeating their joint pixels.
+
+    The vertices are rounded to integers and consecutive duplicates are
+    skipped. Every segment of every path is rasterized in a single call of
+    the batch line rasterizer. A segment starts on the last pixel of the
+    previous one, so that pixel is dropped, as is the final pixel of a closed
+    path, which is its first one. Paths whose vertices all round to the same
+    point yield that point. Pixels where a path crosses itself away from its
+    vertices are kept, once per pass.
+
+    Args:
+        vertices (array_like): An (M, 2) array with the vertices of every path, concatenated.
+        offsets (array_like): An (N + 1,) array such that the vertices of path i are
+            vertices[offsets[i]:offsets[i + 1]].
+        closed (bool, optional): Whether the last vertex of every path is joined to its first. Defaults to False.
+        algorithm (str, optional): "bresenham" or "dda". Defaults to "bresenham".
+
+    Returns:
+        tuple: A tuple (pixels, offsets) where pixels is a contiguous (K, 2) int32
+        array of points in path order and offsets is an (N + 1,) array such that
+        the pixels of path i are pixels[offsets[i]:offsets[i + 1]].
+
+    """
+    if algorithm not in POLYLINE_ALGORITHMS:
+        raise ValueError("Unknown line algorithm: %r" % algorithm)
+    vertices = np.rint(_asVertices(vertices)).astype(np.int64)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    counts = np.diff(offsets)
+    owner = np.repeat(np.arange(len(counts)), counts)
+
+    # Every vertex starts a segment to the next vertex of its path. The last
+    # vertex joins the first one when the path is closed or has one vertex.
+    index = np.arange(len(vertices))
+    last = index == offsets[owner + 1] - 1
+    following = np.where(last, offsets[owner], index + 1)
+    has_segment = ~last | closed | (counts[owner] == 1)
+    start, end, owner = (
+        vertices[has_segment],
+        vertices[following[has_segment]],
+        owner[has_segment],
+    )
+
+    # Zero-length segments are dropped, except the first one of a path that has no other
+    moving = np.any(start != end, axis=1)
+    path_moves = np.bincount(owner, weights=moving, minlength=len(counts)) > 0
+    first = owner != np.r_[-1, owner[:-1]]
+    keep = moving | (first & ~path_moves[owner])
+    start, end, owner = start[keep], end[keep], owner[keep]
+
+    pixels, pixel_offsets = POLYLINE_ALGORITHMS[algorithm](np.hstack([start, end]))
+
+    # Drop the start pixel of every segment but the first one of its path, and
+    # the end pixel of a closed path
+    unique = np.ones(len(pixels), dtype=bool)
+    first = owner != np.r_[-1, owner[:-1]]
+    unique[pixel_offsets[:-1][~first]] = False
+    if closed:
+        final = (owner != np.r_[owner[1:], -1]) & path_moves[owner]
+        unique[pixel_offsets[1:][final] - 1] = False
+
+    pixel_owner = np.repeat(owner, np.diff(pixel_offsets))
+    counts = np.bincount(pixel_owner[unique], minlength=len(counts))
+    return pixels[unique], _segmentOffsets(counts)
+
+
+def polyline(vertices, closed=False, algorithm="bresenham"):
+    """
+    Rasterizes a polyline without repeating its joint pixels.
+
+    Args:
+        vertices (array_like): An (N, 2) array of vertices.
+        closed (bool, optional): Whether the last vertex is joined to the first. Defaults to False.
+        algorithm (str, optional): "bresenham" or "dda". Defaults to "bresenham".
+
+    Returns:
+        numpy.ndarray: An (M, 2) int32 array of points, in path order.
+
+    """
+    vertices = _asVertices(vertices)
+    return polylineBatch(vertices, [0, len(vertices)], closed, algorithm)[0]
+
+
+# Curve Flattening
+
+# The largest distance in pixels between a curve and the polyline approximating it
+FLATTENING_TOLERANCE = 0.25
+
+# Bézier curves are split in halves at most this many times
+MAX_SUBDIVISIONS = 16
+
+
+def _flattenCubics(controls, tolerance):
+    """
+    Flattens cubic Bézier curves by adaptive subdivision.
+
+    All the pieces of every curve are tested at once on each level: the
+    flat ones are kept and the others are split in halves with de
+    Casteljau's algorithm, so the pieces are short where the curves bend
+    and long where they are straight. A piece is flat when the bound
+    max((3 p1 - 2 p0 - p3)^2, (3 p2 - p0 - 2 p3)^2), summed over x and y,
+    is at most 16 tolerance^2, which keeps it within the tolerance of its
+    chord.
+
+    Args:
+        controls (numpy.ndarray): An (N, 4, 2) float64 array of control points.
+        tolerance (float): The largest distance between a curve and its polyline.
+
+    Returns:
+        tuple: A tuple (vertices, offsets) where vertices is an (M, 2) float64
+        array and offsets is an (N + 1,) array such that the polyline of curve i
+        is vertices[offsets[i]:offsets[i + 1]].
+
+    """
+    if tolerance <= 0:
+        raise ValueError("tolerance must be positive, got %r" % tolerance)
+    limit = 16 * tolerance * tolerance
+    pieces = controls
+    owner = np.arange(len(controls))
+    t = np.zeros(len(controls))
+    flat_owner, flat_t, flat_start = [], [], []
+
+    for depth in range(MAX_SUBDIVISIONS + 1):
+        p0, p1, p2, p3 = pieces[:, 0], pieces[:, 1], pieces[:, 2], pieces[:, 3]
+        u = np.maximum((3 * p1 - 2 * p0 - p3) ** 2, (3 * p2 - p0 - 2 * p3) ** 2)
+        flat = u.sum(axis=1) <= limit
+        if depth == MAX_SUBDIVISIONS:
+            flat[:] = True
+        flat_owner.append(owner[flat])
+        flat_t.append(t[flat])
+        flat_start.append(p0[flat])
+        if flat.all():
+            break
+
+        # de Casteljau's algorithm at t = 1/2
+        p0, p1, p2, p3 = p0[~flat], p1[~flat], p2[~flat], p3[~flat]
+        p01, p12, p23 = (p0 + p1) / 2, (p1 + p2) / 2, (p2 + p3) / 2
+        p012, p123 = (p01 + p12) / 2, (p12 + p23) / 2
+        middle = (p012 + p123) / 2
+        left = np.stack([p0, p01, p012, middle], axis=1)
+        right = np.stack([middle, p123, p23, p3], axis=1)
+        pieces = np.concatenate([left, right])
+        owner = np.tile(owner[~flat], 2)
+        t = np.concatenate([t[~flat], t[~flat] + 0.5 ** (depth + 1)])
+
+    # The start of every piece in curve order, then the end of every curve
+    owner = np.concatenate(flat_owner)
+    order = np.lexsort((np.concatenate(flat_t), owner))
+    owner, starts = owner[order], np.concatenate(flat_start)[order]
+    piece_counts = np.bincount(owner, minlength=len(controls))
+    piece_offsets = _segmentOffsets(piece_counts)
+    offsets = _segmentOffsets(piece_counts + 1)
+
+    vertices = np.empty((offsets[-1], 2), dtype=np.float64)
+    rank = np.arange(len(owner)) - piece_offsets[owner]
+    vertices[offsets[owner] + rank] = starts
+    vertices[offsets[1:] - 1] = controls[:, 3]
+    return vertices, offsets
+
+
+def quadraticBezierBatch(curves, tolerance=FLATTENING_TOLERANCE):
+    """
+    Flattens many quadratic Bézier curves at once into polylines.
+
+    Args:
+        curves (array_like): An (N, 6) array of curves (x0, y0, x1, y1, x2, y2),
+            where (x1, y1) is the control point.
+        tolerance (float, optional): The largest distance in pixels between a
+            curve and its polyline. Defaults to FLATTENING_TOLERANCE.
+
+    Returns:
+        tuple: A tuple (vertices, offsets) where vertices is an (M, 2) float64
+        array and offsets is an (N + 1,) array such that the polyline of curve i
+        is vertices[offsets[i]:offsets[i + 1]], ready for `polylineBatch`.
+
+    """
+    p0, p1, p2 = (
+        _asRows(curves, 6, "curves", np.float64).reshape(-1, 3, 2).transpose(1, 0, 2)
+    )
+    # The same curve as a cubic
+    controls = np.stack(
+        [p0, p0 + 2 * (p1 - p0) / 3, p2 + 2 * (p1 - p2) / 3, p2], axis=1
+    )
+    return _flattenCubics(controls, tolerance)
+
+
+def quadraticBezier(x0, y0, x1, y1, x2, y2, tolerance=FLATTENING_TOLERANCE):
+    """
+    Flattens a quadratic Bézier curve into a polyline.
+
+    Args:
+        x0 (float): The x-coordinate of the starting point.
+        y0 (float): The y-coordinate of the starting point.
+        x1 (float): The x-coordinate of the control point.
+        y1 (float): The y-coordinate of the control point.
+        x2 (float): The x-coordinate of the ending point.
+        y2 (float): The y-coordinate of the ending point.
+        tolerance (float, optional): The largest distance in pixels between the
+            curve and its polyline. Defaults to FLATTENING_TOLERANCE.
+
+    Returns:
+        numpy.ndarray: The (M, 2) float64 vertices of the polyline.
+
+    """
+    return quadraticBezierBatch([[x0, y0, x1, y1, x2, y2]], tolerance)[0]
+
+
+def cubicBezierBatch(curves, tolerance=FLATTENING_TOLERANCE):
+    """
+    Flattens many cubic Bézier curves at once into polylines.
+
+    Args:
+        curves (array_like): An (N, 8) array of curves (x0, y0, x1, y1, x2, y2, x3, y3),
+            where (x1, y1) and (x2, y2) are the control points.
+        tolerance (float, optional): The largest distance in pixels between a
+            curve and its polyline. Defaults to FLATTENING_TOLERANCE.
+
+    Returns:
+        tuple: A tuple (vertices, offsets) where vertices is an (M, 2) float64
+        array and offsets is an (N + 1,) array such that the polyline of curve i
+        is vertices[offsets[i]:offsets[i + 1]], ready for `polylineBatch`.
+
+    """
+    controls = _asRows(curves, 8, "curves", np.float64).reshape(-1, 4, 2)
+    return _flattenCubics(controls, tolerance)
+
+
+def cubicBezier(x0, y0, x1, y1, x2, y2, x3, y3, tolerance=FLATTENING_TOLERANCE):
+    """
+    Flattens a cubic Bézier curve into a polyline.
+
+    Args:
+        x0 (float): The x-coordinate of the starting point.
+        y0 (float): The y-coordinate of the starting point.
+        x1 (float): The x-coordinate of the first control point.
+        y1 (float): The y-coordinate of the first control point.
+        x2 (float): The x-coordinate of the second control point.
+        y2 (float): The y-coordinate of the second control point.
+        x3 (float): The x-coordinate of the ending point.
+        y3 (float): The y-coordinate of the ending point.
+        tolerance (float, optional): The largest distance in pixels between the
+            curve and its polyline. Defaults to FLATTENING_TOLERANCE.
+
+    Returns:
+        numpy.ndarray: The (M, 2) float64 vertices of the polyline.
+
+    """
+    return cubicBezierBatch([[x0, y0, x1, y1, x2, y2, x3, y3]], tolerance)[0]
+
+
+def circularArcBatch(arcs, tolerance=FLATTENING_TOLERANCE):
+    """
+    Flattens many circular arcs at once into polylines.
+
+    The chord of an angle theta is at most r * (1 - cos(theta / 2)) away
+    from its arc, so every arc is split into the fewest equal angles whose
+    chords stay within the tolerance.
+
+    Args:
+        arcs (array_like): An (N, 5) array of arcs (x_center, y_center, r, start, end),
+            with the angles in degrees. The arc goes from start to end, clockwise
+            on the screen when end > start.
+        tolerance (float, optional): The largest distance in pixels between an
+            arc and its polyline. Defaults to FLATTENING_TOLERANCE.
+
+    Returns:
+        tuple: A tuple (vertices, offsets) where vertices is an (M, 2) float64
+        array and offsets is an (N + 1,) array such that the polyline of arc i
+        is vertices[offsets[i]:offsets[i + 1]], ready for `polylineBatch`.
+
+    """
+    if tolerance <= 0:
+        raise ValueError("tolerance must be positive, got %r" % tolerance)
+    x_center, y_center, r, start, end = _asRows(arcs, 5, "arcs", np.float64).T
+    r = np.abs(r)
+    start, sweep = np.radians(start), np.radians(end - start)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        step = 2 * np.arccos(np.clip(1 - tolerance / r, 0.0, 1.0))
+        steps = np.where(r > 0, np.ceil(np.abs(sweep) / step), 1)
+    steps = np.maximum(steps, 1).astype(np.int64)
+
+    offsets = _segmentOffsets(steps + 1)
+    arc = np.repeat(np.arange(len(steps)), steps + 1)
+    k = np.arange(offsets[-1]) - offsets[arc]
+    angle = start[arc] + sweep[arc] * k / steps[arc]
+    vertices = np.empty((offsets[-1], 2), dtype=np.float64)
+    vertices[:, 0] = x_center[arc] + r[arc] * np.cos(angle)
+    vertices[:, 1] = y_center[arc] + r[arc] * np.sin(angle)
+    return vertices, offsets
+
+
+def circularArc(x_center, y_center, r, start, end, tolerance=FLATTENING_TOLERANCE):
+    """
+    Flattens a circular arc into a polyline.
+
+    Args:
+        x_center (float): The x-coordinate of the center of the arc.
+        y_center (float): The y-coordinate of the center of the arc.
+        r (float): The radius of the arc.
+        start (float): The angle where the arc starts, in degrees.
+        end (float): The angle where the arc ends, in degrees.
+        tolerance (float, optional): The largest distance in pixels between the
+            arc and its polyline. Defaults to FLATTENING_TOLERANCE.
+
+    Returns:
+        numpy.ndarray: The (M, 2) float64 vertices of the polyline.
+
+    """
+    return circularArcBatch([[x_center, y_center, r, start, end]], tolerance)[0]
+
+
+# Strokes
+
+STROKE_CAPS = ("butt", "square", "round")
+STROKE_JOINS = ("miter", "bevel", "round")
+
+# Miter joins longer than this many stroke widths are beveled instead
+MITER_LIMIT = 4.0
+
+
+def _pieceEdges(vertices, offsets, owner):
+    """
+    Builds the edges of many convex pieces, all oriented counterclockwise.
+
+    Args:
+        vertices (numpy.ndarray): An (M, 2) array with the vertices of every piece, concatenated.
+        offsets (numpy.ndarray): An (N + 1,) array such that the vertices of piece i are
+            vertices[offsets[i]:offsets[i + 1]].
+        owner (numpy.ndarray): The (N,) index of the shape of every piece.
+
+    Returns:
+        tuple: A tuple (edges, owner) with the (E, 4) edges and the shape of every edge.
+
+    """
+    counts = np.diff(offsets)
+    piece = np.repeat(np.arange(len(counts)), counts)
+    index = np.arange(len(vertices))
+    following = np.where(index == offsets[piece + 1] - 1, offsets[piece], index + 1)
+    edges = np.hstack([vertices, vertices[following]])
+
+    # Reverse the pieces with a negative signed area, so every piece winds the
+    # same way and the nonzero rule fills their union
+    x0, y0, x1, y1 = edges.T
+    area = np.bincount(piece, weights=x0 * y1 - x1 * y0, minlength=len(counts))
+    reverse = (area < 0)[piece]
+    edges[reverse] = edges[reverse][:, [2, 3, 0, 1]]
+    return edges, owner[piece]
+
+
+def strokeBatch(
+    vertices,
+    offsets,
+    width,
+    cap="butt",
+    join="miter",
+    closed=False,
+    miter_limit=MITER_LIMIT,
+):
+    """
+    Rasterizes thick strokes along many paths at once as horizontal spans.
+
+    A stroke is the union of a rectangle around every segment, a join at
+    every vertex where the path turns and a cap at both ends of open paths.
+    Miter joins extend the outer edges of the segments until they meet, or
+    are beveled when that point is more than miter_limit widths away. Bevel
+    joins fill the triangle between the outer corners, and round joins and
+    caps fill a disk. Square caps extend the end segments by half the width.
+    The pieces are wound the same way and filled together with the nonzero
+    rule, so every pixel of a stroke is produced exactly once, whatever the
+    overlap between its pieces. Paths whose vertices all coincide are drawn
+    as a disk with round caps, a square with square caps, and not at all
+    with butt caps.
+
+    Args:
+        vertices (array_like): An (M, 2) array with the vertices of every path, concatenated.
+        offsets (array_like): An (N + 1,) array such that the vertices of path i are
+            vertices[offsets[i]:offsets[i + 1]].
+        width (float or array_like): The width of the strokes, or an (N,) array of widths.
+        cap (str, optional): "butt", "square" or "round". Defaults to "butt".
+        join (str, optional): "miter", "bevel" or "round". Defaults to "miter".
+        closed (bool, optional): Whether the last vertex of every path is joined to its first. Defaults to False.
+        miter_limit (float, optional): The longest miter, in widths. Defaults to MITER_LIMIT.
+
+    Returns:
+        tuple: A tuple (spans, offsets) where spans is a (K, 3) int32 array of
+        inclusive spans (y, x_start, x_end) and offsets is an (N + 1,) array such
+        that the spans of path i are spans[offsets[i]:offsets[i + 1]], ordered by y and x.
+
+    """
+    if cap not in STROKE_CAPS:
+        raise ValueError("Unknown stroke cap: %r" % cap)
+    if join not in STROKE_JOINS:
+        raise ValueError("Unknown stroke join: %r" % join)
+    vertices = _asVertices(vertices)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    paths = len(offsets) - 1
+    half = np.broadcast_to(np.asarray(width, dtype=np.float64), (paths,)) / 2
+    owner = np.repeat(np.arange(paths), np.diff(offsets))
+
+    # Skip repeated vertices, and the last vertex of a closed path on its first
+    first = owner != np.r_[-1, owner[:-1]]
+    keep = first | np.any(vertices != np.roll(vertices, 1, axis=0), axis=1)
+    vertices, owner = vertices[keep], owner[keep]
+    counts = np.bincount(owner, minlength=paths)
+    offsets = _segmentOffsets(counts)
+    if closed:
+        last = offsets[1:][counts > 1] - 1
+        repeated = np.all(vertices[last] == vertices[offsets[:-1][counts > 1]], axis=1)
+        keep = np.ones(len(vertices), dtype=bool)
+        keep[last[repeated]] = False
+        vertices, owner = vertices[keep], owner[keep]
+        counts = np.bincount(owner, minlength=paths)
+        offsets = _segmentOffsets(counts)
+
+    # The segments of every path, with their directions and left normals
+    index = np.arange(len(vertices))
+    last = index == offsets[owner + 1] - 1
+    has_segment = (~last | closed) & (counts[owner] > 1)
+    following = np.where(last, offsets[owner], index + 1)
+    a, b = vertices[has_segment], vertices[following[has_segment]]
+    segment_owner = owner[has_segment]
+    h = half[segment_owner][:, None]
+    d = (b - a) / np.hypot(*(b - a).T)[:, None]
+    n = np.stack([-d[:, 1], d[:, 0]], axis=1)
+
+    if not closed and cap == "square":
+        a = a - h * d * (segment_owner != np.r_[-1, segment_owner[:-1]])[:, None]
+        b = b + h * d * (segment_owner != np.r_[segment_owner[1:], -1])[:, None]
+    pieces = [np.stack([a + h * n, b + h * n, b - h * n, a - h * n], axis=1)]
+    piece_owners = [segment_owner]
+    disks, disk_owners = [], []
+
+    # Joins between every segment and the next one of its path
+    following = np.arange(len(a)) + 1
+    end = segment_owner != np.r_[segment_owner[1:], -1]
+    if closed:
+        starts = np.flatnonzero(segment_owner != np.r_[-1, segment_owner[:-1]])
+        following[end] = starts
+        turning = np.ones(len(a), dtype=bool)
+    else:
+        turning = ~end
+    current, following = np.flatnonzero(turning), following[turning]
+    v, h_join = b[current], h[current]
+    d1, d2, n1, n2 = d[current], d[following], n[current], n[following]
+    cross = d1[:, 0] * d2[:, 1] - d1[:, 1] * d2[:, 0]
+    bends = (cross != 0) | (np.sum(d1 * d2, axis=1) < 0)
+    v, h_join, n1, n2, cross = (
+        v[bends],
+        h_join[bends],
+        n1[bends],
+        n2[bends],
+        cross[bends],
+    )
+    join_owner = segment_owner[current][bends]
+
+    if join == "round":
+        disks.append(v)
+        disk_owners.append(join_owner)
+    else:
+        side = np.where(cross > 0, -1.0, 1.0)[:, None]
+        outer1, outer2 = v + side * h_join * n1, v + side * h_join * n2
+        cosine = 1 + np.sum(n1 * n2, axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            miter = (join == "miter") & (2 / cosine <= miter_limit * miter_limit)
+            tip = v + (outer1 - v + outer2 - v) / cosine[:, None]
+        pieces.append(np.stack([v, outer1, tip, outer2], axis=1)[miter])
+        piece_owners.append(join_owner[miter])
+        bevel = np.stack([v, outer1, outer2], axis=1)[~miter]
+        pieces.append(bevel)
+        piece_owners.append(join_owner[~miter])
+
+    # Caps of open paths, and paths without segments
+    alone = counts[owner] == 1
+    if cap == "round":
+        if not closed:
+            disks.append(vertices[offsets[:-1][counts > 1]])
+            disks.append(vertices[offsets[1:][counts > 1] - 1])
+            disk_owners.append(np.flatnonzero(counts > 1))
+            disk_owners.append(np.flatnonzero(counts > 1))
+        disks.append(vertices[alone])
+        disk_owners.append(owner[alone])
+    elif cap == "square":
+        corners = np.array([[-1, -1], [1, -1], [1, 1], [-1, 1]], dtype=np.float64)
+        h_alone = half[owner[alone]][:, None, None]
+        pieces.append(vertices[alone][:, None, :] + h_alone * corners)
+        piece_owners.append(owner[alone])
+
+    # Flatten the pieces into one polygon list, disks included
+    piece_vertices = [p.reshape(-1, 2) for p in pieces]
+    piece_counts = [np.full(len(p), p.shape[1], dtype=np.int64) for p in pieces]
+    if disks:
+        disks, disk_owners = np.concatenate(disks), np.concatenate(disk_owners)
+        r = half[disk_owners]
+        circles = np.column_stack([disks, r, np.zeros_like(r), np.full_like(r, 360.0)])
+        disk_vertices, disk_offsets = circularArcBatch(circles)
+        piece_vertices.append(disk_vertices)
+        piece_counts.append(np.diff(disk_offsets))
+        piece_owners.append(disk_owners)
+    edges, edge_owner = _pieceEdges(
+        np.concatenate(piece_vertices),
+        _segmentOffsets(np.concatenate(piece_counts)),
+        np.concatenate(piece_owners),
+    )
+    return _edgeSpans(edges, edge_owner, paths, "nonzero")
+
+
+def stroke(
+    vertices,
+    width,
+    cap="butt",
+    join="miter",
+    closed=False,
+    miter_limit=MITER_LIMIT,
+):
+    """
+    Rasterizes a thick stroke along a path as horizontal spans.
+
+    Args:
+        vertices (array_like): An (N, 2) array of vertices.
+        width (float): The width of the stroke.
+        cap (str, optional): "butt", "square" or "round". Defaults to "butt".
+        join (str, optional): "miter", "bevel" or "round". Defaults to "miter".
+        closed (bool, optional): Whether the last vertex is joined to the first. Defaults to False.
+        miter_limit (float, optional): The longest miter, in widths. Defaults to MITER_LIMIT.
+
+    Returns:
+        numpy.ndarray: A (K, 3) int32 array of inclusive spans (y, x_start, x_end)
+        ordered by y and x, covering every pixel of the stroke once.
+
+    """
+    vertices = _asVertices(vertices)
+    offsets = [0, len(vertices)]
+    return strokeBatch(vertices, offsets, width, cap, join, closed, miter_limit)[0]
+
+
+def thickLineBatch(segments, width, cap="butt"):
+    """
+    Rasterizes many thick lines at once as horizontal spans.
+
+    Args:
+        segments (array_like): An (N, 4) array of segments (x0, y0, x1, y1).
+        width (float or array_like): The width of the lines, or an (N,) array of widths.
+        cap (str, optional): "butt", "square" or "round". Defaults to "butt".
+
+    Returns:
+        tuple: A tuple (spans, offsets) where spans is a (K, 3) int32 array of
+        inclusive spans (y, x_start, x_end) and offsets is an (N + 1,) array such
+        that the spans of line i are spans[offsets[i]:offsets[i + 1]].
+
+    """
+    segments = _asSegments(segments, np.float64)
+    offsets = np.arange(0, 2 * len(segments) + 1, 2)
+    return strokeBatch(segments.reshape(-1, 2), offsets, width, cap)
+
+
+# Polygon Clipping
+
+
+def viewportWindow(x_min, y_min, x_max, y_max):
+    """
+    Builds the clip window of a rectangular viewport.
+
+    Args:
+        x_min (int): The minimum x-coordinate of the viewport.
+        y_min (int): The minimum y-coordinate of the viewport.
+        x_max (int): The maximum x-coordinate of the viewport.
+        y_max (int): The maximum y-coordinate of the viewport.
+
+    Returns:
+        numpy.ndarray: A (4, 2) array with the corners of the viewport.
+
+    """
+    return np.array(
+        [[x_min, y_min], [x_max, y_min], [x_max, y_max], [x_min, y_max]],
+        dtype=np.float64,
+    )
+
+
+def sutherlandHodgmanClipBatch(vertices, offsets, clip_window):
+    """
+    Clips many polygons at once against a convex window with the Sutherland-Hodgman algorithm.
+
+    The polygons are clipped against one window edge at a time. For every
+    polygon edge (previous -> current), the intersection with the window
+    edge is emitted when the edge crosses it, then the current vertex when it
+    is inside, all polygons being processed in a single vectorized pass per
+    window edge.
+
+    Args:
+        vertices (array_like): An (M, 2) array with the vertices of every polygon, concatenated.
+        offsets (array_like): An (N + 1,) array such that the vertices of polygon i are
+            vertices[offsets[i]:offsets[i + 1]].
+        clip_window (array_like): A (K, 2) array with the vertices of a convex window, in either orientation.
+
+    Returns:
+        tuple: A tuple (vertices, offsets) with the clipped polygons in the same
+        layout. Polygons entirely outside the window have no vertices.
+
+    """
+    vertices = _asVertices(vertices)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    window = _asVertices(clip_window)
+
+    # Signed area of the window, to keep the inside on the left of its edges
+    x, y = window.T
+    orientation = (
+        1.0 if np.dot(x, np.roll(y, -1)) >= np.dot(np.roll(x, -1), y) else -1.0
+    )
+
+    for (ax, ay), (bx, by) in zip(window, np.roll(window, -1, axis=0)):
+        counts = np.diff(offsets)
+        owner = np.repeat(np.arange(len(counts)), counts)
+        index = np.arange(len(vertices))
+        previous = np.where(index == offsets[owner], offsets[owner + 1] - 1, index - 1)
+
+        distance = orientation * (
+            (bx - ax) * (vertices[:, 1] - ay) - (by - ay) * (vertices[:, 0] - ax)
+        )
+        inside = distance >= 0
+        crossing = inside != inside[previous]
+
+        # Intersection of the edge previous -> current with the window edge
+        d_previous = distance[previous]
+        start = vertices[previous]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t = d_previous / (d_previous - distance)
+            intersection = start + t[:, None] * (vertices - start)
+
+        emitted = crossing.astype(np.int64) + inside
+        output = np.empty((emitted.sum(), 2), dtype=np.float64)
+        position = np.cumsum(emitted) - emitted
+        output[position[crossing]] = intersection[crossing]
+        output[position[inside] + crossing[inside]] = vertices[inside]
+
+        vertices = output
+        emitted_per_polygon = np.bincount(owner, weights=emitted, minlength=len(counts))
+        offsets = _segmentOffsets(emitted_per_polygon.astype(np.int64))
+    return vertices, offsets
+
+
+def sutherlandHodgmanClip(vertices, clip_window):
+    """
+    Clips a polygon against a convex window with the Sutherland-Hodgman algorithm.
+
+    Args:
+        vertices (array_like): An (N, 2) array of polygon vertices.
+        clip_window (array_like): A (K, 2) array with the vertices of a convex window, in either orientation.
+
+    Returns:
+        numpy.ndarray: An (M, 2) array with the vertices of the clipped polygon,
+        empty if the polygon is entirely outside the window.
+
+    """
+    vertices = _asVertices(vertices)
+    return sutherlandHodgmanClipBatch(vertices, [0, len(vertices)], clip_window)[0]
+
+
+def polygonViewportClip(vertices, x_min, y_min, x_max, y_max):
+    """
+    Clips a polygon against a rectangular viewport.
+
+    Args:
+        vertices (array_like): An (N, 2) array of polygon vertices.
+        x_min (int): The minimum x-coordinate of the viewport.
+        y_min (int): The minimum y-coordinate of the viewport.
+        x_max (int): The maximum x-coordinate of the viewport.
+        y_max (int): The maximum y-coordinate of the viewport.
+
+    Returns:
+        numpy.ndarray: An (M, 2) array with the vertices of the clipped polygon.
+
+    """
+    return sutherlandHodgmanClip(vertices, viewportWindow(x_min, y_min, x_max, y_max))
+
+
+# Anti-Aliased Lines
+
+# The (x, y, coverage) records produced by the anti-aliased line rasterizers
+COVERAGE_DTYPE = np.dtype([("x", np.int32), ("y", np.int32), ("coverage", np.float32)])
+
+
+def wuLineBatch(segments):
+    """
+    Rasterizes many anti-aliased lines at once with Xiaolin Wu's algorithm.
+
+    Every column along the major axis of a line covers the two pixels
+    straddling the exact line, weighted by their distance to it. The end
+    columns are also weighted by how much of the pixel the line covers.
+    All columns of all segments are evaluated in a single pass, and pixels
+    with zero coverage are dropped.
+
+    Args:
+        segments (array_like): An (N, 4) array of segments (x0, y0, x1, y1).
+
+    Returns:
+        tuple: A tuple (pixels, offsets) where pixels is an (M,) array of
+        COVERAGE_DTYPE records (x, y, coverage) and offsets is an (N + 1,) array
+        such that the pixels of segment i are pixels[offsets[i]:offsets[i + 1]].
+
+    """
+    segments = _asSegments(segments, np.float64)
+    x0, y0, x1, y1 = segments.T
+
+    # Step along the major axis, from the smaller to the larger coordinate
+    steep = np.abs(y1 - y0) > np.abs(x1 - x0)
+    a0, b0 = np.where(steep, y0, x0), np.where(steep, x0, y0)
+    a1, b1 = np.where(steep, y1, x1), np.where(steep, x1, y1)
+    backwards = a0 > a1
+    a0, a1 = np.where(backwards, a1, a0), np.where(backwards, a0, a1)
+    b0, b1 = np.where(backwards, b1, b0), np.where(backwards, b0, b1)
+
+    da = a1 - a0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        gradient = np.where(da == 0, 1.0, (b1 - b0) / da)
+
+    # End columns and the fraction of them covered by the line
+    a_start = np.floor(a0 + 0.5)
+    a_end = np.floor(a1 + 0.5)
+    b_start = b0 + gradient * (a_start - a0)
+    gap_start = 1.0 - ((a0 + 0.5) - np.floor(a0 + 0.5))
+    gap_end = (a1 + 0.5) - np.floor(a1 + 0.5)
+
+    columns = (a_end - a_start).astype(np.int64) + 1
+    column_offsets = _segmentOffsets(columns)
+    seg = np.repeat(np.arange(len(segments)), columns)
+    k = np.arange(column_offsets[-1], dtype=np.int64) - column_offsets[seg]
+
+    weight = np.ones(len(k))
+    weight[k == 0] *= gap_start[seg][k == 0]
+    last = k == columns[seg] - 1
+    weight[last] *= gap_end[seg][last]
+
+    a = a_start[seg] + k
+    b = b_start[seg] + gradient[seg] * k
+    b_floor = np.floor(b)
+    fraction = b - b_floor
+
+    # The two pixels of every column, next to each other, without the empty ones
+    major = np.repeat(a, 2)
+    minor = np.stack([b_floor, b_floor + 1], axis=1).ravel()
+    coverage = np.stack([(1.0 - fraction) * weight, fraction * weight], axis=1).ravel()
+    owner = np.repeat(seg, 2)
+    steep_owner = steep[owner]
+    keep = coverage > 0
+
+    pixels = np.empty(np.count_nonzero(keep), dtype=COVERAGE_DTYPE)
+    pixels["x"] = np.where(steep_owner, minor, major)[keep]
+    pixels["y"] = np.where(steep_owner, major, minor)[keep]
+    pixels["coverage"] = coverage[keep]
+    offsets = _segmentOffsets(np.bincount(owner[keep], minlength=len(segments)))
+    return pixels, offsets
+
+
+def wuLine(x0, y0, x1, y1):
+    """
+    Rasterizes an anti-aliased line with Xiaolin Wu's algorithm.
+
+    Args:
+        x0 (float): The x-coordinate of the starting point.
+        y0 (float): The y-coordinate of the starting point.
+        x1 (float): The x-coordinate of the ending point.
+        y1 (float): The y-coordinate of the ending point.
+
+    Returns:
+        numpy.ndarray: An (M,) array of COVERAGE_DTYPE records (x, y, coverage).
+
+    """
+    return wuLineBatch([[x0, y0, x1, y1]])[0]
+
+
+# Compact Pixel Buffers
+
+
+def bresenhamPixels(x0, y0, x1, y1):
+    """
+    Rasterizes a line with Bresenham's algorithm into a PixelBuffer.
+
+    Args:
+        x0 (int): The x-coordinate of the starting point.
+        y0 (int): The y-coordinate of the starting point.
+        x1 (int): The x-coordinate of the ending point.
+        y1 (int): The y-coordinate of the ending point.
+
+    Returns:
+        PixelBuffer: The same points as `bresenham`, in the same order.
+
+    """
+    pixels, _ = bresenhamBatch([[x0, y0, x1, y1]])
+    return PixelBuffer(pixels)
+
+
+def ddaPixels(x0, y0, x1, y1):
+    """
+    Rasterizes a line with the DDA algorithm into a PixelBuffer.
+
+    Args:
+        x0 (int): The x-coordinate of the starting point.
+        y0 (int): The y-coordinate of the starting point.
+        x1 (int): The x-coordinate of the ending point.
+        y1 (int): The y-coordinate of the ending point.
+
+    Returns:
+        PixelBuffer: The same points as `dda`, in the same order.
+
+    """
+    pixels, _ = ddaBatch([[x0, y0, x1, y1]])
+    return PixelBuffer(pixels)
+
+
+def bresenhamCirclePixels(x_center, y_center, r):
+    """
+    Rasterizes a circle with Bresenham's circle algorithm into a PixelBuffer.
+
+    The first octant is computed in closed form and mirrored into the
+    other seven. The points that `bresenhamCircle` repeats at the octant
+    boundaries are only kept once.
+
+    Args:
+        x_center (int): The x-coordinate of the center of the circle.
+        y_center (int): The y-coordinate of the center of the circle.
+        r (int): The radius of the circle. Circles with a negative radius have no points.
+
+    Returns:
+        PixelBuffer: The distinct points of `bresenhamCircle`, in the order it first produces them.
+
+    """
+    if r < 0:
+        return PixelBuffer()
+    r = np.int64(r)
+    x = np.arange(_isqrt(r * r // 2) + 2, dtype=np.int64)
+    y = _circleOctantY(x, r)
+    x, y = x[x <= y], y[x <= y]
+
+    # The eight symmetric points of every step, in the order of bresenhamCircle
+    dx = np.stack([x, x, -x, -x, y, y, -y, -y], axis=1).ravel()
+    dy = np.stack([y, -y, y, -y, x, -x, x, -x], axis=1).ravel()
+    pixels = PixelBuffer(np.stack([dx + x_center, dy + y_center], axis=1))
+    return pixels.unique()
+
+
+# Integer Line Rasterization
+
+# The fractional bits of the 16.16 fixed-point coordinates of ddaFixed
+FIXED_SHIFT = 16
+FIXED_ONE = 1 << FIXED_SHIFT
+
+
+def bresenhamInt(x0, y0, x1, y1):
+    """
+    Implements Bresenham's line algorithm with integer arithmetic only.
+
+    The error term of `bresenham` starts at half the major delta, which makes
+    the whole loop run on floats. Doubling every error term keeps it integral
+    without changing the sign tests, so the points are the same.
+
+    Args:
+        x0 (int): The x-coordinate of the starting point.
+        y0 (int): The y-coordinate of the starting point.
+        x1 (int): The x-coordinate of the ending point.
+        y1 (int): The y-coordinate of the ending point.
+
+    Returns:
+        list: The same points as `bresenham`, in the same order.
+
+    """
+    points = []
+    dx = abs(x1 - x0)
+    dy = abs(y1 - y0)
+    x, y = x0, y0
+    sx = -1 if x0 > x1 else 1
+    sy = -1 if y0 > y1 else 1
+
+    if dx > dy:
+        err = dx
+        while x != x1:
+            points.append((x, y))
+            err -= 2 * dy
+            if err < 0:
+                y += sy
+                err += 2 * dx
+            x += sx
+    else:
+        err = dy
+        while y != y1:
+            points.append((x, y))
+            err -= 2 * dx
+            if err < 0:
+                x += sx
+                err += 2 * dy
+            y += sy
+
+    points.append((x, y))
+    return points
+
+
+def _fixedIncrement(delta, steps):
+    """
+    Divides integer deltas by step counts into rounded 16.16 increments.
+
+    Args:
+        delta (numpy.ndarray): The int64 deltas.
+        steps (numpy.ndarray): The positive int64 step counts.
+
+    Returns:
+        numpy.ndarray: The int64 increments, rounded half away from zero.
+
+    """
+    magnitude = (2 * np.abs(delta) * FIXED_ONE + steps) // (2 * steps)
+    return np.sign(delta) * magnitude
+
+
+def ddaFixedBatch(segments):
+    """
+    Rasterizes many lines at once with a 16.16 fixed-point DDA.
+
+    Every segment steps along its major axis by exactly one pixel and along
+    its minor axis by a rounded 16.16 increment. The positions are running
+    sums of the increments, computed with one int64 cumulative sum over every
+    pixel of every segment, and rounded by adding half a pixel and shifting.
+    No floating point is involved, so the pixels are the same on every
+    platform. Both endpoints are exact for segments shorter than 65536 steps.
+
+    The rounding error of the increments accumulates by at most 1/131072 of
+    a pixel per step, and ties round up rather than to even, so a minor
+    coordinate within that distance of a pixel boundary may be one pixel off
+    the one `dda` picks.
+
+    Args:
+        segments (array_like): An (N, 4) array of integer segments (x0, y0, x1, y1).
+
+    Returns:
+        tuple: A tuple (pixels, offsets) where pixels is a contiguous (M, 2) int32
+        array of points and offsets is an (N + 1,) array such that the pixels of
+        segment i are pixels[offsets[i]:offsets[i + 1]].
+
+    """
+    segments = _asSegments(segments, np.int64)
+    x0, y0, x1, y1 = segments.T
+
+    dx = x1 - x0
+    dy = y1 - y0
+    steps = np.maximum(np.abs(dx), np.abs(dy))
+    safe_steps = np.maximum(steps, 1)
+
+    counts = steps + 1
+    offsets = _segmentOffsets(counts)
+    starts = offsets[:-1]
+    seg = np.repeat(np.arange(len(segments)), counts)
+
+    pixels = np.empty((offsets[-1], 2), dtype=np.int32)
+    for axis, start, delta in ((0, x0, dx), (1, y0, dy)):
+        increments = _fixedIncrement(delta, safe_steps)[seg]
+        # A running sum over all segments, rebased to zero at each segment's first pixel
+        acc = np.cumsum(increments)
+        acc -= acc[starts][seg]
+        acc += (start << FIXED_SHIFT)[seg] + FIXED_ONE // 2
+        pixels[:, axis] = acc >> FIXED_SHIFT
+    return pixels, offsets
+
+
+def ddaFixed(x0, y0, x1, y1):
+    """
+    Implements the DDA line algorithm in 16.16 fixed point.
+
+    Args:
+        x0 (int): The x-coordinate of the starting point.
+        y0 (int): The y-coordinate of the starting point.
+        x1 (int): The x-coordinate of the ending point.
+        y1 (int): The y-coordinate of the ending point.
+
+    Returns:
+        list: A list of points representing the line.
+
+    """
+    pixels, _ = ddaFixedBatch([[x0, y0, x1, y1]])
+    return [tuple(point) for point in pixels.tolist()]
@@ -0,0 +1,457 @@
+"""
+Benchmarks for the routines in algorithms.py and the drawing paths of windows.py.
+
+Usage:
+    python benchmarks.py -o results.json
+    python benchmarks.py --quick --filter clip
+    python benchmarks.py --compare base.json head.json --threshold 1.2
+
+Every case is timed with timeit: the number of calls per measurement is
+calibrated to take at least 0.2 seconds, and the best and median per-call
+times of several measurements are reported. Inputs are generated from a
+fixed seed so runs on different commits are comparable.
+"""
+
+import argparse
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import time
+import timeit
+
+import numpy as np
+
+from algorithms import (
+    bresenham,
+    bresenhamBatch,
+    bresenhamCircle,
+    bresenhamCirclePixels,
+    bresenhamInt,
+    circularArcBatch,
+    cohenSutherlandClip,
+    cohenSutherlandClipBatch,
+    cubicBezierBatch,
+    dda,
+    ddaBatch,
+    ddaFixedBatch,
+    filledCircleSpans,
+    liangBarskyClip,
+    liangBarskyClipBatch,
+    rotateWithAngle,
+    thickLineBatch,
+    transform,
+    transformPoints,
+)
+from cg import renderScene
+from framebuffer import Framebuffer
+from spatial import GridIndex
+from tiling import renderSceneTiled
+
+SEED = 1234
+WIDTH = 800
+HEIGHT = 600
+
+LINE_LENGTHS = [10, 100, 1000, 10000, 100000]
+SEGMENT_COUNTS = [100, 1000, 10000, 100000, 1000000]
+CIRCLE_RADII = [10, 100, 1000, 10000]
+CURVE_COUNTS = [100, 1000, 10000, 100000]
+POINT_COUNTS = [1000, 10000, 100000, 1000000]
+INDEX_COUNTS = [1000, 10000, 100000]
+SCENE_SIZES = [(800, 600, 300), (1920, 1080, 1000)]
+
+# Pure-Python loops over many segments are capped to keep a run short
+MAX_SCALAR_SEGMENTS = 10000
+
+
+def randomSegments(count, extent, rng):
+    """
+    Generates random integer segments inside a square.
+
+    Args:
+        count (int): The number of segments.
+        extent (int): The side of the square the endpoints are drawn from.
+        rng (numpy.random.Generator): The random number generator.
+
+    Returns:
+        numpy.ndarray: A (count, 4) int64 array of segments.
+    """
+    return rng.integers(0, extent, size=(count, 4))
+
+
+def randomScene(width, height, count, rng):
+    """
+    Generates a scene of random lines, filled circles and filled polygons.
+
+    Args:
+        width (int): The width of the image.
+        height (int): The height of the image.
+        count (int): The number of primitives.
+        rng (numpy.random.Generator): The random number generator.
+
+    Returns:
+        dict: The scene.
+    """
+    primitives = []
+    for i in range(count):
+        kind = i % 3
+        if kind == 0:
+            points = rng.integers(0, (width, height), size=(2, 2)).ravel()
+            primitive = {"type": "line", "points": points.tolist()}
+        elif kind == 1:
+            primitive = {
+                "type": "circle",
+                "center": rng.integers(0, (width, height)).tolist(),
+                "radius": int(rng.integers(1, height // 8)),
+                "fill": True,
+            }
+        else:
+            points = rng.integers(0, (width, height), size=(5, 2))
+            primitive = {"type": "polygon", "points": points.tolist(), "fill": True}
+        primitive["color"] = "#%06x" % rng.integers(0, 1 << 24)
+        primitives.append(primitive)
+    return {"width": width, "height": height, "primitives": primitives}
+
+
+def lineCases(quick):
+    lengths = LINE_LENGTHS[:3] if quick else LINE_LENGTHS
+    for length in lengths:
+        # a shallow diagonal so both coordinates step
+        x0, y0, x1, y1 = 0, 0, length, length // 3
+        params = {"length": length}
+        yield "line", "bresenham", params, lambda: bresenham(x0, y0, x1, y1)
+        yield "line", "bresenhamInt", params, lambda: bresenhamInt(x0, y0, x1, y1)
+        yield "line", "dda", params, lambda: dda(x0, y0, x1, y1)
+        segments = np.array([[x0, y0, x1, y1]])
+        yield "line", "bresenhamBatch", params, lambda: bresenhamBatch(segments)
+        yield "line", "ddaBatch", params, lambda: ddaBatch(segments)
+        yield "line", "ddaFixedBatch", params, lambda: ddaFixedBatch(segments)
+
+
+def segmentCases(quick):
+    counts = SEGMENT_COUNTS[:3] if quick else SEGMENT_COUNTS
+    for count in counts:
+        segments = randomSegments(count, 16, np.random.default_rng(SEED))
+        params = {"segments": count}
+        yield "segments", "bresenhamBatch", params, lambda: bresenhamBatch(segments)
+        yield "segments", "ddaBatch", params, lambda: ddaBatch(segments)
+        yield "segments", "ddaFixedBatch", params, lambda: ddaFixedBatch(segments)
+        yield "segments", "thickLineBatch", params, lambda: thickLineBatch(segments, 3)
+        if count <= MAX_SCALAR_SEGMENTS:
+            rows = segments.tolist()
+            yield "segments", "bresenham", params, lambda: [bresenham(*s) for s in rows]
+
+
+def circleCases(quick):
+    radii = CIRCLE_RADII[:2] if quick else CIRCLE_RADII
+    for r in radii:
+        params = {"radius": r}
+        yield "circle", "bresenhamCircle", params, lambda: bresenhamCircle(0, 0, r)
+        yield "circle", "bresenhamCirclePixels", params, lambda: (
+            bresenhamCirclePixels(0, 0, r)
+        )
+        yield "circle", "filledCircleSpans", params, lambda: filledCircleSpans(0, 0, r)
+
+
+def curveCases(quick):
+    counts = CURVE_COUNTS[:2] if quick else CURVE_COUNTS
+    for count in counts:
+        rng = np.random.default_rng(SEED)
+        cubics = rng.uniform(0, 200, size=(count, 8))
+        arcs = np.hstack(
+            [rng.uniform(0, 200, size=(count, 3)), rng.uniform(-360, 360, (count, 2))]
+        )
+        params = {"curves": count}
+        yield "curve", "cubicBezierBatch", params, lambda: cubicBezierBatch(cubics)
+        yield "curve", "circularArcBatch", params, lambda: circularArcBatch(arcs)
+
+
+def transformCases(quick):
+    matrix = np.array([[0.8, -0.6, 10.0], [0.6, 0.8, -5.0], [0.0, 0.0, 1.0]])
+    yield "transform", "transform", {}, lambda: transform(3, 4, 250, 120, matrix)
+    yield "transform", "rotateWithAngle", {}, lambda: rotateWithAngle(
+        3, 4, 250, 120, 37.0
+    )
+    counts = POINT_COUNTS[:2] if quick else POINT_COUNTS
+    for count in counts:
+        points = np.random.default_rng(SEED).uniform(0, 1000, size=(count, 2))
+        out = np.empty_like(points)
+        params = {"points": count}
+        yield "transform", "transformPoints", params, lambda: transformPoints(
+            points, matrix, out=out
+        )
+
+
+def clipCases(quick):
+    viewport = (200, 150, 600, 450)
+    counts = SEGMENT_COUNTS[:3] if quick else SEGMENT_COUNTS
+    for count in counts:
+        segments = randomSegments(count, 800, np.random.default_rng(SEED))
+        params = {"segments": count}
+        yield "clip", "cohenSutherlandClipBatch", params, lambda: (
+            cohenSutherlandClipBatch(segments, *viewport)
+        )
+        yield "clip", "liangBarskyClipBatch", params, lambda: liangBarskyClipBatch(
+            segments, *viewport
+        )
+        if count <= MAX_SCALAR_SEGMENTS:
+            rows = segments.tolist()
+            yield "clip", "cohenSutherlandClip", params, lambda: [
+                cohenSutherlandClip(*s, *viewport) for s in rows
+            ]
+            yield "clip", "liangBarskyClip", params, lambda: [
+                liangBarskyClip(*s, *viewport) for s in rows
+            ]
+
+
+def indexCases(quick):
+    counts = INDEX_COUNTS[:2] if quick else INDEX_COUNTS
+    for count in counts:
+        rng = np.random.default_rng(SEED)
+        corners = rng.integers(0, (WIDTH, HEIGHT), size=(count, 2))
+        bboxes = np.hstack([corners, corners + rng.integers(1, 32, size=(count, 2))])
+        ids = list(range(count))
+        params = {"items": count}
+
+        def bulkLoad():
+            GridIndex().bulkLoad(ids, bboxes)
+
+        yield "index", "GridIndex.bulkLoad", params, bulkLoad
+
+        index = GridIndex()
+        index.bulkLoad(ids, bboxes)
+        points = rng.integers(0, (WIDTH, HEIGHT), size=(100, 2)).tolist()
+        yield "index", "GridIndex.queryPoint", params, lambda: [
+            index.queryPoint(x, y) for x, y in points
+        ]
+        yield "index", "GridIndex.queryRect", params, lambda: [
+            index.queryRect(x, y, x + 100, y + 100) for x, y in points
+        ]
+
+        # Items in one quadrant and a box over the whole canvas, so most
+        # points fall in empty cells and only match the oversized item
+        sparse = GridIndex(max_cells=16)
+        sparse.bulkLoad(ids, bboxes // 2)
+        sparse.insert(count, (0, 0, WIDTH, HEIGHT))
+        for x, y in points:
+            expected = {count} | {
+                i
+                for i, (x0, y0, x1, y1) in enumerate((bboxes // 2).tolist())
+                if x0 <= x < x1 and y0 <= y < y1
+            }
+            assert sparse.queryPoint(x, y) == expected
+        yield "index", "GridIndex.queryPoint oversized", params, lambda: [
+            sparse.queryPoint(x, y) for x, y in points
+        ]
+
+
+def renderCases(quick):
+    sizes = SCENE_SIZES[:1] if quick else SCENE_SIZES
+    jobs = os.cpu_count() or 1
+    for width, height, count in sizes:
+        scene = randomScene(width, height, count, np.random.default_rng(SEED))
+        params = {"size": "%dx%d" % (width, height), "primitives": count}
+        yield "render", "renderScene", params, lambda: renderScene(scene)
+        yield "render", "renderSceneTiled", dict(params, jobs=jobs), lambda: (
+            renderSceneTiled(scene, jobs=jobs)
+        )
+
+
+def paintCases(quick):
+    pixels = bresenham(0, 0, WIDTH - 1, HEIGHT - 1)
+    params = {"pixels": len(pixels)}
+    framebuffer = Framebuffer(WIDTH, HEIGHT)
+    yield "paint", "framebuffer.plot", params, lambda: framebuffer.plot(pixels, "black")
+
+    canvas = _canvas()
+    if canvas is None:
+        return
+
+    def createRectangles():
+        for x, y in pixels:
+            canvas.create_rectangle(x, y, x + 1, y + 1, fill="black")
+        canvas.delete("all")
+
+    yield "paint", "canvas.create_rectangle", params, createRectangles
+
+
+def _canvas():
+    """
+    Creates a Tk canvas for the per-pixel drawing benchmark.
+
+    Returns:
+        tkinter.Canvas: The canvas, or None if Tk or a display is unavailable.
+    """
+    try:
+        import tkinter
+
+        root = tkinter.Tk()
+    except Exception:
+        return None
+    root.withdraw()
+    canvas = tkinter.Canvas(root, width=WIDTH, height=HEIGHT)
+    canvas.pack()
+    return canvas
+
+
+# Cases are generated lazily and each one is timed before the next is built,
+# so the large inputs are never all in memory at once.
+GROUPS = [
+    lineCases,
+    segmentCases,
+    circleCases,
+    curveCases,
+    transformCases,
+    clipCases,
+    indexCases,
+    renderCases,
+    paintCases,
+]
+
+
+def measure(function, repeat):
+    """
+    Times a function with timeit.
+
+    Args:
+        function (callable): The function to time.
+        repeat (int): The number of measurements.
+
+    Returns:
+        tuple: A tuple (number, times) with the calls per measurement and the per-call times in seconds.
+    """
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    times = [t / number for t in timer.repeat(repeat=repeat, number=number)]
+    return number, times
+
+
+def gitCommit():
+    """
+    Returns the commit of the working tree, if it is a git repository.
+
+    Returns:
+        str: The commit hash, or None.
+    """
+    try:
+        output = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.stdout.strip()
+
+
+def run(quick=False, pattern=None, repeat=5):
+    """
+    Runs the benchmarks.
+
+    Args:
+        quick (bool, optional): Only run the smaller sizes of every case. Defaults to False.
+        pattern (str, optional): A regular expression the "group/name" of a case must match.
+        repeat (int, optional): The number of measurements of every case. Defaults to 5.
+
+    Returns:
+        dict: The results, with the run's metadata.
+    """
+    results = []
+    for group in GROUPS:
+        for group_name, name, params, function in group(quick):
+            if pattern and not re.search(pattern, "%s/%s" % (group_name, name)):
+                continue
+            number, times = measure(function, repeat)
+            result = {
+                "group": group_name,
+                "name": name,
+                "params": params,
+                "number": number,
+                "best": min(times),
+                "median": statistics.median(times),
+                "times": times,
+            }
+            results.append(result)
+            print(
+                "%-10s %-28s %-22s %12.3f us"
+                % (group_name, name, _formatParams(params), result["best"] * 1e6)
+            )
+    return {
+        "meta": {
+            "commit": gitCommit(),
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "quick": quick,
+            "repeat": repeat,
+            "seed": SEED,
+        },
+        "results": results,
+    }
+
+
+def _formatParams(params):
+    return ",".join("%s=%s" % item for item in sorted(params.items()))
+
+
+def _key(result):
+    return result["group"], result["name"], _formatParams(result["params"])
+
+
+def compare(base_path, head_path, threshold):
+    """
+    Compares two result files and reports the cases that slowed down.
+
+    Args:
+        base_path (str): The results of the reference commit.
+        head_path (str): The results of the commit under test.
+        threshold (float): The head/base ratio of best times above which a case regressed.
+
+    Returns:
+        int: The number of regressed cases.
+    """
+    with open(base_path) as f:
+        base = {_key(r): r for r in json.load(f)["results"]}
+    with open(head_path) as f:
+        head = [r for r in json.load(f)["results"] if _key(r) in base]
+
+    regressions = 0
+    for result in head:
+        ratio = result["best"] / base[_key(result)]["best"]
+        flag = ""
+        if ratio > threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        group, name, params = _key(result)
+        print("%-10s %-28s %-22s %8.2fx%s" % (group, name, params, ratio, flag))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-o", "--output", help="write the results to a JSON file")
+    parser.add_argument("--quick", action="store_true", help="only the smaller sizes")
+    parser.add_argument("--filter", help="regular expression on group/name")
+    parser.add_argument("--repeat", type=int, default=5, help="measurements per case")
+    parser.add_argument(
+        "--compare", nargs=2, metavar=("BASE", "HEAD"), help="compare two result files"
+    )
+    parser.add_argument(
+        "--threshold", type=float, default=1.2, help="regression ratio for --compare"
+    )
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        return 1 if compare(*args.compare, args.threshold) else 0
+
+    results = run(args.quick, args.filter, args.repeat)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,516 @@
+"""
+Headless rendering of scene files, without Tkinter.
+
+Usage:
+    python -m cg render scene.json -o out.ppm
+    python -m cg render scenes/ -o renders/ --format png --jobs 4
+    python -m cg render big.json -o big.png --jobs 8
+    python -m cg render big.npz -o big.png
+    python -m cg render map.json -o map.ppm --out-of-core
+
+A scene file is a JSON object such as:
+
+    {
+        "width": 800,
+        "height": 600,
+        "background": "white",
+        "viewport": [100, 100, 700, 500],
+        "primitives": [
+            {"type": "line", "points": [10, 10, 400, 300], "color": "black"},
+            {"type": "line", "algorithm": "dda", "points": [0, 0, 50, 80]},
+            {"type": "line", "algorithm": "wu", "points": [20, 40, 420, 95.5]},
+            {"type": "line", "points": [0, 0, 799, 599], "clip": "liang-barsky"},
+            {"type": "circle", "center": [400, 300], "radius": 120, "color": "green"},
+            {"type": "circle", "center": [200, 150], "radius": 40, "fill": true},
+            {"type": "ellipse", "center": [600, 450], "axes": [80, 30], "color": "blue"},
+            {"type": "polygon", "points": [[50, 500], [150, 420], [200, 560]]},
+            {"type": "polygon", "points": [[300, 500], [400, 420], [450, 560]],
+             "fill": true, "rule": "nonzero", "color": "red"},
+            {"type": "polygon", "points": [[0, 0], [790, 40], [400, 590]],
+             "clip": true},
+            {"type": "polyline", "points": [[10, 590], [60, 550], [110, 580]],
+             "closed": false, "algorithm": "dda"},
+            {"type": "bezier", "points": [[500, 100], [600, 0], [700, 200], [780, 90]]},
+            {"type": "arc", "center": [650, 300], "radius": 60, "angles": [0, 135],
+             "tolerance": 0.5},
+            {"type": "polyline", "points": [[300, 100], [350, 200], [400, 120]],
+             "width": 8, "cap": "round", "join": "miter"}
+        ]
+    }
+
+Scenes can also be stored as CSV files, .npz files or directories of .npy
+columns; see sceneio.py.
+"""
+
+import argparse
+import json
+import os
+import sys
+from multiprocessing import Pool
+
+import numpy as np
+
+from algorithms import (
+    COVERAGE_DTYPE,
+    FLATTENING_TOLERANCE,
+    bresenham,
+    bresenhamCircle,
+    circularArc,
+    cohenSutherlandClip,
+    cubicBezier,
+    dda,
+    filledCircleSpans,
+    filledEllipseSpans,
+    liangBarskyClip,
+    polygonOutline,
+    polygonSpans,
+    polygonViewportClip,
+    polyline,
+    quadraticBezier,
+    stroke,
+    wuLine,
+)
+from framebuffer import Framebuffer
+
+WIDTH = 800
+HEIGHT = 600
+
+LINE_ALGORITHMS = {"bresenham": bresenham, "dda": dda}
+CLIP_ALGORITHMS = {
+    "cohen-sutherland": cohenSutherlandClip,
+    "liang-barsky": liangBarskyClip,
+}
+FORMATS = {"ppm": "toPPM", "pgm": "toPGM", "png": "toPNG"}
+
+# The primitives drawn as strokes when their "width" is above one pixel
+STROKED = ("line", "polyline", "bezier", "arc")
+
+
+def loadScene(path):
+    """
+    Loads a scene from a JSON file.
+
+    Args:
+        path (str): The path of the scene file.
+
+    Returns:
+        dict: The scene.
+    """
+    with open(path) as f:
+        return json.load(f)
+
+
+def lineEndpoints(primitive, viewport=None):
+    """
+    Returns the integer endpoints of a line primitive, clipped to the viewport if its "clip" key is set.
+
+    Args:
+        primitive (dict): A line primitive of a scene.
+        viewport (tuple, optional): The viewport (x_min, y_min, x_max, y_max) used by clipped lines.
+
+    Returns:
+        tuple: The endpoints (x0, y0, x1, y1), or None if the line is clipped away.
+    """
+    x0, y0, x1, y1 = (int(v) for v in primitive["points"])
+    clip = primitive.get("clip")
+    if clip is None:
+        return x0, y0, x1, y1
+    if viewport is None:
+        raise ValueError("Clipped lines require a scene viewport")
+    result = CLIP_ALGORITHMS[clip](x0, y0, x1, y1, *viewport)
+    if result is None:
+        return None
+    return tuple(int(round(v)) for v in result)
+
+
+def rasterizePrimitive(primitive, viewport=None):
+    """
+    Rasterizes a single scene primitive.
+
+    Args:
+        primitive (dict): A line, circle, polygon, polyline, bezier or arc primitive of a scene.
+        viewport (tuple, optional): The viewport (x_min, y_min, x_max, y_max) used by clipped lines.
+
+    Returns:
+        list: A list or an (M, 2) array of points representing the primitive.
+    """
+    kind = primitive.get("type", "line")
+    if kind == "circle":
+        x_center, y_center = primitive["center"]
+        return bresenhamCircle(int(x_center), int(y_center), int(primitive["radius"]))
+    if kind == "polygon":
+        return polygonOutline(polygonVertices(primitive, viewport))
+    if kind == "polyline":
+        return polyline(
+            np.asarray(primitive["points"], dtype=np.float64).reshape(-1, 2),
+            primitive.get("closed", False),
+            primitive.get("algorithm", "bresenham"),
+        )
+    if kind in ("bezier", "arc"):
+        return polyline(
+            curveVertices(primitive), algorithm=primitive.get("algorithm", "bresenham")
+        )
+    if kind != "line":
+        raise ValueError("Unknown primitive type: %r" % kind)
+
+    endpoints = lineEndpoints(primitive, viewport)
+    if endpoints is None:
+        return []
+    x0, y0, x1, y1 = endpoints
+    if (x0, y0) == (x1, y1):
+        return [(x0, y0)]
+    return LINE_ALGORITHMS[primitive.get("algorithm", "bresenham")](x0, y0, x1, y1)
+
+
+def curveVertices(primitive):
+    """
+    Flattens a curve primitive into the vertices of a polyline.
+
+    Bézier curves have three or four "points", the first and last being the
+    endpoints. Arcs have a "center", a "radius" and the start and end
+    "angles" in degrees. Both may set the flattening "tolerance" in pixels.
+
+    Args:
+        primitive (dict): A bezier or arc primitive of a scene.
+
+    Returns:
+        numpy.ndarray: The (M, 2) vertices of the polyline.
+    """
+    tolerance = primitive.get("tolerance", FLATTENING_TOLERANCE)
+    if primitive["type"] == "arc":
+        x_center, y_center = primitive["center"]
+        start, end = primitive["angles"]
+        return circularArc(
+            x_center, y_center, primitive["radius"], start, end, tolerance
+        )
+    points = np.asarray(primitive["points"], dtype=np.float64).ravel()
+    if len(points) == 6:
+        return quadraticBezier(*points, tolerance=tolerance)
+    if len(points) == 8:
+        return cubicBezier(*points, tolerance=tolerance)
+    raise ValueError("Bézier curves need 3 or 4 points, got %d" % (len(points) // 2))
+
+
+def antialiasPrimitive(primitive, viewport=None):
+    """
+    Rasterizes an anti-aliased scene primitive with its pixel coverage.
+
+    Only lines whose "algorithm" is "wu" are anti-aliased. Their endpoints,
+    clipped to the viewport if requested, are not rounded.
+
+    Args:
+        primitive (dict): A primitive of a scene.
+        viewport (tuple, optional): The viewport (x_min, y_min, x_max, y_max) used by clipped lines.
+
+    Returns:
+        numpy.ndarray: An (M,) array of COVERAGE_DTYPE records (x, y, coverage), or None if the primitive is not anti-aliased.
+    """
+    if primitive.get("type", "line") != "line" or primitive.get("algorithm") != "wu":
+        return None
+    points = [float(v) for v in primitive["points"]]
+    clip = primitive.get("clip")
+    if clip is not None:
+        if viewport is None:
+            raise ValueError("Clipped lines require a scene viewport")
+        points = CLIP_ALGORITHMS[clip](*points, *viewport)
+        if points is None:
+            return np.empty(0, dtype=COVERAGE_DTYPE)
+    return wuLine(*points)
+
+
+def polygonVertices(primitive, viewport=None):
+    """
+    Returns the vertices of a polygon primitive, clipped to the viewport if its "clip" key is true.
+
+    Args:
+        primitive (dict): A polygon primitive of a scene.
+        viewport (tuple, optional): The viewport (x_min, y_min, x_max, y_max) used by clipped polygons.
+
+    Returns:
+        array_like: The (N, 2) vertices of the polygon.
+    """
+    if not primitive.get("clip", False):
+        return primitive["points"]
+    if viewport is None:
+        raise ValueError("Clipped polygons require a scene viewport")
+    return polygonViewportClip(primitive["points"], *viewport)
+
+
+def strokePath(primitive, viewport=None):
+    """
+    Returns the path stroked by a line, polyline or curve primitive.
+
+    Args:
+        primitive (dict): A line, polyline, bezier or arc primitive of a scene.
+        viewport (tuple, optional): The viewport (x_min, y_min, x_max, y_max) used by clipped lines.
+
+    Returns:
+        tuple: A tuple (vertices, closed) with the (N, 2) vertices of the path
+        and whether it is closed.
+    """
+    kind = primitive.get("type", "line")
+    if kind in ("bezier", "arc"):
+        return curveVertices(primitive), False
+    points = np.asarray(primitive["points"], dtype=np.float64).reshape(-1, 2)
+    if kind == "polyline":
+        return points, primitive.get("closed", False)
+    clip = primitive.get("clip")
+    if clip is not None:
+        if viewport is None:
+            raise ValueError("Clipped lines require a scene viewport")
+        result = CLIP_ALGORITHMS[clip](*points.ravel(), *viewport)
+        points = np.empty((0, 2)) if result is None else np.reshape(result, (2, 2))
+    return points, False
+
+
+def fillPrimitive(primitive, viewport=None):
+    """
+    Rasterizes a filled scene primitive as horizontal spans.
+
+    Ellipses are always filled, circles and polygons only when their "fill"
+    key is true. Polygons are filled with their "rule", "evenodd" by default.
+    Lines, polylines and curves wider than one pixel are filled as strokes.
+
+    Args:
+        primitive (dict): A primitive of a scene.
+        viewport (tuple, optional): The viewport (x_min, y_min, x_max, y_max) used by clipped polygons.
+
+    Returns:
+        numpy.ndarray: A (K, 3) array of spans (y, x_start, x_end), or None if the primitive is not filled.
+    """
+    kind = primitive.get("type", "line")
+    if kind in STROKED and primitive.get("width", 1) > 1:
+        vertices, closed = strokePath(primitive, viewport)
+        return stroke(
+            vertices,
+            primitive["width"],
+            primitive.get("cap", "butt"),
+            primitive.get("join", "miter"),
+            closed,
+        )
+    if kind == "ellipse":
+        x_center, y_center = primitive["center"]
+        a, b = primitive["axes"]
+        return filledEllipseSpans(int(x_center), int(y_center), int(a), int(b))
+    if kind == "circle" and primitive.get("fill", False):
+        x_center, y_center = primitive["center"]
+        return filledCircleSpans(int(x_center), int(y_center), int(primitive["radius"]))
+    if kind == "polygon" and primitive.get("fill", False):
+        vertices = polygonVertices(primitive, viewport)
+        return polygonSpans(vertices, primitive.get("rule", "evenodd"))
+    return None
+
+
+def preparePrimitive(primitive, viewport=None):
+    """
+    Rasterizes a scene primitive into the arrays painted by paintPrepared.
+
+    Args:
+        primitive (dict): A primitive of a scene.
+        viewport (tuple, optional): The viewport (x_min, y_min, x_max, y_max) used by clipped primitives.
+
+    Returns:
+        tuple: A tuple (method, arrays, color) where method is the Framebuffer
+        method that paints the arrays: "fillSpans" with the (K, 3) spans,
+        "blend" with the (M, 2) pixels and their (M,) coverage, or "plot" with
+        the (M, 2) pixels.
+    """
+    color = primitive.get("color", "black")
+    spans = fillPrimitive(primitive, viewport)
+    if spans is not None:
+        return "fillSpans", (np.asarray(spans, dtype=np.int32).reshape(-1, 3),), color
+    records = antialiasPrimitive(primitive, viewport)
+    if records is not None:
+        pixels = np.stack([records["x"], records["y"]], axis=1)
+        return "blend", (pixels, records["coverage"]), color
+    pixels = rasterizePrimitive(primitive, viewport)
+    return "plot", (np.asarray(pixels, dtype=np.int32).reshape(-1, 2),), color
+
+
+def paintPrepared(framebuffer, prepared, clip=None):
+    """
+    Paints a primitive rasterized by preparePrimitive into a framebuffer.
+
+    Args:
+        framebuffer (Framebuffer): The framebuffer to paint into.
+        prepared (tuple): The result of preparePrimitive.
+        clip (tuple, optional): A half-open rectangle (x0, y0, x1, y1) to restrict the writes to.
+    """
+    method, arrays, color = prepared
+    getattr(framebuffer, method)(*arrays, color, clip=clip)
+
+
+def paintPrimitive(framebuffer, primitive, viewport=None, clip=None):
+    """
+    Rasterizes a scene primitive and paints it into a framebuffer.
+
+    Args:
+        framebuffer (Framebuffer): The framebuffer to paint into.
+        primitive (dict): A primitive of a scene.
+        viewport (tuple, optional): The viewport (x_min, y_min, x_max, y_max) used by clipped primitives.
+        clip (tuple, optional): A half-open rectangle (x0, y0, x1, y1) to restrict the writes to.
+    """
+    paintPrepared(framebuffer, preparePrimitive(primitive, viewport), clip)
+
+
+def renderScene(scene):
+    """
+    Renders a scene into a new framebuffer.
+
+    Args:
+        scene (dict): The scene to render.
+
+    Returns:
+        Framebuffer: The rendered image.
+    """
+    framebuffer = Framebuffer(
+        scene.get("width", WIDTH),
+        scene.get("height", HEIGHT),
+        background=scene.get("background", "white"),
+    )
+    viewport = scene.get("viewport")
+    for primitive in scene.get("primitives", []):
+        paintPrimitive(framebuffer, primitive, viewport)
+    return framebuffer
+
+
+def writeImage(framebuffer, path, format=None):
+    """
+    Writes a framebuffer to an image file.
+
+    Args:
+        framebuffer (Framebuffer): The image to write.
+        path (str): The output path.
+        format (str, optional): One of "ppm", "pgm" or "png". Defaults to the path's extension.
+    """
+    if format is None:
+        format = os.path.splitext(path)[1].lstrip(".").lower() or "ppm"
+    if format not in FORMATS:
+        raise ValueError("Unsupported image format: %r" % format)
+    with open(path, "wb") as f:
+        f.write(getattr(framebuffer, FORMATS[format])())
+
+
+def isColumnar(path):
+    """
+    Tells whether a path holds a scene in one of the formats of sceneio.py.
+
+    Args:
+        path (str): A scene file or directory.
+
+    Returns:
+        bool: True for .csv and .npz files and directories with a meta.json file.
+    """
+    if os.path.isdir(path):
+        return os.path.exists(os.path.join(path, "meta.json"))
+    return path.endswith((".csv", ".npz"))
+
+
+def renderFile(job):
+    """
+    Renders a scene file to an image file.
+
+    Args:
+        job (tuple): A tuple (scene_path, output_path, format).
+
+    Returns:
+        str: The output path.
+    """
+    scene_path, output_path, format = job
+    if isColumnar(scene_path):
+        import sceneio
+
+        framebuffer = sceneio.renderArrays(sceneio.loadScene(scene_path))
+    else:
+        framebuffer = renderScene(loadScene(scene_path))
+    writeImage(framebuffer, output_path, format)
+    return output_path
+
+
+def render(source, output, format=None, jobs=None, out_of_core=False):
+    """
+    Renders a scene file, or every scene file of a directory.
+
+    Directories are rendered in parallel by a pool of worker processes, one
+    image per scene, named after the scene file. A single scene is rendered
+    serially, or tile by tile with tiling.renderSceneTiled when jobs is given.
+    With out_of_core, a single scene is rendered tile by tile straight into a
+    memory-mapped PPM file by tiling.renderSceneToFile, for images larger
+    than the memory.
+
+    Args:
+        source (str): A scene file or a directory of scene files.
+        output (str): The output image, or the output directory when source is a directory.
+        format (str, optional): The image format. Defaults to the output's extension, or "ppm" for directories.
+        jobs (int, optional): The number of worker processes. Defaults to the number of CPUs.
+        out_of_core (bool, optional): Render a single scene into a memory-mapped PPM file. Defaults to False.
+
+    Returns:
+        list: The paths of the written images.
+    """
+    if not os.path.isdir(source) or isColumnar(source):
+        if jobs is None and not out_of_core:
+            return [renderFile((source, output, format))]
+        from tiling import renderSceneTiled, renderSceneToFile
+
+        if isColumnar(source):
+            import sceneio
+
+            scene = sceneio.toScene(sceneio.loadScene(source))
+        else:
+            scene = loadScene(source)
+        if out_of_core:
+            if (format or os.path.splitext(output)[1].lstrip(".").lower()) != "ppm":
+                raise ValueError("Out-of-core rendering only writes PPM images")
+            return [renderSceneToFile(scene, output, jobs=jobs or 1)]
+        writeImage(renderSceneTiled(scene, jobs=jobs), output, format)
+        return [output]
+
+    format = format or "ppm"
+    os.makedirs(output, exist_ok=True)
+    work = [
+        (
+            os.path.join(source, name),
+            os.path.join(output, os.path.splitext(name)[0] + "." + format),
+            format,
+        )
+        for name in sorted(os.listdir(source))
+        if name.endswith(".json") or isColumnar(os.path.join(source, name))
+    ]
+    with Pool(jobs) as pool:
+        return pool.map(renderFile, work)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="cg", description="Computer Graphics Showcase headless renderer"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    render_parser = commands.add_parser("render", help="render scene files to images")
+    render_parser.add_argument("source", help="a scene file or a directory of scenes")
+    render_parser.add_argument(
+        "-o", "--output", required=True, help="output image or directory"
+    )
+    render_parser.add_argument("-f", "--format", choices=sorted(FORMATS))
+    render_parser.add_argument(
+        "-j", "--jobs", type=int, help="worker processes for directories or tiles"
+    )
+    render_parser.add_argument(
+        "--out-of-core",
+        action="store_true",
+        help="render a single scene tile by tile into a memory-mapped PPM file",
+    )
+
+    args = parser.parse_args(argv)
+    if args.command == "render":
+        paths = render(
+            args.source, args.output, args.format, args.jobs, args.out_of_core
+        )
+        for path in paths:
+            print(path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,350 @@
+import struct
+import zlib
+
+import numpy as np
+
+# RGB values of the color names used by the application
+COLORS = {
+    "white": (255, 255, 255),
+    "black": (0, 0, 0),
+    "red": (255, 0, 0),
+    "green": (0, 255, 0),
+    "blue": (0, 0, 255),
+    "yellow": (255, 255, 0),
+    "cyan": (0, 255, 255),
+    "magenta": (255, 0, 255),
+    "gray": (190, 190, 190),
+}
+
+
+def toRGBA(color):
+    """
+    Converts a color to an RGBA tuple.
+
+    Args:
+        color (str or tuple): A color name from COLORS, a "#rrggbb" string,
+            or an RGB/RGBA tuple of integers in the range 0-255.
+
+    Returns:
+        tuple: A tuple (r, g, b, a) of integers in the range 0-255.
+
+    """
+    if isinstance(color, str):
+        if color.startswith("#") and len(color) == 7:
+            color = tuple(int(color[i : i + 2], 16) for i in (1, 3, 5))
+        elif color.lower() in COLORS:
+            color = COLORS[color.lower()]
+        else:
+            raise ValueError("Unknown color: %r" % color)
+    color = tuple(int(c) for c in color)
+    if len(color) == 3:
+        color += (255,)
+    if len(color) != 4:
+        raise ValueError("A color must have 3 or 4 components, got %r" % (color,))
+    return color
+
+
+class Framebuffer:
+    """
+    An off-screen RGBA image that rasterized pixels are written into.
+
+    The pixels are stored in a (height, width, 4) uint8 array indexed as
+    pixels[y, x]. Every write grows a dirty rectangle so that only the part
+    of the image that changed has to be uploaded to the screen.
+
+    The pixels can also be an existing array, such as a view of shared
+    memory, in which case they are drawn into as they are, without clearing.
+    """
+
+    def __init__(self, width, height, background="white", pixels=None):
+        self.width = width
+        self.height = height
+        self.background = toRGBA(background)
+        self.dirty = None
+        if pixels is None:
+            self.pixels = np.empty((height, width, 4), dtype=np.uint8)
+            self.clear()
+        elif pixels.shape != (height, width, 4) or pixels.dtype != np.uint8:
+            raise ValueError(
+                "pixels must be a (%d, %d, 4) uint8 array, got %s %s"
+                % (height, width, pixels.dtype, pixels.shape)
+            )
+        else:
+            self.pixels = pixels
+
+    def clear(self, color=None):
+        """
+        Fills the whole framebuffer with a color.
+
+        Args:
+            color (str or tuple, optional): The fill color. Defaults to the background.
+        """
+        self.pixels[:] = self.background if color is None else toRGBA(color)
+        self.markDirty(0, 0, self.width, self.height)
+
+    def markDirty(self, x0, y0, x1, y1):
+        """
+        Grows the dirty rectangle to include the half-open rectangle [x0, x1) x [y0, y1).
+
+        Args:
+            x0 (int): The minimum x-coordinate.
+            y0 (int): The minimum y-coordinate.
+            x1 (int): The maximum x-coordinate, exclusive.
+            y1 (int): The maximum y-coordinate, exclusive.
+        """
+        x0, y0 = max(int(x0), 0), max(int(y0), 0)
+        x1, y1 = min(int(x1), self.width), min(int(y1), self.height)
+        if x0 >= x1 or y0 >= y1:
+            return
+        if self.dirty is not None:
+            dx0, dy0, dx1, dy1 = self.dirty
+            x0, y0, x1, y1 = min(x0, dx0), min(y0, dy0), max(x1, dx1), max(y1, dy1)
+        self.dirty = (x0, y0, x1, y1)
+
+    def _clipRect(self, clip):
+        """
+        Intersects a rectangle with the bounds of the framebuffer.
+
+        Args:
+            clip (tuple): The half-open rectangle (x0, y0, x1, y1), or None for the whole framebuffer.
+
+        Returns:
+            tuple: The clipped rectangle (x0, y0, x1, y1).
+        """
+        if clip is None:
+            return 0, 0, self.width, self.height
+        x0, y0, x1, y1 = clip
+        return max(x0, 0), max(y0, 0), min(x1, self.width), min(y1, self.height)
+
+    def plot(self, pixels, color, size=1, clip=None):
+        """
+        Writes a set of pixels to the framebuffer.
+
+        Pixels that fall outside the framebuffer, or outside the clip rectangle,
+        are discarded.
+
+        Args:
+            pixels (array_like): An (M, 2) array or a list of (x, y) points.
+            color (str or tuple): The color of the pixels.
+            size (int, optional): The side of the square drawn for each pixel. Defaults to 1.
+            clip (tuple, optional): A half-open rectangle (x0, y0, x1, y1) to restrict the writes to.
+        """
+        pixels = np.asarray(pixels, dtype=np.int64).reshape(-1, 2)
+        if not len(pixels):
+            return
+        rgba = toRGBA(color)
+        cx0, cy0, cx1, cy1 = self._clipRect(clip)
+        xs, ys = pixels[:, 0], pixels[:, 1]
+        for oy in range(size):
+            for ox in range(size):
+                x, y = xs + ox, ys + oy
+                inside = (x >= cx0) & (x < cx1) & (y >= cy0) & (y < cy1)
+                self.pixels[y[inside], x[inside]] = rgba
+        self.markDirty(
+            max(xs.min(), cx0),
+            max(ys.min(), cy0),
+            min(xs.max() + size, cx1),
+            min(ys.max() + size, cy1),
+        )
+
+    def plotColors(self, pixels, colors, clip=None):
+        """
+        Writes a set of pixels, each with its own color.
+
+        When a pixel is listed more than once, the last color listed wins, as
+        if the pixels were plotted one at a time in order.
+
+        Args:
+            pixels (array_like): An (M, 2) array of (x, y) points.
+            colors (array_like): An (M, 4) uint8 array of RGBA colors.
+            clip (tuple, optional): A half-open rectangle (x0, y0, x1, y1) to restrict the writes to.
+        """
+        pixels = np.asarray(pixels, dtype=np.int64).reshape(-1, 2)
+        colors = np.asarray(colors, dtype=np.uint8).reshape(-1, 4)
+        cx0, cy0, cx1, cy1 = self._clipRect(clip)
+        xs, ys = pixels[:, 0], pixels[:, 1]
+        inside = (xs >= cx0) & (xs < cx1) & (ys >= cy0) & (ys < cy1)
+        if not inside.any():
+            return
+
+        # Keep the last occurrence of every pixel
+        flat = (ys[inside] * self.width + xs[inside])[::-1]
+        flat, last = np.unique(flat, return_index=True)
+        y, x = np.divmod(flat, self.width)
+        self.pixels[y, x] = colors[inside][::-1][last]
+        self.markDirty(x.min(), y.min(), x.max() + 1, y.max() + 1)
+
+    def blend(self, pixels, coverage, color, clip=None):
+        """
+        Blends a color into a set of pixels, weighted by their coverage.
+
+        Every pixel is mixed with the color as color * alpha + pixel * (1 - alpha),
+        where alpha is the coverage scaled by the alpha of the color. Coverages
+        of a pixel listed more than once are combined as 1 - prod(1 - alpha),
+        so the joints of several lines are not blended twice.
+
+        Args:
+            pixels (array_like): An (M, 2) array or a list of (x, y) points.
+            coverage (array_like): The (M,) coverages of the pixels, in the range 0-1.
+            color (str or tuple): The color to blend.
+            clip (tuple, optional): A half-open rectangle (x0, y0, x1, y1) to restrict the writes to.
+        """
+        pixels = np.asarray(pixels, dtype=np.int64).reshape(-1, 2)
+        coverage = np.clip(np.asarray(coverage, dtype=np.float64).reshape(-1), 0, 1)
+        cx0, cy0, cx1, cy1 = self._clipRect(clip)
+        xs, ys = pixels[:, 0], pixels[:, 1]
+        inside = (xs >= cx0) & (xs < cx1) & (ys >= cy0) & (ys < cy1) & (coverage > 0)
+        if not inside.any():
+            return
+
+        rgba = toRGBA(color)
+        flat, inverse = np.unique(
+            ys[inside] * self.width + xs[inside], return_inverse=True
+        )
+        transmittance = np.ones(len(flat))
+        np.multiply.at(transmittance, inverse, 1.0 - coverage[inside] * rgba[3] / 255)
+        alpha = (1.0 - transmittance)[:, None]
+
+        y, x = np.divmod(flat, self.width)
+        current = self.pixels[y, x].astype(np.float64)
+        mixed = current + (np.array(rgba, dtype=np.float64) - current) * alpha
+        self.pixels[y, x, :3] = np.rint(mixed[:, :3]).astype(np.uint8)
+        self.markDirty(x.min(), y.min(), x.max() + 1, y.max() + 1)
+
+    def fillSpans(self, spans, color, clip=None):
+        """
+        Fills a set of horizontal spans.
+
+        Every span is clipped to the framebuffer and the clip rectangle, and
+        all spans are written with a single indexed assignment.
+
+        Args:
+            spans (array_like): A (K, 3) array of inclusive spans (y, x_start, x_end).
+            color (str or tuple): The fill color.
+            clip (tuple, optional): A half-open rectangle (x0, y0, x1, y1) to restrict the writes to.
+        """
+        spans = np.asarray(spans, dtype=np.int64).reshape(-1, 3)
+        cx0, cy0, cx1, cy1 = self._clipRect(clip)
+        y = spans[:, 0]
+        x_start = np.maximum(spans[:, 1], cx0)
+        x_end = np.minimum(spans[:, 2], cx1 - 1)
+        visible = (y >= cy0) & (y < cy1) & (x_start <= x_end)
+        y, x_start, x_end = y[visible], x_start[visible], x_end[visible]
+        if not len(y):
+            return
+
+        lengths = x_end - x_start + 1
+        starts = np.repeat(x_start - np.cumsum(lengths) + lengths, lengths)
+        xs = np.arange(lengths.sum()) + starts
+        self.pixels[np.repeat(y, lengths), xs] = toRGBA(color)
+        self.markDirty(x_start.min(), y.min(), x_end.max() + 1, y.max() + 1)
+
+    def fillRect(self, x0, y0, x1, y1, color):
+        """
+        Fills the half-open rectangle [x0, x1) x [y0, y1) with a color.
+
+        Args:
+            x0 (int): The minimum x-coordinate.
+            y0 (int): The minimum y-coordinate.
+            x1 (int): The maximum x-coordinate, exclusive.
+            y1 (int): The maximum y-coordinate, exclusive.
+            color (str or tuple): The fill color.
+        """
+        x0, y0, x1, y1 = self._clipRect((x0, y0, x1, y1))
+        if x0 >= x1 or y0 >= y1:
+            return
+        self.pixels[y0:y1, x0:x1] = toRGBA(color)
+        self.markDirty(x0, y0, x1, y1)
+
+    def takeDirty(self):
+        """
+        Returns the dirty rectangle and resets it.
+
+        Returns:
+            tuple: The dirty rectangle (x0, y0, x1, y1), or None if nothing changed.
+        """
+        dirty, self.dirty = self.dirty, None
+        return dirty
+
+    def toPPM(self, rect=None):
+        """
+        Encodes a region of the framebuffer as a binary PPM (P6) image.
+
+        The alpha channel is ignored.
+
+        Args:
+            rect (tuple, optional): The region (x0, y0, x1, y1) to encode. Defaults to the whole framebuffer.
+
+        Returns:
+            bytes: The encoded image.
+        """
+        x0, y0, x1, y1 = rect if rect is not None else (0, 0, self.width, self.height)
+        region = np.ascontiguousarray(self.pixels[y0:y1, x0:x1, :3])
+        header = b"P6\n%d %d\n255\n" % (x1 - x0, y1 - y0)
+        return header + region.tobytes()
+
+    def toPGM(self, rect=None):
+        """
+        Encodes a region of the framebuffer as a binary grayscale PGM (P5) image.
+
+        The RGB channels are converted to luma with the ITU-R BT.601 weights
+        and the alpha channel is ignored.
+
+        Args:
+            rect (tuple, optional): The region (x0, y0, x1, y1) to encode. Defaults to the whole framebuffer.
+
+        Returns:
+            bytes: The encoded image.
+        """
+        x0, y0, x1, y1 = rect if rect is not None else (0, 0, self.width, self.height)
+        region = self.pixels[y0:y1, x0:x1, :3].astype(np.float32)
+        gray = np.rint(region @ np.array([0.299, 0.587, 0.114], dtype=np.float32))
+        header = b"P5\n%d %d\n255\n" % (x1 - x0, y1 - y0)
+        return header + gray.astype(np.uint8).tobytes()
+
+    def toPNG(self, rect=None):
+        """
+        Encodes a region of the framebuffer as an RGBA PNG image.
+
+        Args:
+            rect (tuple, optional): The region (x0, y0, x1, y1) to encode. Defaults to the whole framebuffer.
+
+        Returns:
+            bytes: The encoded image.
+        """
+        x0, y0, x1, y1 = rect if rect is not None else (0, 0, self.width, self.height)
+        width, height = x1 - x0, y1 - y0
+
+        # Every scanline is prefixed with filter type 0 (None)
+        raw = np.zeros((height, width * 4 + 1), dtype=np.uint8)
+        raw[:, 1:] = self.pixels[y0:y1, x0:x1].reshape(height, width * 4)
+
+        def chunk(kind, data):
+            crc = zlib.crc32(kind + data) & 0xFFFFFFFF
+            return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", crc)
+
+        header = struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)
+        return (
+            b"\x89PNG\r\n\x1a\n"
+            + chunk(b"IHDR", header)
+            + chunk(b"IDAT", zlib.compress(raw.tobytes()))
+            + chunk(b"IEND", b"")
+        )
+
+    def present(self, photo):
+        """
+        Uploads the dirty rectangle to a Tk PhotoImage of the same size.
+
+        Only the region that changed since the last call is transferred, as a
+        single image put.
+
+        Args:
+            photo (tkinter.PhotoImage): The image displayed on the canvas.
+        """
+        dirty = self.takeDirty()
+        if dirty is None:
+            return
+        x0, y0, _, _ = dirty
+        photo.tk.call(
+            photo.name, "put", self.toPPM(dirty), "-format", "ppm", "-to", x0, y0
+        )
@@ -0,0 +1,178 @@
+import numpy as np
+
+
+class PixelBuffer:
+    """
+    A compact sequence of integer pixels.
+
+    The pixels are stored in a single (N, 2) int32 array, 8 bytes per pixel
+    instead of the 100 or more bytes of a tuple in a list. A PixelBuffer can
+    be iterated and indexed like a list of (x, y) tuples, and is accepted by
+    anything that takes an array of points, such as Framebuffer.plot.
+
+    """
+
+    __slots__ = ("data",)
+
+    def __init__(self, pixels=()):
+        self.data = np.asarray(pixels, dtype=np.int32).reshape(-1, 2)
+
+    def __len__(self):
+        return len(self.data)
+
+    def __iter__(self):
+        return iter(map(tuple, self.data.tolist()))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return PixelBuffer(self.data[index])
+        x, y = self.data[index].tolist()
+        return x, y
+
+    def __array__(self, dtype=None, copy=None):
+        if dtype is None:
+            return self.data
+        return self.data.astype(dtype)
+
+    def __eq__(self, other):
+        if not isinstance(other, PixelBuffer):
+            return NotImplemented
+        return np.array_equal(self.data, other.data)
+
+    def __repr__(self):
+        return "PixelBuffer(%d pixels)" % len(self.data)
+
+    @property
+    def xs(self):
+        """
+        The x-coordinates of the pixels, as a view of the buffer.
+
+        """
+        return self.data[:, 0]
+
+    @property
+    def ys(self):
+        """
+        The y-coordinates of the pixels, as a view of the buffer.
+
+        """
+        return self.data[:, 1]
+
+    @property
+    def nbytes(self):
+        """
+        The memory used by the pixels, in bytes.
+
+        """
+        return self.data.nbytes
+
+    @staticmethod
+    def concatenate(buffers):
+        """
+        Joins several pixel buffers into one.
+
+        Args:
+            buffers (list): The PixelBuffers to join.
+
+        Returns:
+            PixelBuffer: The pixels of every buffer, in order.
+
+        """
+        arrays = [buffer.data for buffer in buffers]
+        if not arrays:
+            return PixelBuffer()
+        return PixelBuffer(np.concatenate(arrays))
+
+    def unique(self):
+        """
+        Removes repeated pixels, keeping the first occurrence of each.
+
+        Returns:
+            PixelBuffer: The distinct pixels, in their original order.
+
+        """
+        keys = self.data.astype(np.int64)
+        keys = (keys[:, 0] << 32) | (keys[:, 1] & 0xFFFFFFFF)
+        _, first = np.unique(keys, return_index=True)
+        return PixelBuffer(self.data[np.sort(first)])
+
+    def clip(self, x_min, y_min, x_max, y_max):
+        """
+        Keeps the pixels inside the half-open rectangle [x_min, x_max) x [y_min, y_max).
+
+        Args:
+            x_min (int): The minimum x-coordinate.
+            y_min (int): The minimum y-coordinate.
+            x_max (int): The maximum x-coordinate, exclusive.
+            y_max (int): The maximum y-coordinate, exclusive.
+
+        Returns:
+            PixelBuffer: The pixels inside the rectangle.
+
+        """
+        xs, ys = self.xs, self.ys
+        inside = (xs >= x_min) & (xs < x_max) & (ys >= y_min) & (ys < y_max)
+        return PixelBuffer(self.data[inside])
+
+    def translate(self, dx, dy):
+        """
+        Moves every pixel by an integer offset.
+
+        Args:
+            dx (int): The offset along the x-axis.
+            dy (int): The offset along the y-axis.
+
+        Returns:
+            PixelBuffer: The moved pixels.
+
+        """
+        return PixelBuffer(self.data + np.array([dx, dy], dtype=np.int32))
+
+    def toList(self):
+        """
+        Converts the pixels to the list of tuples returned by the scalar rasterizers.
+
+        Returns:
+            list: A list of (x, y) tuples.
+
+        """
+        return list(self)
+
+    def rectangles(self, size=1):
+        """
+        Computes the canvas rectangle of every pixel.
+
+        Args:
+            size (int, optional): The side of the square drawn for each pixel. Defaults to 1.
+
+        Returns:
+            numpy.ndarray: An (N, 4) int32 array of rectangles (x0, y0, x1, y1).
+
+        """
+        return np.hstack([self.data, self.data + size])
+
+    def drawOnCanvas(self, canvas, color, size=1):
+        """
+        Draws every pixel as a rectangle on a Tk canvas.
+
+        Args:
+            canvas (tkinter.Canvas): The canvas to draw on.
+            color (str): The color of the pixels.
+            size (int, optional): The side of the square drawn for each pixel. Defaults to 1.
+
+        """
+        for x0, y0, x1, y1 in self.rectangles(size).tolist():
+            canvas.create_rectangle(x0, y0, x1, y1, fill=color, outline=color)
+
+    def drawOnFramebuffer(self, framebuffer, color, size=1, clip=None):
+        """
+        Writes the pixels to a framebuffer with a single indexed assignment.
+
+        Args:
+            framebuffer (Framebuffer): The framebuffer to write to.
+            color (str or tuple): The color of the pixels.
+            size (int, optional): The side of the square drawn for each pixel. Defaults to 1.
+            clip (tuple, optional): A half-open rectangle (x0, y0, x1, y1) to restrict the writes to.
+
+        """
+        framebuffer.plot(self.data, color, size, clip)
@@ -0,0 +1,172 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from algorithms import (
+    FLATTENING_TOLERANCE,
+    bresenham,
+    bresenhamCircle,
+    circularArc,
+    cubicBezier,
+    dda,
+    quadraticBezier,
+)
+
+
+class RasterCache:
+    """
+    A least-recently-used cache of rasterized lines and circles, and of flattened curves.
+
+    Entries are keyed by the algorithm and its integer parameters, and the
+    cache is bounded by the total number of pixels it holds rather than by
+    its number of entries, so a few huge circles cannot keep thousands of
+    short lines out. Circles are stored as offsets from their center, so a
+    cached radius serves every center.
+
+    The cached pixels are returned as read-only (M, 2) int32 arrays, and the
+    vertices of curves as read-only (M, 2) float64 arrays, which count as
+    pixels towards the bound. The cache can be shared between threads.
+    """
+
+    LINE_ALGORITHMS = {"bresenham": bresenham, "dda": dda}
+    CURVES = {"quadratic": quadraticBezier, "cubic": cubicBezier, "arc": circularArc}
+
+    def __init__(self, max_pixels=1000000):
+        self.max_pixels = max_pixels
+        self.entries = OrderedDict()
+        self.pixel_count = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def _get(self, key, rasterize, dtype=np.int32):
+        """
+        Returns the pixels of a key, rasterizing and storing them on a miss.
+
+        Args:
+            key (tuple): The key of the entry.
+            rasterize (callable): A function computing the points of the entry.
+            dtype (numpy.dtype, optional): The dtype of the points. Defaults to int32.
+
+        Returns:
+            numpy.ndarray: The read-only (M, 2) points.
+        """
+        with self._lock:
+            pixels = self.entries.get(key)
+            if pixels is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return pixels
+            self.misses += 1
+
+        # Rasterize without holding the lock, so other threads are not blocked
+        pixels = np.array(rasterize(), dtype=dtype).reshape(-1, 2)
+        pixels.flags.writeable = False
+        if len(pixels) > self.max_pixels:
+            # Too large to cache without evicting everything else
+            return pixels
+        with self._lock:
+            if key not in self.entries:
+                self.entries[key] = pixels
+                self.pixel_count += len(pixels)
+            while self.pixel_count > self.max_pixels:
+                _, evicted = self.entries.popitem(last=False)
+                self.pixel_count -= len(evicted)
+                self.evictions += 1
+        return pixels
+
+    def line(self, x0, y0, x1, y1, algorithm="bresenham"):
+        """
+        Rasterizes a line, or returns its cached pixels.
+
+        Args:
+            x0 (int): The x-coordinate of the starting point.
+            y0 (int): The y-coordinate of the starting point.
+            x1 (int): The x-coordinate of the ending point.
+            y1 (int): The y-coordinate of the ending point.
+            algorithm (str, optional): "bresenham" or "dda". Defaults to "bresenham".
+
+        Returns:
+            numpy.ndarray: The read-only (M, 2) int32 pixels of the line.
+        """
+        if algorithm not in self.LINE_ALGORITHMS:
+            raise ValueError("Unknown line algorithm: %r" % algorithm)
+        x0, y0, x1, y1 = int(x0), int(y0), int(x1), int(y1)
+        if (x0, y0) == (x1, y1):
+            return self._get((algorithm, x0, y0, x1, y1), lambda: [(x0, y0)])
+        return self._get(
+            (algorithm, x0, y0, x1, y1),
+            lambda: self.LINE_ALGORITHMS[algorithm](x0, y0, x1, y1),
+        )
+
+    def circle(self, x_center, y_center, r):
+        """
+        Rasterizes a circle, or translates the cached pixels of its radius.
+
+        Args:
+            x_center (int): The x-coordinate of the center of the circle.
+            y_center (int): The y-coordinate of the center of the circle.
+            r (int): The radius of the circle.
+
+        Returns:
+            numpy.ndarray: The (M, 2) int32 pixels of the circle.
+        """
+        offsets = self._get(("circle", int(r)), lambda: bresenhamCircle(0, 0, int(r)))
+        return offsets + np.array([x_center, y_center], dtype=np.int32)
+
+    def curve(self, kind, params, tolerance=FLATTENING_TOLERANCE):
+        """
+        Flattens a curve into a polyline, or returns its cached vertices.
+
+        Entries are keyed by the tolerance as well, so flattening the same
+        curve for different zoom levels keeps one polyline per level.
+
+        Args:
+            kind (str): "quadratic", "cubic" or "arc".
+            params (sequence): The arguments of algorithms.quadraticBezier,
+                algorithms.cubicBezier or algorithms.circularArc.
+            tolerance (float, optional): The largest distance in pixels between
+                the curve and its polyline. Defaults to FLATTENING_TOLERANCE.
+
+        Returns:
+            numpy.ndarray: The read-only (M, 2) float64 vertices of the polyline.
+        """
+        if kind not in self.CURVES:
+            raise ValueError("Unknown curve: %r" % kind)
+        params = tuple(float(v) for v in params)
+        return self._get(
+            (kind, float(tolerance)) + params,
+            lambda: self.CURVES[kind](*params, tolerance=tolerance),
+            np.float64,
+        )
+
+    def stats(self):
+        """
+        Returns the cache's counters.
+
+        Returns:
+            dict: The hits, misses, evictions, entries and pixels of the cache.
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self.entries),
+            "pixels": self.pixel_count,
+        }
+
+    def clear(self):
+        """
+        Removes every entry from the cache. The counters are kept.
+        """
+        with self._lock:
+            self.entries = OrderedDict()
+            self.pixel_count = 0
@@ -0,0 +1,453 @@
+import numpy as np
+
+from algorithms import bresenham, bresenhamCircle, dda, transformPoints, wuLine
+from profiler import Profiler
+from spatial import GridIndex
+
+LINE_ALGORITHMS = {"bresenham": bresenham, "dda": dda, "wu": wuLine}
+
+
+class Primitive:
+    """
+    A line or circle retained by a Scene.
+
+    Lines store their geometry as (x0, y0, x1, y1) and circles as
+    (x_center, y_center, r), in float. The optional 3x3 transform is applied
+    to the points of the geometry and the result is only rounded to integers
+    when the primitive is rasterized. Anti-aliased "wu" lines are rasterized
+    from the unrounded points and also cache the coverage of their pixels.
+    """
+
+    __slots__ = (
+        "id",
+        "kind",
+        "geometry",
+        "color",
+        "algorithm",
+        "transform",
+        "_bbox",
+        "_pixels",
+        "_coverage",
+    )
+
+    def __init__(self, id, kind, geometry, color, algorithm=None, transform=None):
+        self.id = id
+        self.kind = kind
+        self.geometry = tuple(float(v) for v in geometry)
+        self.color = color
+        self.algorithm = algorithm
+        self.transform = transform
+        self.invalidate()
+
+    def invalidate(self):
+        """
+        Discards the cached bounding box and rasterization after a geometry change.
+        """
+        self._bbox = None
+        self._pixels = None
+        self._coverage = None
+
+    def copy(self):
+        """
+        Returns a copy of the primitive without its cached rasterization.
+
+        A copy can be rasterized on another thread while the original is changed.
+
+        Returns:
+            Primitive: The copy.
+        """
+        return Primitive(
+            self.id,
+            self.kind,
+            self.geometry,
+            self.color,
+            self.algorithm,
+            self.transform,
+        )
+
+    def adopt(self, other):
+        """
+        Takes the rasterization of a copy if the primitive has not changed since it was made.
+
+        Args:
+            other (Primitive): A rasterized copy of the primitive.
+
+        Returns:
+            bool: True if the rasterization was taken.
+        """
+        if (
+            self._pixels is not None
+            or other._pixels is None
+            or other.geometry != self.geometry
+            or other.transform is not self.transform
+            or other.algorithm != self.algorithm
+        ):
+            return False
+        self._pixels = other._pixels
+        self._coverage = other._coverage
+        return True
+
+    def points(self):
+        """
+        Returns the transformed, unrounded control points of the primitive.
+
+        Returns:
+            numpy.ndarray: A (2, 2) array of line endpoints or a (1, 2) array holding the circle center.
+        """
+        if self.kind == "line":
+            points = np.array(self.geometry, dtype=np.float64).reshape(2, 2)
+        else:
+            points = np.array([self.geometry[:2]], dtype=np.float64)
+        if self.transform is not None:
+            transformPoints(points, self.transform, out=points)
+        return points
+
+    def radius(self):
+        """
+        Returns the radius of a circle, scaled by the transform.
+
+        Returns:
+            float: The radius.
+        """
+        r = self.geometry[2]
+        if self.transform is not None:
+            r *= np.sqrt(abs(np.linalg.det(np.asarray(self.transform)[:2, :2])))
+        return r
+
+    def bbox(self):
+        """
+        Returns the bounding box of the primitive's pixels.
+
+        Returns:
+            tuple: The half-open box (x_min, y_min, x_max, y_max) in integer pixels.
+        """
+        if self._bbox is not None:
+            return self._bbox
+        points = np.rint(self.points()).astype(np.int64)
+        x_min, y_min = points.min(axis=0)
+        x_max, y_max = points.max(axis=0)
+        if self.kind == "circle":
+            r = int(round(self.radius()))
+            x_min, y_min, x_max, y_max = x_min - r, y_min - r, x_max + r, y_max + r
+        elif self.algorithm == "wu":
+            # Wu lines also cover the pixel past the exact line on the minor axis
+            x_min, y_min, x_max, y_max = x_min - 1, y_min - 1, x_max + 1, y_max + 1
+        self._bbox = (int(x_min), int(y_min), int(x_max) + 1, int(y_max) + 1)
+        return self._bbox
+
+    def pixels(self, cache=None):
+        """
+        Returns the rasterized pixels of the primitive, computing them once.
+
+        Args:
+            cache (RasterCache, optional): A cache shared by primitives with the same
+                integer parameters. Anti-aliased lines are never cached.
+
+        Returns:
+            numpy.ndarray: An (M, 2) int32 array of points.
+        """
+        if self._pixels is not None:
+            return self._pixels
+        if self.algorithm == "wu":
+            records = wuLine(*self.points().ravel().tolist())
+            self._pixels = np.stack([records["x"], records["y"]], axis=1)
+            self._coverage = records["coverage"]
+            return self._pixels
+
+        points = np.rint(self.points()).astype(np.int64)
+        if self.kind == "line":
+            (x0, y0), (x1, y1) = points.tolist()
+            if cache is not None:
+                pixels = cache.line(x0, y0, x1, y1, self.algorithm)
+            elif (x0, y0) == (x1, y1):
+                pixels = [(x0, y0)]
+            else:
+                pixels = LINE_ALGORITHMS[self.algorithm](x0, y0, x1, y1)
+        else:
+            ((x_center, y_center),) = points.tolist()
+            r = int(round(self.radius()))
+            if cache is not None:
+                pixels = cache.circle(x_center, y_center, r)
+            else:
+                pixels = bresenhamCircle(x_center, y_center, r)
+        self._pixels = np.asarray(pixels, dtype=np.int32).reshape(-1, 2)
+        return self._pixels
+
+    def coverage(self):
+        """
+        Returns the coverage of the primitive's pixels.
+
+        Returns:
+            numpy.ndarray: The (M,) float32 coverages of an anti-aliased line, or None for other primitives.
+        """
+        if self.algorithm == "wu":
+            self.pixels()
+        return self._coverage
+
+
+class Scene:
+    """
+    A retained model of the lines and circles drawn on the canvas.
+
+    Every primitive caches its rasterization. Changing a primitive only marks
+    the regions it covered before and after the change as damaged, and render
+    repaints those regions from the cached pixels, so unchanged primitives are
+    never rasterized again. The bounding boxes are kept in a GridIndex, so
+    repainting, culling and picking only look at the primitives nearby.
+
+    An optional RasterCache lets primitives that are drawn again with the
+    same integer parameters, or circles of the same radius, reuse pixels
+    that were already rasterized.
+    """
+
+    def __init__(self, cache=None):
+        self.primitives = {}
+        self.cache = cache
+        self.damage = []
+        self.index = GridIndex()
+        self._next_id = 1
+
+    def __len__(self):
+        return len(self.primitives)
+
+    def __contains__(self, id):
+        return id in self.primitives
+
+    def __getitem__(self, id):
+        return self.primitives[id]
+
+    def _add(self, primitive):
+        self.primitives[primitive.id] = primitive
+        self.damage.append(primitive.bbox())
+        self.index.insert(primitive.id, primitive.bbox())
+        self._next_id += 1
+        return primitive.id
+
+    def addLine(self, x0, y0, x1, y1, color="black", algorithm="bresenham"):
+        """
+        Adds a line to the scene.
+
+        Args:
+            x0 (float): The x-coordinate of the starting point.
+            y0 (float): The y-coordinate of the starting point.
+            x1 (float): The x-coordinate of the ending point.
+            y1 (float): The y-coordinate of the ending point.
+            color (str, optional): The color of the line. Defaults to "black".
+            algorithm (str, optional): "bresenham", "dda" or "wu". Defaults to "bresenham".
+
+        Returns:
+            int: The id of the new primitive.
+        """
+        if algorithm not in LINE_ALGORITHMS:
+            raise ValueError("Unknown line algorithm: %r" % algorithm)
+        primitive = Primitive(self._next_id, "line", (x0, y0, x1, y1), color, algorithm)
+        return self._add(primitive)
+
+    def addCircle(self, x_center, y_center, r, color="black"):
+        """
+        Adds a circle to the scene.
+
+        Args:
+            x_center (float): The x-coordinate of the center of the circle.
+            y_center (float): The y-coordinate of the center of the circle.
+            r (float): The radius of the circle.
+            color (str, optional): The color of the circle. Defaults to "black".
+
+        Returns:
+            int: The id of the new primitive.
+        """
+        primitive = Primitive(self._next_id, "circle", (x_center, y_center, r), color)
+        return self._add(primitive)
+
+    def update(self, id, geometry=None, color=None, transform=None):
+        """
+        Changes a primitive of the scene.
+
+        The primitive is only rasterized again if its geometry or transform changed.
+
+        Args:
+            id (int): The id of the primitive.
+            geometry (tuple, optional): The new geometry of the primitive.
+            color (str, optional): The new color of the primitive.
+            transform (numpy.ndarray, optional): The new 3x3 transform of the primitive.
+        """
+        primitive = self.primitives[id]
+        self.damage.append(primitive.bbox())
+        if geometry is not None:
+            primitive.geometry = tuple(float(v) for v in geometry)
+            primitive.invalidate()
+        if transform is not None:
+            primitive.transform = transform
+            primitive.invalidate()
+        if color is not None:
+            primitive.color = color
+        if primitive.bbox() != self.index.bboxes[id]:
+            self.index.insert(id, primitive.bbox())
+        self.damage.append(primitive.bbox())
+
+    def remove(self, id):
+        """
+        Removes a primitive from the scene.
+
+        Args:
+            id (int): The id of the primitive.
+        """
+        self.damage.append(self.primitives.pop(id).bbox())
+        self.index.remove(id)
+
+    def clear(self):
+        """
+        Removes every primitive from the scene.
+        """
+        for id in list(self.primitives):
+            self.remove(id)
+
+    def query(self, x_min, y_min, x_max, y_max):
+        """
+        Finds the primitives whose bounding boxes intersect a rectangle.
+
+        Args:
+            x_min (int): The minimum x-coordinate.
+            y_min (int): The minimum y-coordinate.
+            x_max (int): The maximum x-coordinate, exclusive.
+            y_max (int): The maximum y-coordinate, exclusive.
+
+        Returns:
+            list: The ids of the primitives, in drawing order.
+        """
+        return sorted(self.index.queryRect(x_min, y_min, x_max, y_max))
+
+    def pick(self, x, y, tolerance=2):
+        """
+        Finds the topmost primitive drawn near a point.
+
+        Args:
+            x (int): The x-coordinate of the point.
+            y (int): The y-coordinate of the point.
+            tolerance (int, optional): The maximum distance, in pixels along each axis,
+                between the point and a pixel of the primitive. Defaults to 2.
+
+        Returns:
+            int: The id of the primitive, or None if there is none.
+        """
+        candidates = self.query(
+            x - tolerance, y - tolerance, x + tolerance + 1, y + tolerance + 1
+        )
+        for id in reversed(candidates):
+            pixels = self.primitives[id].pixels(self.cache)
+            distance = np.abs(pixels - np.array([x, y], dtype=np.int32)).max(axis=1)
+            if len(pixels) and distance.min() <= tolerance:
+                return id
+        return None
+
+    def unrasterized(self):
+        """
+        Copies the primitives that the damaged regions need and that are not rasterized yet.
+
+        The copies can be rasterized with rasterize on a background thread and
+        handed back with adopt.
+
+        Returns:
+            list: The copied primitives.
+        """
+        ids = set()
+        for bbox in self.damage:
+            ids |= self.index.queryRect(*bbox)
+        return [
+            self.primitives[id].copy()
+            for id in sorted(ids)
+            if self.primitives[id]._pixels is None
+        ]
+
+    def rasterize(self, primitives):
+        """
+        Rasterizes primitives copied by unrasterized. Safe to call from any thread.
+
+        Args:
+            primitives (list): The copied primitives.
+
+        Returns:
+            list: The same primitives, rasterized.
+        """
+        for primitive in primitives:
+            primitive.pixels(self.cache)
+        return primitives
+
+    def adopt(self, primitives):
+        """
+        Hands the rasterization of copied primitives back to the scene.
+
+        Copies of primitives that were removed or changed in the meantime are ignored.
+
+        Args:
+            primitives (list): The rasterized copies.
+
+        Returns:
+            int: The number of primitives that took their copy's rasterization.
+        """
+        adopted = 0
+        for copy in primitives:
+            primitive = self.primitives.get(copy.id)
+            if primitive is not None and primitive.adopt(copy):
+                adopted += 1
+        return adopted
+
+    def renderRegion(self, framebuffer, region, size=1, profiler=None):
+        """
+        Repaints a region of the scene into a framebuffer.
+
+        The region is filled with the background and the primitives whose
+        bounding boxes intersect it are repainted in insertion order, clipped
+        to the region.
+
+        Args:
+            framebuffer (Framebuffer): The framebuffer to paint into.
+            region (tuple): The half-open rectangle (x_min, y_min, x_max, y_max) to repaint.
+            size (int, optional): The side of the square drawn for each pixel. Defaults to 1.
+            profiler (Profiler, optional): A profiler timing the "rasterize" and "paint" stages.
+
+        Returns:
+            int: The number of primitives repainted.
+        """
+        if profiler is None:
+            profiler = Profiler()
+        x_min, y_min, x_max, y_max = region
+        x_max, y_max = x_max + size - 1, y_max + size - 1
+        clip = (x_min, y_min, x_max, y_max)
+        # Pixels are drawn as squares extending size - 1 past the bounding boxes
+        ids = self.query(x_min - size + 1, y_min - size + 1, x_max, y_max)
+        primitives = [self.primitives[id] for id in ids]
+        with profiler.stage("rasterize"):
+            for primitive in primitives:
+                primitive.pixels(self.cache)
+                primitive.coverage()
+
+        with profiler.stage("paint"):
+            framebuffer.fillRect(*clip, framebuffer.background)
+            for primitive in primitives:
+                pixels = primitive.pixels()
+                if primitive.coverage() is not None:
+                    framebuffer.blend(
+                        pixels, primitive.coverage(), primitive.color, clip
+                    )
+                else:
+                    framebuffer.plot(pixels, primitive.color, size, clip)
+                profiler.add("pixels", len(pixels))
+        return len(primitives)
+
+    def render(self, framebuffer, size=1, profiler=None):
+        """
+        Repaints the damaged regions of the scene into a framebuffer.
+
+        Args:
+            framebuffer (Framebuffer): The framebuffer to paint into.
+            size (int, optional): The side of the square drawn for each pixel. Defaults to 1.
+            profiler (Profiler, optional): A profiler timing the "rasterize" and "paint" stages.
+
+        Returns:
+            int: The number of primitives repainted.
+        """
+        damage, self.damage = self.damage, []
+        return sum(
+            self.renderRegion(framebuffer, region, size, profiler) for region in damage
+        )
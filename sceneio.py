@@ -0,0 +1,998 @@
+"""
+Scene import and export.
+
+Scenes are stored in one of three formats:
+
+- JSON: the scene objects of cg.py.
+- CSV: one primitive per row with the columns type, points, color, algorithm,
+  fill, rule, clip, closed, width, cap, join and tolerance. The points are
+  space-separated numbers: "x0 y0 x1 y1" for lines, "x y r" for circles,
+  "x y a b" for ellipses, "x y r start end" for arcs and the flattened
+  vertices or control points for polygons, polylines and Bézier curves. A
+  first comment row holds the scene's width, height, background and
+  viewport as JSON.
+- Binary: the scene as columns of NumPy arrays, either in a single .npz file
+  or in a directory holding one .npy file per column and a meta.json file.
+  Directories are loaded with np.load(mmap_mode="r"), so even scenes of
+  millions of primitives load in milliseconds and their arrays are paged in
+  as the batch rasterizers and clippers read them.
+
+The columns of a scene are:
+
+    lines            (N, 4) float64  x0, y0, x1, y1
+    line_colors      (N, 4) uint8    RGBA
+    line_algorithms  (N,) uint8      index into LINE_ALGORITHMS
+    line_clip        (N,) uint8      index into CLIP_ALGORITHMS
+    line_widths      (N,) float64    the stroke width, 1 for thin lines
+    line_caps        (N,) uint8      index into STROKE_CAPS
+    line_joins       (N,) uint8      index into STROKE_JOINS
+    circles          (M, 3) float64  x_center, y_center, r
+    circle_colors    (M, 4) uint8
+    circle_fill      (M,) bool
+    ellipses         (E, 4) float64  x_center, y_center, a, b
+    ellipse_colors   (E, 4) uint8
+    polygon_vertices (V, 2) float64  the vertices of every polygon, concatenated
+    polygon_offsets  (P + 1,) int64  the vertices of polygon i are
+                                     polygon_vertices[polygon_offsets[i]:polygon_offsets[i + 1]]
+    polygon_colors   (P, 4) uint8
+    polygon_fill     (P,) bool
+    polygon_rules    (P,) uint8      index into FILL_RULES
+    polygon_clip     (P,) bool
+    polyline_vertices (W, 2) float64 the vertices of every polyline, concatenated
+    polyline_offsets (L + 1,) int64  as polygon_offsets
+    polyline_colors  (L, 4) uint8
+    polyline_algorithms (L,) uint8   index into LINE_ALGORITHMS, "wu" excepted
+    polyline_closed  (L,) bool
+    polyline_widths  (L,) float64
+    polyline_caps    (L,) uint8
+    polyline_joins   (L,) uint8
+    curves           (C, 8) float64  the control points of quadratic (the
+                                     first 6 values) and cubic Bézier curves,
+                                     or x_center, y_center, r, start, end of
+                                     arcs; unused values are 0
+    curve_kinds      (C,) uint8      index into CURVE_KINDS
+    curve_tolerances (C,) float64    the flattening tolerance in pixels
+    curve_colors     (C, 4) uint8
+    curve_algorithms (C,) uint8
+    curve_widths     (C,) float64
+    curve_caps       (C,) uint8
+    curve_joins      (C,) uint8
+
+Columnar scenes keep the primitives of each kind in order, but not the
+order between kinds: renderArrays draws polygons, then ellipses, circles,
+lines, polylines and curves.
+"""
+
+import csv
+import json
+import os
+
+import numpy as np
+
+from algorithms import (
+    FLATTENING_TOLERANCE,
+    STROKE_CAPS,
+    STROKE_JOINS,
+    bresenhamBatch,
+    bresenhamCirclePixels,
+    circularArcBatch,
+    cohenSutherlandClipBatch,
+    cubicBezierBatch,
+    ddaBatch,
+    filledCircleSpansBatch,
+    filledEllipseSpansBatch,
+    liangBarskyClipBatch,
+    polygonOutline,
+    polygonSpans,
+    polygonViewportClip,
+    polylineBatch,
+    quadraticBezierBatch,
+    strokeBatch,
+    wuLineBatch,
+)
+from cg import HEIGHT, WIDTH
+from framebuffer import Framebuffer, toRGBA
+
+LINE_ALGORITHMS = ("bresenham", "dda", "wu")
+CLIP_ALGORITHMS = (None, "cohen-sutherland", "liang-barsky")
+FILL_RULES = ("evenodd", "nonzero")
+CURVE_KINDS = ("quadratic", "cubic", "arc")
+
+# The flattening function of every curve kind and the values of a curve it reads
+CURVE_FLATTENERS = {
+    0: (quadraticBezierBatch, 6),
+    1: (cubicBezierBatch, 8),
+    2: (circularArcBatch, 5),
+}
+
+# The shape after the first axis and the dtype of every column
+COLUMNS = {
+    "lines": ((4,), np.float64),
+    "line_colors": ((4,), np.uint8),
+    "line_algorithms": ((), np.uint8),
+    "line_clip": ((), np.uint8),
+    "line_widths": ((), np.float64),
+    "line_caps": ((), np.uint8),
+    "line_joins": ((), np.uint8),
+    "circles": ((3,), np.float64),
+    "circle_colors": ((4,), np.uint8),
+    "circle_fill": ((), np.bool_),
+    "ellipses": ((4,), np.float64),
+    "ellipse_colors": ((4,), np.uint8),
+    "polygon_vertices": ((2,), np.float64),
+    "polygon_offsets": ((), np.int64),
+    "polygon_colors": ((4,), np.uint8),
+    "polygon_fill": ((), np.bool_),
+    "polygon_rules": ((), np.uint8),
+    "polygon_clip": ((), np.bool_),
+    "polyline_vertices": ((2,), np.float64),
+    "polyline_offsets": ((), np.int64),
+    "polyline_colors": ((4,), np.uint8),
+    "polyline_algorithms": ((), np.uint8),
+    "polyline_closed": ((), np.bool_),
+    "polyline_widths": ((), np.float64),
+    "polyline_caps": ((), np.uint8),
+    "polyline_joins": ((), np.uint8),
+    "curves": ((8,), np.float64),
+    "curve_kinds": ((), np.uint8),
+    "curve_tolerances": ((), np.float64),
+    "curve_colors": ((4,), np.uint8),
+    "curve_algorithms": ((), np.uint8),
+    "curve_widths": ((), np.float64),
+    "curve_caps": ((), np.uint8),
+    "curve_joins": ((), np.uint8),
+}
+META = ("width", "height", "background", "viewport")
+CSV_FIELDS = (
+    "type",
+    "points",
+    "color",
+    "algorithm",
+    "fill",
+    "rule",
+    "clip",
+    "closed",
+    "width",
+    "cap",
+    "join",
+    "tolerance",
+)
+
+
+def _column(name, rows):
+    """
+    Builds a column of a scene from a list of rows.
+
+    Args:
+        name (str): The name of the column in COLUMNS.
+        rows (list): The values of the column, one per row.
+
+    Returns:
+        numpy.ndarray: The column, with the shape and dtype of COLUMNS.
+    """
+    shape, dtype = COLUMNS[name]
+    return np.array(rows, dtype=dtype).reshape((-1,) + shape)
+
+
+def _hexColor(rgba):
+    """
+    Converts an RGBA color to the color of a scene object.
+
+    Args:
+        rgba (array_like): The (4,) RGBA color.
+
+    Returns:
+        str or list: The "#rrggbb" color if it is opaque, and the [r, g, b, a] list otherwise.
+    """
+    r, g, b, a = (int(c) for c in rgba)
+    return "#%02x%02x%02x" % (r, g, b) if a == 255 else [r, g, b, a]
+
+
+def _strokeRows(rows, prefix, primitive):
+    """
+    Appends the width, cap and join of a line, polyline or curve to the rows of a scene.
+
+    Args:
+        rows (dict): The rows of every column, as built by fromScene.
+        prefix (str): The prefix of the columns: "line", "polyline" or "curve".
+        primitive (dict): The primitive.
+    """
+    rows[prefix + "_widths"].append(primitive.get("width", 1))
+    rows[prefix + "_caps"].append(STROKE_CAPS.index(primitive.get("cap", "butt")))
+    rows[prefix + "_joins"].append(STROKE_JOINS.index(primitive.get("join", "miter")))
+
+
+def _strokeKeys(primitive, width, cap, join):
+    """
+    Adds the stroke keys of a line, polyline or curve that differ from the defaults.
+
+    Args:
+        primitive (dict): The primitive.
+        width (float): The stroke width.
+        cap (int): The index of the cap in STROKE_CAPS.
+        join (int): The index of the join in STROKE_JOINS.
+    """
+    if width != 1:
+        primitive["width"] = width
+    if cap:
+        primitive["cap"] = STROKE_CAPS[cap]
+    if join:
+        primitive["join"] = STROKE_JOINS[join]
+
+
+def fromScene(scene):
+    """
+    Converts a scene object of cg.py to columns of NumPy arrays.
+
+    Args:
+        scene (dict): The scene.
+
+    Returns:
+        dict: The columns of the scene and its "width", "height", "background" and "viewport".
+    """
+    rows = {name: [] for name in COLUMNS}
+    vertex_count = 0
+    polyline_vertex_count = 0
+    rows["polygon_offsets"].append(0)
+    rows["polyline_offsets"].append(0)
+    for primitive in scene.get("primitives", []):
+        kind = primitive.get("type", "line")
+        color = toRGBA(primitive.get("color", "black"))
+        algorithm = primitive.get("algorithm", "bresenham")
+        if kind == "line":
+            rows["lines"].append(primitive["points"])
+            rows["line_colors"].append(color)
+            rows["line_algorithms"].append(LINE_ALGORITHMS.index(algorithm))
+            rows["line_clip"].append(CLIP_ALGORITHMS.index(primitive.get("clip")))
+            _strokeRows(rows, "line", primitive)
+        elif kind == "polyline":
+            vertices = np.asarray(primitive["points"], dtype=np.float64).reshape(-1, 2)
+            rows["polyline_vertices"].extend(vertices.tolist())
+            polyline_vertex_count += len(vertices)
+            rows["polyline_offsets"].append(polyline_vertex_count)
+            rows["polyline_colors"].append(color)
+            rows["polyline_algorithms"].append(LINE_ALGORITHMS.index(algorithm))
+            rows["polyline_closed"].append(bool(primitive.get("closed", False)))
+            _strokeRows(rows, "polyline", primitive)
+        elif kind in ("bezier", "arc"):
+            if kind == "arc":
+                values = list(primitive["center"]) + [primitive["radius"]]
+                values += list(primitive["angles"])
+                curve_kind = 2
+            else:
+                values = np.ravel(primitive["points"]).tolist()
+                if len(values) not in (6, 8):
+                    raise ValueError(
+                        "Bézier curves need 3 or 4 points, got %d" % (len(values) // 2)
+                    )
+                curve_kind = 0 if len(values) == 6 else 1
+            rows["curves"].append(values + [0.0] * (8 - len(values)))
+            rows["curve_kinds"].append(curve_kind)
+            rows["curve_tolerances"].append(
+                primitive.get("tolerance", FLATTENING_TOLERANCE)
+            )
+            rows["curve_colors"].append(color)
+            rows["curve_algorithms"].append(LINE_ALGORITHMS.index(algorithm))
+            _strokeRows(rows, "curve", primitive)
+        elif kind == "circle":
+            rows["circles"].append(list(primitive["center"]) + [primitive["radius"]])
+            rows["circle_colors"].append(color)
+            rows["circle_fill"].append(bool(primitive.get("fill", False)))
+        elif kind == "ellipse":
+            rows["ellipses"].append(list(primitive["center"]) + list(primitive["axes"]))
+            rows["ellipse_colors"].append(color)
+        elif kind == "polygon":
+            vertices = np.asarray(primitive["points"], dtype=np.float64).reshape(-1, 2)
+            rows["polygon_vertices"].extend(vertices.tolist())
+            vertex_count += len(vertices)
+            rows["polygon_offsets"].append(vertex_count)
+            rows["polygon_colors"].append(color)
+            rows["polygon_fill"].append(bool(primitive.get("fill", False)))
+            rule = primitive.get("rule", "evenodd")
+            rows["polygon_rules"].append(FILL_RULES.index(rule))
+            rows["polygon_clip"].append(bool(primitive.get("clip", False)))
+        else:
+            raise ValueError("Unknown primitive type: %r" % kind)
+
+    arrays = {name: _column(name, values) for name, values in rows.items()}
+    arrays["width"] = scene.get("width", WIDTH)
+    arrays["height"] = scene.get("height", HEIGHT)
+    arrays["background"] = scene.get("background", "white")
+    arrays["viewport"] = scene.get("viewport")
+    return arrays
+
+
+def toScene(arrays):
+    """
+    Converts the columns of a scene back to a scene object of cg.py.
+
+    The primitives are listed by kind, in the order renderArrays draws them.
+
+    Args:
+        arrays (dict): The columns of the scene.
+
+    Returns:
+        dict: The scene.
+    """
+    primitives = []
+    offsets = np.asarray(arrays["polygon_offsets"]).tolist()
+    vertices = np.asarray(arrays["polygon_vertices"])
+    for i in range(len(offsets) - 1):
+        primitive = {
+            "type": "polygon",
+            "points": vertices[offsets[i] : offsets[i + 1]].tolist(),
+            "color": _hexColor(arrays["polygon_colors"][i]),
+        }
+        if arrays["polygon_fill"][i]:
+            primitive["fill"] = True
+        if arrays["polygon_rules"][i]:
+            primitive["rule"] = FILL_RULES[arrays["polygon_rules"][i]]
+        if arrays["polygon_clip"][i]:
+            primitive["clip"] = True
+        primitives.append(primitive)
+    for (x, y, a, b), color in zip(
+        np.asarray(arrays["ellipses"]).tolist(), arrays["ellipse_colors"]
+    ):
+        primitives.append(
+            {
+                "type": "ellipse",
+                "center": [x, y],
+                "axes": [a, b],
+                "color": _hexColor(color),
+            }
+        )
+    for (x, y, r), color, fill in zip(
+        np.asarray(arrays["circles"]).tolist(),
+        arrays["circle_colors"],
+        arrays["circle_fill"],
+    ):
+        primitive = {
+            "type": "circle",
+            "center": [x, y],
+            "radius": r,
+            "color": _hexColor(color),
+        }
+        if fill:
+            primitive["fill"] = True
+        primitives.append(primitive)
+    for points, color, algorithm, clip, width, cap, join in zip(
+        np.asarray(arrays["lines"]).tolist(),
+        arrays["line_colors"],
+        arrays["line_algorithms"],
+        arrays["line_clip"],
+        np.asarray(arrays["line_widths"]).tolist(),
+        arrays["line_caps"],
+        arrays["line_joins"],
+    ):
+        primitive = {"type": "line", "points": points, "color": _hexColor(color)}
+        if algorithm:
+            primitive["algorithm"] = LINE_ALGORITHMS[algorithm]
+        if clip:
+            primitive["clip"] = CLIP_ALGORITHMS[clip]
+        _strokeKeys(primitive, width, cap, join)
+        primitives.append(primitive)
+    offsets = np.asarray(arrays["polyline_offsets"]).tolist()
+    vertices = np.asarray(arrays["polyline_vertices"])
+    for i in range(len(offsets) - 1):
+        primitive = {
+            "type": "polyline",
+            "points": vertices[offsets[i] : offsets[i + 1]].tolist(),
+            "color": _hexColor(arrays["polyline_colors"][i]),
+        }
+        if arrays["polyline_algorithms"][i]:
+            primitive["algorithm"] = LINE_ALGORITHMS[arrays["polyline_algorithms"][i]]
+        if arrays["polyline_closed"][i]:
+            primitive["closed"] = True
+        _strokeKeys(
+            primitive,
+            float(arrays["polyline_widths"][i]),
+            arrays["polyline_caps"][i],
+            arrays["polyline_joins"][i],
+        )
+        primitives.append(primitive)
+    for values, kind, tolerance, color, algorithm, width, cap, join in zip(
+        np.asarray(arrays["curves"]).tolist(),
+        arrays["curve_kinds"],
+        np.asarray(arrays["curve_tolerances"]).tolist(),
+        arrays["curve_colors"],
+        arrays["curve_algorithms"],
+        np.asarray(arrays["curve_widths"]).tolist(),
+        arrays["curve_caps"],
+        arrays["curve_joins"],
+    ):
+        if kind == 2:
+            x, y, r, start, end = values[:5]
+            primitive = {
+                "type": "arc",
+                "center": [x, y],
+                "radius": r,
+                "angles": [start, end],
+            }
+        else:
+            count = CURVE_FLATTENERS[kind][1]
+            points = np.reshape(values[:count], (-1, 2)).tolist()
+            primitive = {"type": "bezier", "points": points}
+        primitive["color"] = _hexColor(color)
+        if tolerance != FLATTENING_TOLERANCE:
+            primitive["tolerance"] = tolerance
+        if algorithm:
+            primitive["algorithm"] = LINE_ALGORITHMS[algorithm]
+        _strokeKeys(primitive, width, cap, join)
+        primitives.append(primitive)
+
+    scene = {
+        "width": int(arrays["width"]),
+        "height": int(arrays["height"]),
+        "background": arrays["background"],
+        "primitives": primitives,
+    }
+    if arrays.get("viewport") is not None:
+        scene["viewport"] = list(arrays["viewport"])
+    return scene
+
+
+def _meta(arrays):
+    """
+    Returns the values of a scene that are not columns.
+
+    Args:
+        arrays (dict): The columns of the scene.
+
+    Returns:
+        dict: The "width", "height", "background" and "viewport" of the scene.
+    """
+    return {name: arrays.get(name) for name in META}
+
+
+def saveJSON(path, arrays):
+    """
+    Writes the columns of a scene to a JSON scene file.
+
+    Args:
+        path (str): The output path.
+        arrays (dict): The columns of the scene.
+    """
+    with open(path, "w") as f:
+        json.dump(toScene(arrays), f)
+
+
+def loadJSON(path):
+    """
+    Reads a scene from a JSON scene file.
+
+    Args:
+        path (str): The path of the scene file.
+
+    Returns:
+        dict: The columns of the scene.
+    """
+    with open(path) as f:
+        return fromScene(json.load(f))
+
+
+def saveCSV(path, arrays):
+    """
+    Writes the columns of a scene to a CSV file.
+
+    Args:
+        path (str): The output path.
+        arrays (dict): The columns of the scene.
+    """
+    with open(path, "w", newline="") as f:
+        f.write("# %s\n" % json.dumps(_meta(arrays)))
+        writer = csv.writer(f)
+        writer.writerow(CSV_FIELDS)
+        for primitive in toScene(arrays)["primitives"]:
+            if primitive["type"] == "circle":
+                values = primitive["center"] + [primitive["radius"]]
+            elif primitive["type"] == "ellipse":
+                values = primitive["center"] + primitive["axes"]
+            elif primitive["type"] == "arc":
+                values = (
+                    primitive["center"] + [primitive["radius"]] + primitive["angles"]
+                )
+            else:
+                values = np.ravel(primitive["points"]).tolist()
+            color = primitive["color"]
+            clip = primitive.get("clip")
+            writer.writerow(
+                [
+                    primitive["type"],
+                    " ".join("%r" % v for v in values),
+                    color if isinstance(color, str) else " ".join(map(str, color)),
+                    primitive.get("algorithm", ""),
+                    "1" if primitive.get("fill") else "",
+                    primitive.get("rule", ""),
+                    clip if isinstance(clip, str) else "1" if clip else "",
+                    "1" if primitive.get("closed") else "",
+                    "%r" % primitive["width"] if "width" in primitive else "",
+                    primitive.get("cap", ""),
+                    primitive.get("join", ""),
+                    "%r" % primitive["tolerance"] if "tolerance" in primitive else "",
+                ]
+            )
+
+
+def loadCSV(path):
+    """
+    Reads a scene from a CSV file.
+
+    Args:
+        path (str): The path of the scene file.
+
+    Returns:
+        dict: The columns of the scene.
+    """
+    scene = {}
+    primitives = []
+    with open(path, newline="") as f:
+        first = f.readline()
+        if first.startswith("#"):
+            scene.update(
+                (k, v) for k, v in json.loads(first[1:]).items() if v is not None
+            )
+        else:
+            f.seek(0)
+        for row in csv.DictReader(f):
+            values = [float(v) for v in row["points"].split()]
+            kind = row["type"]
+            color = row["color"]
+            if " " in color:
+                color = [int(c) for c in color.split()]
+            primitive = {"type": kind, "color": color or "black"}
+            if kind == "line":
+                primitive["points"] = values
+            elif kind == "circle":
+                primitive["center"], primitive["radius"] = values[:2], values[2]
+            elif kind == "ellipse":
+                primitive["center"], primitive["axes"] = values[:2], values[2:]
+            elif kind == "arc":
+                primitive["center"], primitive["radius"] = values[:2], values[2]
+                primitive["angles"] = values[3:]
+            else:
+                primitive["points"] = np.reshape(values, (-1, 2)).tolist()
+            if row.get("algorithm"):
+                primitive["algorithm"] = row["algorithm"]
+            if row.get("fill"):
+                primitive["fill"] = True
+            if row.get("rule"):
+                primitive["rule"] = row["rule"]
+            if row.get("clip"):
+                primitive["clip"] = True if kind == "polygon" else row["clip"]
+            if row.get("closed"):
+                primitive["closed"] = True
+            for key in ("width", "tolerance"):
+                if row.get(key):
+                    primitive[key] = float(row[key])
+            for key in ("cap", "join"):
+                if row.get(key):
+                    primitive[key] = row[key]
+            primitives.append(primitive)
+    scene["primitives"] = primitives
+    return fromScene(scene)
+
+
+def saveBinary(path, arrays):
+    """
+    Writes the columns of a scene to a .npz file or to a directory of .npy files.
+
+    Args:
+        path (str): A path ending in ".npz", or a directory.
+        arrays (dict): The columns of the scene.
+    """
+    columns = {name: np.asarray(arrays[name]) for name in COLUMNS}
+    if path.endswith(".npz"):
+        np.savez(path, meta=np.array(json.dumps(_meta(arrays))), **columns)
+        return
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, "meta.json"), "w") as f:
+        json.dump(_meta(arrays), f)
+    for name, column in columns.items():
+        np.save(os.path.join(path, name + ".npy"), column)
+
+
+def loadBinary(path, mmap=True):
+    """
+    Reads the columns of a scene from a .npz file or a directory of .npy files.
+
+    Args:
+        path (str): A path ending in ".npz", or a directory.
+        mmap (bool, optional): Memory-map the .npy files of a directory instead of
+            reading them. Defaults to True.
+
+    Columns missing from scenes written before they existed get their
+    default values.
+
+    Returns:
+        dict: The columns of the scene.
+    """
+    if path.endswith(".npz"):
+        with np.load(path) as data:
+            arrays = {name: data[name] for name in COLUMNS if name in data}
+            arrays.update(json.loads(str(data["meta"])))
+        return _withDefaults(arrays)
+    with open(os.path.join(path, "meta.json")) as f:
+        arrays = json.load(f)
+    mode = "r" if mmap else None
+    for name in COLUMNS:
+        column = os.path.join(path, name + ".npy")
+        if os.path.exists(column):
+            arrays[name] = np.load(column, mmap_mode=mode)
+    return _withDefaults(arrays)
+
+
+def _withDefaults(arrays):
+    """
+    Adds the default value of every missing column.
+
+    Only the stroke columns of the lines can be missing next to existing
+    lines. The other missing columns belong to kinds of primitives the
+    scene does not have.
+
+    Args:
+        arrays (dict): The columns of the scene.
+
+    Returns:
+        dict: The same columns, completed.
+    """
+    for name, (shape, dtype) in COLUMNS.items():
+        if name in arrays:
+            continue
+        if name.endswith("_offsets"):
+            arrays[name] = np.zeros(1, dtype=dtype)
+            continue
+        count = len(arrays["line_colors"]) if name.startswith("line_") else 0
+        fill = 1 if name.endswith("_widths") else 0
+        arrays[name] = np.full((count,) + shape, fill, dtype=dtype)
+    return arrays
+
+
+def loadScene(path, mmap=True):
+    """
+    Reads a scene in any format, chosen by the path's extension.
+
+    Args:
+        path (str): A .json, .csv or .npz file, or a directory of .npy files.
+        mmap (bool, optional): Memory-map the columns of a directory. Defaults to True.
+
+    Returns:
+        dict: The columns of the scene.
+    """
+    if path.endswith(".json"):
+        return loadJSON(path)
+    if path.endswith(".csv"):
+        return loadCSV(path)
+    return loadBinary(path, mmap)
+
+
+def saveScene(path, arrays):
+    """
+    Writes a scene in any format, chosen by the path's extension.
+
+    Args:
+        path (str): A .json, .csv or .npz file, or a directory for .npy files.
+        arrays (dict): The columns of the scene.
+    """
+    if path.endswith(".json"):
+        saveJSON(path, arrays)
+    elif path.endswith(".csv"):
+        saveCSV(path, arrays)
+    else:
+        saveBinary(path, arrays)
+
+
+def _runs(values):
+    """
+    Splits an array into runs of equal consecutive rows.
+
+    Args:
+        values (numpy.ndarray): An (N,) or (N, k) array.
+
+    Returns:
+        list: A list of (start, end) pairs, one per run.
+    """
+    if not len(values):
+        return []
+    different = values[1:] != values[:-1]
+    if different.ndim > 1:
+        different = different.any(axis=1)
+    bounds = [0] + (np.flatnonzero(different) + 1).tolist() + [len(values)]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _colorRuns(colors):
+    """
+    Splits an array of colors into runs of equal consecutive colors.
+
+    Args:
+        colors (numpy.ndarray): An (N, 4) array of RGBA colors.
+
+    Returns:
+        list: A list of (start, end, color) tuples.
+    """
+    return [(start, end, tuple(colors[start].tolist())) for start, end in _runs(colors)]
+
+
+def clipLines(arrays, integer=True):
+    """
+    Clips the lines of a scene to its viewport with the batch clippers.
+
+    Integer lines are truncated before clipping and rounded after, like
+    cg.rasterizePrimitive does. Anti-aliased lines keep their exact endpoints.
+
+    Args:
+        arrays (dict): The columns of the scene.
+        integer (bool, optional): Clip the lines as integer lines. Defaults to True.
+
+    Returns:
+        tuple: A tuple (segments, keep) where segments is an (N, 4) array of
+        the lines, clipped where requested, int64 for integer lines and float64
+        otherwise, and keep is an (N,) bool array that is False for lines
+        clipped away entirely.
+    """
+    segments = np.array(arrays["lines"], dtype=np.float64)
+    if integer:
+        segments = np.trunc(segments)
+    codes = np.asarray(arrays["line_clip"])
+    keep = np.ones(len(segments), dtype=bool)
+    for code, clipper in (
+        (1, cohenSutherlandClipBatch),
+        (2, liangBarskyClipBatch),
+    ):
+        selected = np.flatnonzero(codes == code)
+        if not len(selected):
+            continue
+        if arrays.get("viewport") is None:
+            raise ValueError("Clipped lines require a scene viewport")
+        clipped, accepted = clipper(segments[selected], *arrays["viewport"])
+        keep[selected] = accepted
+        if integer:
+            clipped = np.rint(clipped)
+        segments[selected[accepted]] = clipped[accepted]
+    if integer:
+        return segments.astype(np.int64), keep
+    return segments, keep
+
+
+def _paintPaths(framebuffer, vertices, offsets, colors, algorithms, closed, strokes):
+    """
+    Paints paths in order, thin ones as polylines and wide ones as strokes.
+
+    Consecutive paths drawn the same way are rasterized in one batch.
+
+    Args:
+        framebuffer (Framebuffer): The framebuffer to draw into.
+        vertices (numpy.ndarray): The (M, 2) vertices of every path, concatenated.
+        offsets (numpy.ndarray): The (N + 1,) offsets of the paths in vertices.
+        colors (numpy.ndarray): The (N, 4) colors of the paths.
+        algorithms (numpy.ndarray): The (N,) indices of the paths' line algorithms.
+        closed (numpy.ndarray): The (N,) bool closing flags of the paths.
+        strokes (tuple): The (N,) widths, caps and joins of the paths.
+    """
+    widths, caps, joins = strokes
+    wide = widths > 1
+    # Thin paths only differ by algorithm and wide ones by cap and join
+    keys = np.column_stack(
+        [wide, closed, np.where(wide, 0, algorithms), caps * wide, joins * wide]
+    ).astype(np.uint8)
+    for start, end in _runs(keys):
+        first, last = offsets[start], offsets[end]
+        path_vertices = vertices[first:last]
+        path_offsets = offsets[start : end + 1] - first
+        if wide[start]:
+            spans, span_offsets = strokeBatch(
+                path_vertices,
+                path_offsets,
+                widths[start:end],
+                STROKE_CAPS[caps[start]],
+                STROKE_JOINS[joins[start]],
+                bool(closed[start]),
+            )
+            for a, b, color in _colorRuns(colors[start:end]):
+                framebuffer.fillSpans(spans[span_offsets[a] : span_offsets[b]], color)
+            continue
+        pixels, pixel_offsets = polylineBatch(
+            path_vertices,
+            path_offsets,
+            bool(closed[start]),
+            LINE_ALGORITHMS[algorithms[start]],
+        )
+        framebuffer.plotColors(
+            pixels, np.repeat(colors[start:end], np.diff(pixel_offsets), axis=0)
+        )
+
+
+def _strokes(arrays, prefix, selected=slice(None)):
+    """
+    Returns the stroke columns of the lines, polylines or curves of a scene.
+
+    Args:
+        arrays (dict): The columns of the scene.
+        prefix (str): The prefix of the columns: "line", "polyline" or "curve".
+        selected (slice or numpy.ndarray, optional): The rows to return. Defaults to all of them.
+
+    Returns:
+        tuple: A tuple (widths, caps, joins) of (N,) arrays.
+    """
+    return (
+        np.asarray(arrays[prefix + "_widths"], dtype=np.float64)[selected],
+        np.asarray(arrays[prefix + "_caps"])[selected],
+        np.asarray(arrays[prefix + "_joins"])[selected],
+    )
+
+
+def flattenCurves(arrays):
+    """
+    Flattens the curves of a scene into polylines with the batch flatteners.
+
+    Args:
+        arrays (dict): The columns of the scene.
+
+    Returns:
+        tuple: A tuple (vertices, offsets) where vertices is an (M, 2) float64
+        array and offsets is a (C + 1,) array such that the polyline of curve i
+        is vertices[offsets[i]:offsets[i + 1]].
+    """
+    curves = np.asarray(arrays["curves"])
+    kinds = np.asarray(arrays["curve_kinds"])
+    tolerances = np.asarray(arrays["curve_tolerances"])
+    parts, counts = [], [np.zeros(1, dtype=np.int64)]
+    for start, end in _runs(np.column_stack([kinds, tolerances])):
+        flatten, size = CURVE_FLATTENERS[kinds[start]]
+        vertices, offsets = flatten(curves[start:end, :size], tolerances[start])
+        parts.append(vertices)
+        counts.append(np.diff(offsets))
+    vertices = np.concatenate(parts) if parts else np.empty((0, 2))
+    return vertices, np.cumsum(np.concatenate(counts))
+
+
+def renderArrays(arrays, framebuffer=None):
+    """
+    Renders the columns of a scene with the batch rasterizers.
+
+    Polygons are drawn first, then ellipses, circles, lines, polylines and
+    curves, each kind in the order of its columns. Lines, polylines and
+    curves wider than one pixel are filled as strokes. Pixels and spans of every kind are computed for
+    all primitives at once and written with a few array operations.
+
+    Args:
+        arrays (dict): The columns of the scene.
+        framebuffer (Framebuffer, optional): The framebuffer to draw into. Defaults to a new one.
+
+    Returns:
+        Framebuffer: The rendered image.
+    """
+    if framebuffer is None:
+        framebuffer = Framebuffer(
+            int(arrays["width"]), int(arrays["height"]), arrays["background"]
+        )
+    viewport = arrays.get("viewport")
+
+    # Polygons
+    offsets = np.asarray(arrays["polygon_offsets"])
+    vertices = np.asarray(arrays["polygon_vertices"])
+    for i in range(len(offsets) - 1):
+        points = vertices[offsets[i] : offsets[i + 1]]
+        if arrays["polygon_clip"][i]:
+            if viewport is None:
+                raise ValueError("Clipped polygons require a scene viewport")
+            points = polygonViewportClip(points, *viewport)
+        color = tuple(arrays["polygon_colors"][i].tolist())
+        if arrays["polygon_fill"][i]:
+            rule = FILL_RULES[arrays["polygon_rules"][i]]
+            framebuffer.fillSpans(polygonSpans(points, rule), color)
+        else:
+            framebuffer.plot(polygonOutline(points), color)
+
+    # Ellipses
+    ellipses = np.trunc(np.asarray(arrays["ellipses"])).astype(np.int64)
+    spans, span_offsets = filledEllipseSpansBatch(ellipses)
+    for start, end, color in _colorRuns(np.asarray(arrays["ellipse_colors"])):
+        framebuffer.fillSpans(spans[span_offsets[start] : span_offsets[end]], color)
+
+    # Circles, filled ones as spans in runs of the same color
+    circles = np.trunc(np.asarray(arrays["circles"])).astype(np.int64)
+    fill = np.asarray(arrays["circle_fill"], dtype=bool)
+    circle_colors = np.asarray(arrays["circle_colors"])
+    spans, span_offsets = filledCircleSpansBatch(circles)
+    outlines, outline_colors = [], []
+    for start, end, color in _colorRuns(
+        np.column_stack([circle_colors, fill]).astype(np.uint8)
+    ):
+        color = color[:4]
+        if fill[start]:
+            if outlines:
+                framebuffer.plotColors(
+                    np.concatenate(outlines), np.concatenate(outline_colors)
+                )
+                outlines, outline_colors = [], []
+            framebuffer.fillSpans(spans[span_offsets[start] : span_offsets[end]], color)
+            continue
+        for x, y, r in circles[start:end].tolist():
+            pixels = bresenhamCirclePixels(x, y, r).data
+            outlines.append(pixels)
+            outline_colors.append(np.broadcast_to(color, (len(pixels), 4)))
+    if outlines:
+        framebuffer.plotColors(np.concatenate(outlines), np.concatenate(outline_colors))
+
+    # Lines, in runs of aliased, anti-aliased and wide lines to keep their order
+    segments, keep = clipLines(arrays)
+    algorithms = np.asarray(arrays["line_algorithms"])
+    line_colors = np.asarray(arrays["line_colors"])
+    wide = np.asarray(arrays["line_widths"]) > 1
+    antialiased = (algorithms == 2) & ~wide
+    if (antialiased | wide).any():
+        lines, keep_lines = clipLines(arrays, integer=False)
+    for start, end in _runs(np.column_stack([antialiased, wide])):
+        if wide[start]:
+            # Strokes along the exact clipped endpoints, as two-vertex paths
+            selected = start + np.flatnonzero(keep_lines[start:end])
+            _paintPaths(
+                framebuffer,
+                lines[selected].reshape(-1, 2),
+                np.arange(0, 2 * len(selected) + 1, 2),
+                line_colors[selected],
+                algorithms[selected],
+                np.zeros(len(selected), dtype=bool),
+                _strokes(arrays, "line", selected),
+            )
+            continue
+        if antialiased[start]:
+            # Anti-aliased lines are rasterized at once but blended one at a
+            # time, as blend merges the coverage of repeated pixels
+            wu = start + np.flatnonzero(keep_lines[start:end])
+            records, record_offsets = wuLineBatch(lines[wu])
+            pixels = np.stack([records["x"], records["y"]], axis=1)
+            for first, last, color in zip(
+                record_offsets[:-1].tolist(),
+                record_offsets[1:].tolist(),
+                map(tuple, line_colors[wu].tolist()),
+            ):
+                framebuffer.blend(
+                    pixels[first:last], records["coverage"][first:last], color
+                )
+            continue
+
+        # Every pixel of the Bresenham and DDA lines is written at once
+        pixels, owners = [], []
+        for code, rasterizer in ((0, bresenhamBatch), (1, ddaBatch)):
+            selected = start + np.flatnonzero(
+                keep[start:end] & (algorithms[start:end] == code)
+            )
+            if not len(selected):
+                continue
+            points, point_offsets = rasterizer(segments[selected])
+            pixels.append(points)
+            owners.append(np.repeat(selected, np.diff(point_offsets)))
+        if pixels:
+            owners = np.concatenate(owners)
+            order = np.argsort(owners, kind="stable")
+            framebuffer.plotColors(
+                np.concatenate(pixels)[order], line_colors[owners[order]]
+            )
+
+    # Polylines
+    colors = np.asarray(arrays["polyline_colors"])
+    _paintPaths(
+        framebuffer,
+        np.asarray(arrays["polyline_vertices"]),
+        np.asarray(arrays["polyline_offsets"]),
+        colors,
+        np.asarray(arrays["polyline_algorithms"]),
+        np.asarray(arrays["polyline_closed"], dtype=bool),
+        _strokes(arrays, "polyline"),
+    )
+
+    # Curves, flattened into open polylines
+    vertices, offsets = flattenCurves(arrays)
+    colors = np.asarray(arrays["curve_colors"])
+    _paintPaths(
+        framebuffer,
+        vertices,
+        offsets,
+        colors,
+        np.asarray(arrays["curve_algorithms"]),
+        np.zeros(len(colors), dtype=bool),
+        _strokes(arrays, "curve"),
+    )
+    return framebuffer
@@ -0,0 +1,189 @@
+import queue
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class RenderScheduler:
+    """
+    Runs rendering work off the Tk thread and displays it progressively.
+
+    A request has two parts: a work function run on a background thread,
+    and a paint function run back on the Tk thread with the work's result.
+    The paint function returns an iterator and every step of it paints one
+    chunk. Steps run from after() callbacks, as many as fit in the frame
+    budget, so the event loop gets control back between chunks.
+
+    Requests are keyed. A new request with the key of a pending one
+    supersedes it: the old work is cancelled if it has not started, and
+    its result or remaining paint steps are discarded otherwise. Repeated
+    clicks therefore only pay for the last one.
+    """
+
+    def __init__(self, widget, frame_budget=0.008, poll_interval=5):
+        self.widget = widget
+        self.frame_budget = frame_budget
+        self.poll_interval = poll_interval
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.results = queue.Queue()
+        self.generations = {}
+        self.futures = {}
+        self.running = set()
+        self.painting = deque()
+        self._generation = 0
+        self._polling = False
+
+    def submit(self, key, work, paint, error=None):
+        """
+        Schedules a request, superseding any pending request with the same key.
+
+        Args:
+            key (hashable): The key of the request.
+            work (callable): A function of no arguments run on the background thread.
+            paint (callable): A function of the work's result, called on the Tk
+                thread, returning an iterator whose steps each paint one chunk.
+            error (callable, optional): A function called on the Tk thread with the
+                exception raised by work or paint. Defaults to re-raising it.
+        """
+        self._generation += 1
+        generation = self._generation
+        self.generations[key] = generation
+        previous = self.futures.get(key)
+        if previous is not None:
+            previous.cancel()
+        future = self.executor.submit(self._run, key, generation, work, paint, error)
+        self.futures[key] = future
+        self.running.add(future)
+        future.add_done_callback(self.running.discard)
+        self._schedule()
+
+    def cancel(self, key):
+        """
+        Cancels the pending request with a key, if any.
+
+        Args:
+            key (hashable): The key of the request.
+        """
+        self.generations.pop(key, None)
+        future = self.futures.pop(key, None)
+        if future is not None:
+            future.cancel()
+
+    def isCurrent(self, key, generation):
+        """
+        Tells whether a request has not been superseded or cancelled.
+
+        Args:
+            key (hashable): The key of the request.
+            generation (int): The generation of the request.
+
+        Returns:
+            bool: True if the request is the latest one with its key.
+        """
+        return self.generations.get(key) == generation
+
+    @property
+    def idle(self):
+        """
+        True when no request is running or waiting to be painted.
+        """
+        return not self.running and not self.painting and self.results.empty()
+
+    def _run(self, key, generation, work, paint, error):
+        """
+        Runs the work of a request on the background thread.
+
+        The result, or the exception raised by the work, is queued for the
+        Tk thread with the paint and error functions. Requests superseded
+        before they start are skipped.
+
+        Args:
+            key (hashable): The key of the request.
+            generation (int): The generation of the request.
+            work (callable): The work function.
+            paint (callable): The paint function.
+            error (callable): The error function, or None.
+        """
+        if not self.isCurrent(key, generation):
+            return
+        try:
+            result = work()
+        except Exception as e:
+            self.results.put((key, generation, None, error, e))
+        else:
+            self.results.put((key, generation, paint, error, result))
+
+    def _schedule(self):
+        """
+        Schedules a call of _poll on the Tk event loop, unless one is already pending.
+        """
+        if not self._polling:
+            self._polling = True
+            self.widget.after(self.poll_interval, self._poll)
+
+    def _fail(self, error, exception):
+        """
+        Reports an exception raised by the work or paint function of a request.
+
+        Args:
+            error (callable): The error function of the request, or None to re-raise.
+            exception (Exception): The exception.
+        """
+        if error is None:
+            raise exception
+        error(exception)
+
+    def _poll(self):
+        """
+        Starts the paint steps of finished work and runs them within the frame budget.
+
+        Called from after() on the Tk thread. Results of superseded requests
+        are dropped, and failed work is reported with the request's error
+        function. Paint steps then run in request order until the frame
+        budget is spent, and another poll is scheduled while requests are
+        still running or painting.
+        """
+        start = time.perf_counter()
+        try:
+            while True:
+                try:
+                    key, generation, paint, error, result = self.results.get_nowait()
+                except queue.Empty:
+                    break
+                if not self.isCurrent(key, generation):
+                    continue
+                if paint is None:
+                    self._fail(error, result)
+                    continue
+                try:
+                    steps = iter(paint(result))
+                except Exception as e:
+                    self._fail(error, e)
+                    continue
+                self.painting.append((key, generation, steps, error))
+
+            while self.painting and time.perf_counter() - start < self.frame_budget:
+                key, generation, steps, error = self.painting[0]
+                if not self.isCurrent(key, generation):
+                    self.painting.popleft()
+                    continue
+                try:
+                    next(steps)
+                except StopIteration:
+                    self.painting.popleft()
+                except Exception as e:
+                    self.painting.popleft()
+                    self._fail(error, e)
+        finally:
+            self._polling = False
+            if not self.idle:
+                self._schedule()
+
+    def shutdown(self):
+        """
+        Cancels every request and stops the background thread.
+        """
+        for key in list(self.generations):
+            self.cancel(key)
+        self.painting.clear()
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,299 @@
+import numpy as np
+
+
+class GridIndex:
+    """
+    A uniform grid over bounding boxes for point and rectangle queries.
+
+    Every item is registered in each grid cell its bounding box overlaps, so
+    a query only looks at the items of the cells it touches. Items covering
+    more than max_cells cells are kept in a separate list that every query
+    checks, so very large primitives do not flood the grid.
+
+    Items are stored in numbered slots, and the bounding boxes of all slots
+    in an (N, 4) array. Each cell keeps the set of its slots, and an array of
+    them built on first use, so a query tests all its candidates against
+    their boxes with NumPy instead of one at a time.
+
+    Bounding boxes are half-open rectangles (x_min, y_min, x_max, y_max).
+
+    """
+
+    def __init__(self, cell_size=64, max_cells=1024):
+        self.cell_size = cell_size
+        self.max_cells = max_cells
+        self.clear()
+
+    def __len__(self):
+        return len(self.bboxes)
+
+    def __contains__(self, id):
+        return id in self.bboxes
+
+    def _cellRange(self, x_min, y_min, x_max, y_max):
+        """
+        Computes the range of cells overlapped by a half-open rectangle.
+
+        Returns:
+            tuple: The inclusive cell range (cx0, cy0, cx1, cy1).
+
+        """
+        size = self.cell_size
+        return (
+            x_min // size,
+            y_min // size,
+            (max(x_max, x_min + 1) - 1) // size,
+            (max(y_max, y_min + 1) - 1) // size,
+        )
+
+    def _allocate(self, count):
+        """
+        Reserves slots for new items, reusing the slots of removed ones first.
+
+        Args:
+            count (int): The number of slots.
+
+        Returns:
+            numpy.ndarray: The (count,) int64 slots.
+
+        """
+        reused = self.free[len(self.free) - min(count, len(self.free)) :]
+        del self.free[len(self.free) - len(reused) :]
+        start = len(self.ids)
+        fresh = np.arange(start, start + count - len(reused), dtype=np.int64)
+        self.ids.extend([None] * len(fresh))
+        if len(self.ids) > len(self.boxes):
+            boxes = np.zeros((max(len(self.ids), 2 * len(self.boxes)), 4), np.int64)
+            boxes[: len(self.boxes)] = self.boxes
+            self.boxes = boxes
+        return np.concatenate([np.array(reused, dtype=np.int64), fresh])
+
+    def _addToCell(self, key, slots):
+        self.cells.setdefault(key, set()).update(slots)
+        self.cell_arrays.pop(key, None)
+
+    def _cellSlots(self, key):
+        """
+        Returns the slots of a cell as an array.
+
+        Args:
+            key (tuple): The cell (cx, cy).
+
+        Returns:
+            numpy.ndarray: The int64 slots of the cell.
+
+        """
+        slots = self.cell_arrays.get(key)
+        if slots is None:
+            slots = np.fromiter(self.cells.get(key, ()), dtype=np.int64)
+            self.cell_arrays[key] = slots
+        return slots
+
+    def _oversizedSlots(self):
+        if self.oversized_array is None:
+            self.oversized_array = np.fromiter(self.oversized, dtype=np.int64)
+        return self.oversized_array
+
+    def insert(self, id, bbox):
+        """
+        Adds an item to the index, replacing any item with the same id.
+
+        Args:
+            id (hashable): The id of the item.
+            bbox (tuple): The bounding box (x_min, y_min, x_max, y_max) of the item.
+
+        """
+        if id in self.bboxes:
+            self.remove(id)
+        bbox = tuple(int(v) for v in bbox)
+        slot = int(self._allocate(1)[0])
+        self.bboxes[id] = bbox
+        self.slots[id] = slot
+        self.ids[slot] = id
+        self.boxes[slot] = bbox
+        cx0, cy0, cx1, cy1 = self._cellRange(*bbox)
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > self.max_cells:
+            self.oversized.add(slot)
+            self.oversized_array = None
+            return
+        for cy in range(cy0, cy1 + 1):
+            for cx in range(cx0, cx1 + 1):
+                self._addToCell((cx, cy), (slot,))
+
+    def bulkLoad(self, ids, bboxes):
+        """
+        Adds many items to the index at once.
+
+        The cells of all the bounding boxes are computed with NumPy, every
+        (cell, item) pair is sorted by cell, and each cell receives all its
+        items in one update.
+
+        Args:
+            ids (list): The ids of the items.
+            bboxes (array_like): An (N, 4) array of bounding boxes (x_min, y_min, x_max, y_max).
+
+        """
+        ids = list(ids)
+        bboxes = np.asarray(bboxes, dtype=np.int64).reshape(-1, 4)
+        for id in ids:
+            if id in self.bboxes:
+                self.remove(id)
+
+        slots = self._allocate(len(ids))
+        self.boxes[slots] = bboxes
+        slot_list = slots.tolist()
+        for slot, id in zip(slot_list, ids):
+            self.ids[slot] = id
+        self.slots.update(zip(ids, slot_list))
+        self.bboxes.update(zip(ids, map(tuple, bboxes.tolist())))
+
+        size = self.cell_size
+        cx0 = bboxes[:, 0] // size
+        cy0 = bboxes[:, 1] // size
+        cx1 = (np.maximum(bboxes[:, 2], bboxes[:, 0] + 1) - 1) // size
+        cy1 = (np.maximum(bboxes[:, 3], bboxes[:, 1] + 1) - 1) // size
+        columns = cx1 - cx0 + 1
+        cell_counts = columns * (cy1 - cy0 + 1)
+
+        oversized = cell_counts > self.max_cells
+        if oversized.any():
+            self.oversized.update(slots[oversized].tolist())
+            self.oversized_array = None
+        cell_counts[oversized] = 0
+
+        # One (cell, slot) pair for every cell of every item, grouped by cell
+        item = np.repeat(np.arange(len(ids)), cell_counts)
+        starts = np.cumsum(cell_counts) - cell_counts
+        k = np.arange(len(item)) - starts[item]
+        cx = cx0[item] + k % columns[item]
+        cy = cy0[item] + k // columns[item]
+        order = np.lexsort((cx, cy))
+        cx, cy, pair_slots = cx[order], cy[order], slots[item[order]]
+        bounds = np.flatnonzero(np.r_[True, (cx[1:] != cx[:-1]) | (cy[1:] != cy[:-1])])
+        keys = zip(cx[bounds].tolist(), cy[bounds].tolist())
+        groups = np.split(pair_slots, bounds[1:])
+        for key, group in zip(keys, groups):
+            self._addToCell(key, group.tolist())
+
+    def remove(self, id):
+        """
+        Removes an item from the index.
+
+        Args:
+            id (hashable): The id of the item.
+
+        """
+        bbox = self.bboxes.pop(id)
+        slot = self.slots.pop(id)
+        self.ids[slot] = None
+        self.free.append(slot)
+        if slot in self.oversized:
+            self.oversized.discard(slot)
+            self.oversized_array = None
+            return
+        cx0, cy0, cx1, cy1 = self._cellRange(*bbox)
+        for cy in range(cy0, cy1 + 1):
+            for cx in range(cx0, cx1 + 1):
+                cell = self.cells[(cx, cy)]
+                cell.discard(slot)
+                self.cell_arrays.pop((cx, cy), None)
+                if not cell:
+                    del self.cells[(cx, cy)]
+
+    def clear(self):
+        """
+        Removes every item from the index.
+
+        """
+        self.cells = {}
+        self.cell_arrays = {}
+        self.bboxes = {}
+        self.slots = {}
+        self.ids = []
+        self.free = []
+        self.boxes = np.zeros((0, 4), dtype=np.int64)
+        self.oversized = set()
+        self.oversized_array = None
+
+    def _select(self, slots, x_min, y_min, x_max, y_max):
+        """
+        Keeps the slots whose bounding box intersects a half-open rectangle.
+
+        Args:
+            slots (numpy.ndarray): The candidate slots, possibly repeated.
+
+        Returns:
+            set: The ids of the selected items.
+
+        """
+        boxes = self.boxes[slots]
+        hit = (
+            (boxes[:, 0] < x_max)
+            & (boxes[:, 2] > x_min)
+            & (boxes[:, 1] < y_max)
+            & (boxes[:, 3] > y_min)
+        )
+        ids = self.ids
+        return {ids[slot] for slot in slots[hit].tolist()}
+
+    def queryPoint(self, x, y):
+        """
+        Finds the items whose bounding box contains a point.
+
+        Args:
+            x (int): The x-coordinate of the point.
+            y (int): The y-coordinate of the point.
+
+        Returns:
+            set: The ids of the items.
+
+        """
+        key = (x // self.cell_size, y // self.cell_size)
+        if key in self.cells:
+            slots = self._cellSlots(key)
+        else:
+            slots = np.empty(0, dtype=np.int64)
+        if self.oversized:
+            slots = np.concatenate([slots, self._oversizedSlots()])
+        if not len(slots):
+            return set()
+        return self._select(slots, x, y, x + 1, y + 1)
+
+    def queryRect(self, x_min, y_min, x_max, y_max):
+        """
+        Finds the items whose bounding box intersects a half-open rectangle.
+
+        Args:
+            x_min (int): The minimum x-coordinate.
+            y_min (int): The minimum y-coordinate.
+            x_max (int): The maximum x-coordinate, exclusive.
+            y_max (int): The maximum y-coordinate, exclusive.
+
+        Returns:
+            set: The ids of the items.
+
+        """
+        if x_min >= x_max or y_min >= y_max:
+            return set()
+        cx0, cy0, cx1, cy1 = self._cellRange(x_min, y_min, x_max, y_max)
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > len(self.cells):
+            # Fewer occupied cells than cells in the query: scan the grid instead
+            keys = [
+                (cx, cy)
+                for cx, cy in self.cells
+                if cx0 <= cx <= cx1 and cy0 <= cy <= cy1
+            ]
+        else:
+            keys = [
+                (cx, cy)
+                for cy in range(cy0, cy1 + 1)
+                for cx in range(cx0, cx1 + 1)
+                if (cx, cy) in self.cells
+            ]
+        parts = [self._cellSlots(key) for key in keys]
+        if self.oversized:
+            parts.append(self._oversizedSlots())
+        if not parts:
+            return set()
+        slots = parts[0] if len(parts) == 1 else np.concatenate(parts)
+        return self._select(slots, x_min, y_min, x_max, y_max)
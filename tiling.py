@@ -0,0 +1,535 @@
+"""
+Parallel tiled rendering of scene files.
+
+Rendering is split in two steps so that it scales with the number of cores
+and still gives the same image as cg.renderScene:
+
+1. The primitives are rasterized in chunks by a pool of worker processes,
+   each primitive exactly once, into compact int32 arrays, which are split
+   along the square tiles of the image.
+2. The same workers paint every tile's parts of the primitives, in scene
+   order, into a framebuffer the size of the tile. Only the tile's pixels
+   are sent back and copied into the image.
+
+renderSceneToFile renders images too large for the memory, such as map
+exports tens of thousands of pixels wide, tile by tile into a
+memory-mapped PPM file.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+from algorithms import (
+    MITER_LIMIT,
+    bresenhamRangeBatch,
+    liangBarskyClipBatch,
+)
+from cg import (
+    HEIGHT,
+    STROKED,
+    WIDTH,
+    lineEndpoints,
+    paintPrepared,
+    polygonVertices,
+    preparePrimitive,
+    renderScene,
+    strokePath,
+)
+from framebuffer import Framebuffer, toRGBA
+from spatial import GridIndex
+
+TILE_SIZE = 256
+
+# The number of primitives rasterized by a worker process per task
+CHUNK_SIZE = 256
+
+
+def splitPrepared(prepared, width, height, tile_size=TILE_SIZE):
+    """
+    Splits a primitive rasterized by cg.preparePrimitive along the tiles of the image.
+
+    Spans crossing tile columns are cut at the tile borders, and pixels and
+    spans outside of the image are dropped. The pixels of every tile keep
+    their order, so overlapping anti-aliased pixels blend as in the whole
+    primitive.
+
+    Args:
+        prepared (tuple): The result of cg.preparePrimitive.
+        width (int): The width of the image.
+        height (int): The height of the image.
+        tile_size (int, optional): The side of the tiles. Defaults to TILE_SIZE.
+
+    Returns:
+        list: A list of (tile, prepared) pairs, where tile is the (column, row)
+        of a tile and prepared holds the part of the primitive in it, moved to
+        the tile's top-left corner. Tiles without pixels are skipped.
+    """
+    method, arrays, color = prepared
+    data = arrays[0].astype(np.int64)
+    if method == "fillSpans":
+        y = data[:, 0]
+        x_start = np.maximum(data[:, 1], 0)
+        x_end = np.minimum(data[:, 2], width - 1)
+        visible = (y >= 0) & (y < height) & (x_start <= x_end)
+        y, x_start, x_end = y[visible], x_start[visible], x_end[visible]
+
+        # One piece of every span for each tile column it crosses
+        first = x_start // tile_size
+        counts = x_end // tile_size - first + 1
+        span = np.repeat(np.arange(len(y)), counts)
+        column = (
+            first[span]
+            + np.arange(len(span))
+            - np.repeat(np.cumsum(counts) - counts, counts)
+        )
+        row = y[span] // tile_size
+        origin_x = column * tile_size
+        local = np.stack(
+            [
+                y[span] - row * tile_size,
+                np.maximum(x_start[span], origin_x) - origin_x,
+                np.minimum(x_end[span], origin_x + tile_size - 1) - origin_x,
+            ],
+            axis=1,
+        )
+        extras = ()
+    else:
+        x, y = data[:, 0], data[:, 1]
+        visible = (x >= 0) & (x < width) & (y >= 0) & (y < height)
+        data = data[visible]
+        column, row = data[:, 0] // tile_size, data[:, 1] // tile_size
+        local = data - np.stack([column, row], axis=1) * tile_size
+        extras = tuple(array[visible] for array in arrays[1:])
+
+    key = row * ((width + tile_size - 1) // tile_size) + column
+    order = np.argsort(key, kind="stable")
+    key, local = key[order], local[order].astype(np.int32)
+    extras = tuple(array[order] for array in extras)
+    bounds = np.flatnonzero(np.r_[True, key[1:] != key[:-1]]) if len(key) else []
+    ends = np.r_[bounds[1:], len(key)].astype(np.int64)
+    columns = (width + tile_size - 1) // tile_size
+    return [
+        (
+            divmod(int(key[a]), columns)[::-1],
+            (method, (local[a:b],) + tuple(array[a:b] for array in extras), color),
+        )
+        for a, b in zip(bounds, ends)
+    ]
+
+
+def _prepareChunk(job):
+    primitives, viewport, width, height, tile_size = job
+    tiles = {}
+    for primitive in primitives:
+        prepared = preparePrimitive(primitive, viewport)
+        for tile, part in splitPrepared(prepared, width, height, tile_size):
+            tiles.setdefault(tile, []).append(part)
+    return tiles
+
+
+def _paintTile(job):
+    width, height, background, parts = job
+    framebuffer = Framebuffer(width, height, background)
+    for prepared in parts:
+        paintPrepared(framebuffer, prepared)
+    return framebuffer.pixels
+
+
+def renderSceneTiled(scene, tile_size=TILE_SIZE, jobs=None, threads=False):
+    """
+    Renders a scene in parallel.
+
+    Every worker rasterizes a chunk of primitives and splits them along the
+    tiles of the image. The tiles are then painted by the workers into
+    framebuffers of their own, and only their pixels are sent back and
+    copied into the image. With a single job the scene is rendered serially.
+
+    Args:
+        scene (dict): The scene to render.
+        tile_size (int, optional): The side of the tiles. Defaults to TILE_SIZE.
+        jobs (int, optional): The number of workers. Defaults to the number of CPUs.
+        threads (bool, optional): Use threads instead of processes, which avoids
+            starting processes for small scenes. Defaults to False.
+
+    Returns:
+        Framebuffer: The rendered image, identical to the one of cg.renderScene.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1:
+        return renderScene(scene)
+
+    width, height = scene.get("width", WIDTH), scene.get("height", HEIGHT)
+    background = scene.get("background", "white")
+    primitives = scene.get("primitives", [])
+    viewport = scene.get("viewport")
+
+    chunks = [
+        (primitives[i : i + CHUNK_SIZE], viewport, width, height, tile_size)
+        for i in range(0, len(primitives), CHUNK_SIZE)
+    ]
+    framebuffer = Framebuffer(width, height, background)
+    executor_class = ThreadPoolExecutor if threads else ProcessPoolExecutor
+    with executor_class(jobs) as executor:
+        # The chunks come back in scene order, so every tile keeps the painting order
+        tiles = {}
+        for chunk in executor.map(_prepareChunk, chunks):
+            for tile, parts in chunk.items():
+                tiles.setdefault(tile, []).extend(parts)
+
+        rects = []
+        for column, row in tiles:
+            x0, y0 = column * tile_size, row * tile_size
+            rects.append(
+                (x0, y0, min(x0 + tile_size, width), min(y0 + tile_size, height))
+            )
+        tile_jobs = [
+            (x1 - x0, y1 - y0, background, parts)
+            for (x0, y0, x1, y1), parts in zip(rects, tiles.values())
+        ]
+        for (x0, y0, x1, y1), pixels in zip(rects, executor.map(_paintTile, tile_jobs)):
+            framebuffer.pixels[y0:y1, x0:x1] = pixels
+    framebuffer.markDirty(0, 0, width, height)
+    return framebuffer
+
+
+# Out-of-Core Rendering
+
+
+class MemmapImage:
+    """
+    An RGB image stored in a binary PPM file and written through memory maps.
+
+    The file holds the PPM header followed by the rows of pixels, so it is
+    a valid image as soon as it is created. Every write maps only the rows
+    it touches and releases them afterwards, so images far larger than the
+    memory can be written one tile at a time.
+    """
+
+    def __init__(self, path, width, height):
+        self.path = path
+        self.width = width
+        self.height = height
+        header = b"P6\n%d %d\n255\n" % (width, height)
+        self.offset = len(header)
+        with open(path, "wb") as f:
+            f.write(header)
+            f.truncate(self.offset + width * height * 3)
+
+    def rows(self, y0, y1):
+        """
+        Maps a band of rows of the image.
+
+        Args:
+            y0 (int): The first row.
+            y1 (int): The row after the last one.
+
+        Returns:
+            numpy.memmap: The (y1 - y0, width, 3) uint8 pixels of the rows.
+        """
+        return np.memmap(
+            self.path,
+            dtype=np.uint8,
+            mode="r+",
+            offset=self.offset + y0 * self.width * 3,
+            shape=(y1 - y0, self.width, 3),
+        )
+
+    def write(self, framebuffer, x0, y0):
+        """
+        Copies a framebuffer into the image, its top-left pixel at (x0, y0).
+
+        Args:
+            framebuffer (Framebuffer): The framebuffer to copy. Its alpha channel is ignored.
+            x0 (int): The x-coordinate of the framebuffer in the image.
+            y0 (int): The y-coordinate of the framebuffer in the image.
+        """
+        band = self.rows(y0, y0 + framebuffer.height)
+        band[:, x0 : x0 + framebuffer.width] = framebuffer.pixels[..., :3]
+        # Unmapping leaves the written pages to the page cache, which writes them back
+        del band
+
+
+def primitiveBounds(primitive, viewport=None):
+    """
+    Computes a bounding box of a scene primitive without rasterizing it.
+
+    The box is conservative: it holds every pixel the primitive can write,
+    including anti-aliased fringes and the caps and joins of strokes.
+
+    Args:
+        primitive (dict): A primitive of a scene.
+        viewport (tuple, optional): The viewport (x_min, y_min, x_max, y_max) used by clipped primitives.
+
+    Returns:
+        tuple: The half-open box (x_min, y_min, x_max, y_max).
+    """
+    kind = primitive.get("type", "line")
+    margin = 1
+    if kind == "circle":
+        r = int(primitive["radius"])
+        points = np.asarray(primitive["center"], dtype=np.float64) + [[-r, -r], [r, r]]
+    elif kind == "ellipse":
+        a, b = (int(v) for v in primitive["axes"])
+        points = np.asarray(primitive["center"], dtype=np.float64) + [[-a, -b], [a, b]]
+    elif kind == "polygon":
+        points = np.asarray(primitive["points"], dtype=np.float64).reshape(-1, 2)
+    elif kind in STROKED:
+        points = strokePath(primitive, viewport)[0]
+        if primitive.get("width", 1) > 1:
+            margin += int(np.ceil(primitive["width"] * MITER_LIMIT / 2))
+    else:
+        raise ValueError("Unknown primitive type: %r" % kind)
+    if not len(points):
+        return 0, 0, 0, 0
+    x_min, y_min = np.floor(points.min(axis=0)).astype(np.int64) - margin
+    x_max, y_max = np.ceil(points.max(axis=0)).astype(np.int64) + margin + 1
+    return int(x_min), int(y_min), int(x_max), int(y_max)
+
+
+def _pathSegments(vertices, closed):
+    """
+    Splits a path into the integer segments polylineBatch rasterizes.
+
+    Args:
+        vertices (array_like): The (N, 2) vertices of the path.
+        closed (bool): Whether the last vertex is joined to the first.
+
+    Returns:
+        numpy.ndarray: The (K, 4) int64 segments between the rounded vertices.
+    """
+    vertices = np.rint(np.asarray(vertices, dtype=np.float64).reshape(-1, 2))
+    following = np.roll(vertices, -1, axis=0)
+    if not closed and len(vertices) > 1:
+        vertices, following = vertices[:-1], following[:-1]
+    return np.hstack([vertices, following]).astype(np.int64)
+
+
+def _thinSegments(primitive, viewport=None):
+    """
+    Returns the segments of a primitive drawn with one-pixel Bresenham lines.
+
+    Lines, the outlines of polygons, and polylines and curves no wider than
+    a pixel are drawn segment by segment with Bresenham's algorithm. The
+    pixels their segments share have the same color, so drawing the
+    segments independently gives the same image.
+
+    Args:
+        primitive (dict): A primitive of a scene.
+        viewport (tuple, optional): The viewport (x_min, y_min, x_max, y_max) used by clipped primitives.
+
+    Returns:
+        numpy.ndarray: The (K, 4) int64 segments, or None if the primitive is drawn otherwise.
+    """
+    kind = primitive.get("type", "line")
+    if kind == "polygon":
+        if primitive.get("fill", False):
+            return None
+        return _pathSegments(polygonVertices(primitive, viewport), True)
+    if kind not in STROKED or primitive.get("width", 1) > 1:
+        return None
+    if primitive.get("algorithm", "bresenham") != "bresenham":
+        return None
+    if kind == "line":
+        endpoints = lineEndpoints(primitive, viewport)
+        return np.array([endpoints] if endpoints else [], np.int64).reshape(-1, 4)
+    vertices, closed = strokePath(primitive, viewport)
+    return _pathSegments(vertices, closed)
+
+
+def _prepareByRow(primitive, viewport=None):
+    """
+    Rasterizes a primitive with cg.preparePrimitive, its spans or pixels sorted by row.
+
+    The sort is stable, so pixels blended more than once keep their order.
+
+    Args:
+        primitive (dict): A primitive of a scene.
+        viewport (tuple, optional): The viewport (x_min, y_min, x_max, y_max) used by clipped primitives.
+
+    Returns:
+        tuple: A tuple (prepared, rows) with the sorted result of
+        cg.preparePrimitive and the (M,) sorted row of every span or pixel.
+    """
+    method, arrays, color = preparePrimitive(primitive, viewport)
+    rows = arrays[0][:, 0 if method == "fillSpans" else 1]
+    order = np.argsort(rows, kind="stable")
+    return (method, tuple(array[order] for array in arrays), color), rows[order]
+
+
+def _rowsOf(prepared, rows, y0, y1):
+    """
+    Selects the spans or pixels of a primitive sorted by _prepareByRow in a band of rows.
+
+    Args:
+        prepared (tuple): The sorted result of cg.preparePrimitive.
+        rows (numpy.ndarray): The sorted row of every span or pixel.
+        y0 (int): The first row of the band.
+        y1 (int): The row after the last one.
+
+    Returns:
+        tuple: The part of the primitive in the band, or None if it has none there.
+    """
+    first, last = np.searchsorted(rows, [y0, y1])
+    if first == last:
+        return None
+    method, arrays, color = prepared
+    return method, tuple(array[first:last] for array in arrays), color
+
+
+def _translatePrepared(prepared, dx, dy):
+    """
+    Moves a primitive rasterized by cg.preparePrimitive.
+
+    Args:
+        prepared (tuple): The result of cg.preparePrimitive.
+        dx (int): The translation along x.
+        dy (int): The translation along y.
+
+    Returns:
+        tuple: The moved primitive.
+    """
+    method, arrays, color = prepared
+    if method == "fillSpans":
+        moved = arrays[0] + np.array([dy, dx, dx], dtype=np.int32)
+    else:
+        moved = arrays[0] + np.array([dx, dy], dtype=np.int32)
+    return method, (moved,) + arrays[1:], color
+
+
+def _paintLines(framebuffer, tile, segments, colors):
+    """
+    Paints the part of a run of Bresenham lines that falls in a tile.
+
+    The lines are clipped to the tile grown by one pixel with Liang-Barsky.
+    Every pixel of a line is within half a pixel of the line, so the clipped
+    line reaches every pixel of the line in the tile, and only that run of
+    pixels of the whole line is rasterized. Cohen-Sutherland is not used
+    because it truncates the clipped endpoints to integers.
+
+    Args:
+        framebuffer (Framebuffer): The framebuffer of the tile.
+        tile (tuple): The half-open rectangle (x0, y0, x1, y1) of the tile in the image.
+        segments (numpy.ndarray): The (N, 4) int64 endpoints of the lines.
+        colors (numpy.ndarray): The (N, 4) uint8 colors of the lines.
+    """
+    x0, y0, x1, y1 = tile
+    clipped, accept = liangBarskyClipBatch(segments, x0 - 1, y0 - 1, x1, y1)
+    segments, clipped, colors = segments[accept], clipped[accept], colors[accept]
+    if not len(segments):
+        return
+
+    # The pixels of a line are numbered along its major axis
+    dx = segments[:, 2] - segments[:, 0]
+    dy = segments[:, 3] - segments[:, 1]
+    x_major = np.abs(dx) > np.abs(dy)
+    major = np.where(x_major, np.abs(dx), np.abs(dy))
+    axis = np.where(x_major, 0, 1)
+    rows = np.arange(len(segments))
+    start = segments[rows, axis]
+    k_a = np.abs(clipped[rows, axis] - start)
+    k_b = np.abs(clipped[rows, axis + 2] - start)
+    first = np.clip(np.floor(np.minimum(k_a, k_b)), 0, major).astype(np.int64)
+    last = np.clip(np.ceil(np.maximum(k_a, k_b)), 0, major).astype(np.int64)
+
+    pixels, offsets = bresenhamRangeBatch(segments, first, last - first + 1)
+    pixels -= np.array([x0, y0], dtype=np.int32)
+    framebuffer.plotColors(pixels, np.repeat(colors, np.diff(offsets), axis=0))
+
+
+def renderSceneToFile(scene, path, tile_size=TILE_SIZE, jobs=1):
+    """
+    Renders a scene tile by tile into a memory-mapped PPM file.
+
+    The primitives are binned into the tiles their bounding boxes overlap,
+    and every primitive is rasterized at most once. Lines, polygon outlines,
+    and thin polylines and curves drawn with Bresenham's algorithm are split
+    into segments, and runs of them are clipped to each tile with
+    Liang-Barsky so that only their pixels in the tile are rasterized. Other
+    primitives are rasterized by the first band of tiles they overlap, with
+    their spans or pixels sorted by row, and every tile paints its rows of
+    them. They are released after the last band they overlap, so the memory
+    used is bounded by the tile size, the number of jobs and the primitives
+    crossing a band rather than by the image size. The image is identical
+    to the one of cg.renderScene.
+
+    Args:
+        scene (dict): The scene to render.
+        path (str): The path of the PPM file to write.
+        tile_size (int, optional): The side of the tiles. Defaults to TILE_SIZE.
+        jobs (int, optional): The number of primitives rasterized and tiles painted
+            at once by a pool of threads. Defaults to 1.
+
+    Returns:
+        str: The path of the written image.
+    """
+    width, height = scene.get("width", WIDTH), scene.get("height", HEIGHT)
+    background = scene.get("background", "white")
+    primitives = scene.get("primitives", [])
+    viewport = scene.get("viewport")
+
+    # Thin lines and paths keep their segments and color for the batch path
+    lines = {}
+    index = GridIndex(cell_size=tile_size)
+    for i, primitive in enumerate(primitives):
+        segments = _thinSegments(primitive, viewport)
+        if segments is None:
+            index.insert(i, primitiveBounds(primitive, viewport))
+            continue
+        if not len(segments):
+            continue
+        lines[i] = segments, toRGBA(primitive.get("color", "black"))
+        points = segments.reshape(-1, 2)
+        x_min, y_min = points.min(axis=0).tolist()
+        x_max, y_max = points.max(axis=0).tolist()
+        index.insert(i, (x_min, y_min, x_max + 1, y_max + 1))
+
+    image = MemmapImage(path, width, height)
+    prepared = {}
+
+    def paintTile(tile):
+        x0, y0, x1, y1 = tile
+        framebuffer = Framebuffer(x1 - x0, y1 - y0, background)
+        indices = sorted(index.queryRect(*tile))
+        start = 0
+        while start < len(indices):
+            if indices[start] in lines:
+                end = start
+                while end < len(indices) and indices[end] in lines:
+                    end += 1
+                run = [lines[i] for i in indices[start:end]]
+                segments = np.concatenate([segments for segments, _ in run])
+                colors = np.concatenate(
+                    [np.tile(color, (len(segments), 1)) for segments, color in run]
+                ).astype(np.uint8)
+                _paintLines(framebuffer, tile, segments, colors)
+                start = end
+                continue
+
+            part = _rowsOf(*prepared[indices[start]], y0, y1)
+            if part is not None:
+                paintPrepared(framebuffer, _translatePrepared(part, -x0, -y0))
+            start += 1
+        image.write(framebuffer, x0, y0)
+
+    with ThreadPoolExecutor(jobs) as executor:
+        for y0 in range(0, height, tile_size):
+            y1 = min(y0 + tile_size, height)
+            overlapping = index.queryRect(0, y0, width, y1)
+            new = sorted(i for i in overlapping - prepared.keys() if i not in lines)
+            results = executor.map(
+                lambda i: _prepareByRow(primitives[i], viewport), new
+            )
+            prepared.update(zip(new, results))
+
+            tiles = [
+                (x0, y0, min(x0 + tile_size, width), y1)
+                for x0 in range(0, width, tile_size)
+            ]
+            list(executor.map(paintTile, tiles))
+
+            # Primitives that end in this band are not needed anymore
+            for i in [i for i in prepared if index.bboxes[i][3] <= y1]:
+                del prepared[i]
+    return path
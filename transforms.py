@@ -0,0 +1,147 @@
+import numpy as np
+
+from algorithms import (
+    rotationMatrix,
+    scaleMatrix,
+    shearMatrix,
+    transformPoints,
+    translationMatrix,
+)
+
+
+class TransformStack:
+    """
+    A stack of 3x3 transformation matrices with a cached composition.
+
+    Matrices are applied in the order they were pushed. The composition of
+    every prefix of the stack is cached, so pushing only composes the new
+    matrix once and popping never recomputes anything. Applying the stack to
+    any number of points costs a single matmul.
+    """
+
+    def __init__(self):
+        self._matrices = []
+        self._composed = [np.eye(3)]
+
+    def __len__(self):
+        return len(self._matrices)
+
+    def push(self, matrix, pivot=None):
+        """
+        Pushes a 3x3 transformation matrix onto the stack.
+
+        Args:
+            matrix (array_like): The 3x3 transformation matrix.
+            pivot (tuple, optional): A point (x, y) the matrix is applied around. Defaults to the origin.
+
+        Returns:
+            TransformStack: The stack itself, to allow chaining.
+        """
+        matrix = np.array(matrix, dtype=np.float64)
+        if matrix.shape != (3, 3):
+            raise ValueError("matrix must be 3x3, got %s" % (matrix.shape,))
+        if pivot is not None:
+            px, py = pivot
+            matrix = translationMatrix(px, py) @ matrix @ translationMatrix(-px, -py)
+        self._matrices.append(matrix)
+        return self
+
+    def pop(self):
+        """
+        Removes the last matrix pushed onto the stack.
+
+        Returns:
+            numpy.ndarray: The removed 3x3 matrix.
+        """
+        matrix = self._matrices.pop()
+        del self._composed[len(self._matrices) + 1 :]
+        return matrix
+
+    def clear(self):
+        """
+        Removes every matrix from the stack.
+        """
+        self._matrices = []
+        self._composed = [np.eye(3)]
+
+    def translate(self, tx, ty):
+        """
+        Pushes a translation.
+
+        Args:
+            tx (float): The translation along the x-axis.
+            ty (float): The translation along the y-axis.
+
+        Returns:
+            TransformStack: The stack itself, to allow chaining.
+        """
+        return self.push(translationMatrix(tx, ty))
+
+    def rotate(self, angle, pivot=None):
+        """
+        Pushes a rotation.
+
+        Args:
+            angle (float): The angle of rotation in degrees.
+            pivot (tuple, optional): The center of rotation (x, y). Defaults to the origin.
+
+        Returns:
+            TransformStack: The stack itself, to allow chaining.
+        """
+        return self.push(rotationMatrix(float(angle)), pivot)
+
+    def scale(self, sx, sy=None, pivot=None):
+        """
+        Pushes a scaling.
+
+        Args:
+            sx (float): The scale factor along the x-axis.
+            sy (float, optional): The scale factor along the y-axis. Defaults to sx.
+            pivot (tuple, optional): The fixed point of the scaling (x, y). Defaults to the origin.
+
+        Returns:
+            TransformStack: The stack itself, to allow chaining.
+        """
+        return self.push(scaleMatrix(sx, sy), pivot)
+
+    def shear(self, shx, shy=0.0, pivot=None):
+        """
+        Pushes a shearing.
+
+        Args:
+            shx (float): The shear factor of x along y.
+            shy (float, optional): The shear factor of y along x. Defaults to 0.
+            pivot (tuple, optional): The fixed point of the shearing (x, y). Defaults to the origin.
+
+        Returns:
+            TransformStack: The stack itself, to allow chaining.
+        """
+        return self.push(shearMatrix(shx, shy), pivot)
+
+    @property
+    def matrix(self):
+        """
+        The composition of every matrix on the stack.
+
+        Only the matrices pushed since the last access are composed.
+
+        Returns:
+            numpy.ndarray: The composed 3x3 matrix.
+        """
+        for matrix in self._matrices[len(self._composed) - 1 :]:
+            self._composed.append(matrix @ self._composed[-1])
+        return self._composed[-1]
+
+    def apply(self, points, out=None, dtype=None):
+        """
+        Transforms an array of points by the composed matrix.
+
+        Args:
+            points (array_like): An (N, 2) or (N, 3) array of points.
+            out (numpy.ndarray, optional): An array of the result's shape to write into.
+            dtype (numpy.dtype, optional): The dtype of the computation, e.g. numpy.float32.
+
+        Returns:
+            numpy.ndarray: The transformed points.
+        """
+        return transformPoints(points, self.matrix, out=out, dtype=dtype)
@@ -1,7 +1,15 @@
+import time
+from functools import wraps
 from tkinter import *
-from tkinter import messagebox
+from tkinter import filedialog, messagebox
 
 from algorithms import *
+from framebuffer import Framebuffer
+from profiler import Profiler
+from rastercache import RasterCache
+from scene import Scene
+from scheduler import RenderScheduler
+from transforms import TransformStack
 import numpy as np
 
 PIXEL_SIZE = 1
@@ -9,11 +17,39 @@ WIDTH = 800
 HEIGHT = 600
 
 
+def profiled(handler):
+    """
+    Records a profiler frame around a MainWindow handler and refreshes the overlay.
+
+    Args:
+        handler (callable): The handler method.
+
+    Returns:
+        callable: The wrapped handler.
+    """
+
+    @wraps(handler)
+    def wrapper(self, *args):
+        with self.profiler.frame(handler.__name__):
+            result = handler(self, *args)
+            self.profiler.record("items", len(self.canvas.find_all()))
+        self.showProfile()
+        return result
+
+    return wrapper
+
+
 class MainWindow(Frame):
     def __init__(self, master=None):
         Frame.__init__(self, master)
         self.grid()
         self.setting_viewport = False
+        self.scene = Scene(cache=RasterCache())
+        self.profiler = Profiler()
+        self.scheduler = RenderScheduler(self)
+        self.show_profile = True
+        self.transform_stacks = {}
+        self.setCurrentLine(None)
         self.create_widgets()
 
     def create_widgets(self):
@@ -32,6 +68,13 @@ class MainWindow(Frame):
         self.canvas = Canvas(self, width=WIDTH, height=HEIGHT, bg="white")
         self.canvas.grid(row=0, column=0, columnspan=4, padx=10, pady=10)
         self.canvas.bind("<Button-1>", self.on_canvas_click)
+        self.canvas.bind("<Button-3>", self.on_canvas_pick)
+
+        # Framebuffer displayed as a single image on the canvas
+        self.framebuffer = Framebuffer(WIDTH, HEIGHT, background="white")
+        self.photo = PhotoImage(width=WIDTH, height=HEIGHT)
+        self.canvas.create_image(0, 0, image=self.photo, anchor=NW)
+        self.framebuffer.present(self.photo)
 
         # Viewport
         self.vx0_var = IntVar()
@@ -192,6 +235,12 @@ class MainWindow(Frame):
         )
         self.clear_button.grid(row=7, column=2)
 
+        # Wu Anti-Aliased Line Button
+        self.wu_button = Button(
+            self, text="Show Wu Line", command=self.showWu, bd=5, width=20
+        )
+        self.wu_button.grid(row=8, column=2)
+
         # Translation Button
         self.translation_button = Button(
             self,
@@ -226,12 +275,23 @@ class MainWindow(Frame):
         self.radius_label.grid(row=5, column=3)
         self.radius_entry.grid(row=6, column=3)
 
+        # Profiling Buttons
+        self.profile_button = Button(
+            self, text="Toggle Profiler", command=self.toggleProfile, bd=5, width=20
+        )
+        self.profile_button.grid(row=7, column=3)
+        self.trace_button = Button(
+            self, text="Save Trace", command=self.saveTrace, bd=5, width=20
+        )
+        self.trace_button.grid(row=8, column=3)
+
         # Display greeting message
         messagebox.showinfo(
             "Welcome",
-            "Welcome to the Computer Graphics Showcase!\n\nClick on the canvas to set the line's coordinates or the viewport's corners.\n\nUse the buttons to display the line, circle, or to perform transformations.",
+            "Welcome to the Computer Graphics Showcase!\n\nClick on the canvas to set the line's coordinates or the viewport's corners. Right click a line to select it for transformations.\n\nUse the buttons to display the line, circle, or to perform transformations.",
         )
 
+    @profiled
     def rotate(self):
         """
         Performs a geometric transformation on the line.
@@ -246,39 +306,16 @@ class MainWindow(Frame):
             None
         """
         try:
-            x0, y0, x1, y1 = self.getPoints()
-
-            # offset to origin
-            x0t, y0t, x1t, y1t = offsetToOrigin(x0, y0, x1, y1)
-
             # fetch rotation angle
             angle = float(self.angle_var.get())
 
-            # rotate
-            x0t, y0t, x1t, y1t = rotateWithAngle(x0t, y0t, x1t, y1t, angle)
-
-            # translate back to original position
-            x0t, y0t, x1t, y1t = offsetFromOrigin(x0t, y0t, x1t, y1t, x0, y0)
-
-            # set new points
-            self.x0_var.set(x0t)
-            self.y0_var.set(y0t)
-            self.x1_var.set(x1t)
-            self.y1_var.set(y1t)
-
-            # clear canvas
-            self.canvas.delete("all")
-
-            pixels = bresenham(x0t, y0t, x1t, y1t)
-            for pixel in pixels:
-                x, y = pixel
-                self.canvas.create_rectangle(
-                    x, y, x + PIXEL_SIZE, y + PIXEL_SIZE, fill="green"
-                )
+            # rotate around the line's first point
+            self.transformCurrentLine(rotationMatrix(angle))
 
         except Exception as e:
             messagebox.showerror("Error", str(e))
 
+    @profiled
     def transform(self):
         """
         Performs a geometric transformation on the line.
@@ -293,33 +330,10 @@ class MainWindow(Frame):
             None
         """
         try:
-            x0, y0, x1, y1 = self.getPoints()
             transformation_matrix = self.getTransformationMatrix()
 
-            # offset to origin
-            x0t, y0t, x1t, y1t = offsetToOrigin(x0, y0, x1, y1)
-
-            # transform
-            x0t, y0t, x1t, y1t = transform(x0t, y0t, x1t, y1t, transformation_matrix)
-
-            # translate back to original position
-            x0t, y0t, x1t, y1t = offsetFromOrigin(x0t, y0t, x1t, y1t, x0, y0)
-
-            # set new points
-            self.x0_var.set(x0t)
-            self.y0_var.set(y0t)
-            self.x1_var.set(x1t)
-            self.y1_var.set(y1t)
-
-            # clear canvas
-            self.canvas.delete("all")
-
-            pixels = bresenham(x0t, y0t, x1t, y1t)
-            for pixel in pixels:
-                x, y = pixel
-                self.canvas.create_rectangle(
-                    x, y, x + PIXEL_SIZE, y + PIXEL_SIZE, fill="green"
-                )
+            # transform around the line's first point
+            self.transformCurrentLine(transformation_matrix)
 
         except Exception as e:
             messagebox.showerror("Error", str(e))
@@ -340,12 +354,8 @@ class MainWindow(Frame):
         """
         try:
             x0, y0, x1, y1 = self.getPoints()
-            pixels = bresenham(x0, y0, x1, y1)
-            for pixel in pixels:
-                x, y = pixel
-                self.canvas.create_rectangle(
-                    x, y, x + PIXEL_SIZE, y + PIXEL_SIZE, fill="black"
-                )
+            self.setCurrentLine(self.scene.addLine(x0, y0, x1, y1, color="black"))
+            self.redraw()
         except Exception as e:
             messagebox.showerror("Error", str(e))
 
@@ -362,12 +372,30 @@ class MainWindow(Frame):
         """
         try:
             x0, y0, x1, y1 = self.getPoints()
-            pixels = dda(x0, y0, x1, y1)
-            for pixel in pixels:
-                x, y = pixel
-                self.canvas.create_rectangle(
-                    x, y, x + PIXEL_SIZE, y + PIXEL_SIZE, fill="blue", outline="blue"
-                )
+            self.setCurrentLine(
+                self.scene.addLine(x0, y0, x1, y1, color="blue", algorithm="dda")
+            )
+            self.redraw()
+        except Exception as e:
+            messagebox.showerror("Error", str(e))
+
+    def showWu(self):
+        """
+        Draws an anti-aliased line using Xiaolin Wu's algorithm.
+
+        This method computes the pixels along the line together with how much
+        of each pixel the line covers, and blends the line's color into the
+        canvas in proportion to that coverage.
+
+        Returns:
+            None
+        """
+        try:
+            x0, y0, x1, y1 = self.getPoints()
+            self.setCurrentLine(
+                self.scene.addLine(x0, y0, x1, y1, color="black", algorithm="wu")
+            )
+            self.redraw()
         except Exception as e:
             messagebox.showerror("Error", str(e))
 
@@ -384,12 +412,8 @@ class MainWindow(Frame):
         """
         try:
             x_center, y_center, r = self.getCircleParameters()
-            pixels = bresenhamCircle(x_center, y_center, r)
-            for pixel in pixels:
-                x, y = pixel
-                self.canvas.create_rectangle(
-                    x, y, x + PIXEL_SIZE, y + PIXEL_SIZE, fill="green", outline="green"
-                )
+            self.scene.addCircle(x_center, y_center, r, color="green")
+            self.redraw()
         except Exception as e:
             messagebox.showerror("Error", str(e))
 
@@ -450,6 +474,7 @@ class MainWindow(Frame):
         vy1 = int(self.vy1_var.get())
         return vx0, vy0, vx1, vy1
 
+    @profiled
     def displayBresenhamCut(self):
         """
         Clips a line using the Cohen-Sutherland algorithm.
@@ -464,20 +489,14 @@ class MainWindow(Frame):
         try:
             x0, y0, x1, y1 = self.getPoints()
             vx0, vy0, vx1, vy1 = self.getViewport()
-            x0, y0, x1, y1 = cohenSutherlandClip(x0, y0, x1, y1, vx0, vy0, vx1, vy1)
-            pixels = bresenham(x0, y0, x1, y1)
-
-            # clear canvas
-            self.canvas.delete("all")
-
-            for pixel in pixels:
-                x, y = pixel
-                self.canvas.create_rectangle(
-                    x, y, x + PIXEL_SIZE, y + PIXEL_SIZE, fill="red"
-                )
+            with self.profiler.stage("clip"):
+                x0, y0, x1, y1 = cohenSutherlandClip(x0, y0, x1, y1, vx0, vy0, vx1, vy1)
+            self.scene.addLine(x0, y0, x1, y1, color="red")
+            self.redraw()
         except Exception as e:
             messagebox.showerror("Error", str(e))
 
+    @profiled
     def displayLiangBarskyCut(self):
         """
         Clips a line using the Liang-Barsky algorithm.
@@ -492,22 +511,16 @@ class MainWindow(Frame):
         try:
             x0, y0, x1, y1 = self.getPoints()
             vx0, vy0, vx1, vy1 = self.getViewport()
-            result = liangBarskyClip(x0, y0, x1, y1, vx0, vy0, vx1, vy1)
+            with self.profiler.stage("clip"):
+                result = liangBarskyClip(x0, y0, x1, y1, vx0, vy0, vx1, vy1)
             if result != None:
                 x0, y0, x1, y1 = result
             # if result is none, throw exception
             else:
                 raise Exception("Line is outside the viewport")
 
-            # clear canvas
-            self.canvas.delete("all")
-
-            pixels = bresenham(x0, y0, x1, y1)
-            for pixel in pixels:
-                x, y = pixel
-                self.canvas.create_rectangle(
-                    x, y, x + PIXEL_SIZE, y + PIXEL_SIZE, fill="red"
-                )
+            self.scene.addLine(x0, y0, x1, y1, color="red")
+            self.redraw()
         except Exception as e:
             messagebox.showerror("Error", str(e))
 
@@ -561,6 +574,25 @@ class MainWindow(Frame):
             self.x1_var.set(0)
             self.y1_var.set(0)
 
+    def on_canvas_pick(self, event):
+        """
+        Handle the right click event on the canvas.
+
+        Finds the topmost primitive drawn under the click with the scene's
+        spatial index. If it is a line, it becomes the target of the
+        transformations and its coordinates are loaded into the entries.
+        """
+        id = self.scene.pick(event.x, event.y)
+        if id is None or self.scene[id].kind != "line":
+            return
+
+        self.setCurrentLine(id)
+        x0, y0, x1, y1 = self.getLinePoints(id)
+        self.x0_var.set(x0)
+        self.y0_var.set(y0)
+        self.x1_var.set(x1)
+        self.y1_var.set(y1)
+
     def setViewport(self):
         """
         Toggles the viewport setting mode.
@@ -583,8 +615,198 @@ class MainWindow(Frame):
                 "Click on the canvas to set the top-left and bottom-right corners of the viewport.\n\nClick the 'Set Viewport' button again to cancel.",
             )
 
+    def setCurrentLine(self, id):
+        """
+        Makes a line of the scene the target of the transformations.
+
+        Every line keeps its own TransformStack, so picking a line again
+        resumes its transformations.
+
+        Args:
+            id (int): The id of the line in the scene.
+
+        Returns:
+            None
+        """
+        self.current_line = id
+        self.current_transforms = self.transform_stacks.setdefault(id, TransformStack())
+
+    def transformCurrentLine(self, transformation_matrix):
+        """
+        Transforms the last drawn line around its first point and redraws it in green.
+
+        The transformations are accumulated in a TransformStack applied to the
+        line's original float coordinates, so chained operations do not lose
+        precision. The coordinate entries show the rounded result. If they no
+        longer match the current line, a new line is started from them.
+
+        Args:
+            transformation_matrix (numpy.ndarray): The 3x3 transformation matrix.
+
+        Returns:
+            None
+        """
+        points = self.getPoints()
+        if self.current_line not in self.scene or points != self.getLinePoints(
+            self.current_line
+        ):
+            self.setCurrentLine(self.scene.addLine(*points, color="green"))
+
+        with self.profiler.stage("transform"):
+            (x, y), _ = self.scene[self.current_line].points()
+            self.current_transforms.push(transformation_matrix, pivot=(x, y))
+            self.scene.update(
+                self.current_line,
+                color="green",
+                transform=self.current_transforms.matrix,
+            )
+
+        # set new points
+        x0t, y0t, x1t, y1t = self.getLinePoints(self.current_line)
+        self.x0_var.set(x0t)
+        self.y0_var.set(y0t)
+        self.x1_var.set(x1t)
+        self.y1_var.set(y1t)
+
+        self.redraw()
+
+    def getLinePoints(self, id):
+        """
+        Get the rounded coordinates of a line of the scene.
+
+        Args:
+            id (int): The id of the line in the scene.
+
+        Returns:
+            tuple: A tuple containing the x and y coordinates of two points in the following order: x0, y0, x1, y1.
+        """
+        (x0, y0), (x1, y1) = np.rint(self.scene[id].points()).astype(int).tolist()
+        return x0, y0, x1, y1
+
+    def redraw(self):
+        """
+        Repaints the parts of the scene that changed since the last redraw.
+
+        Only the damaged regions are repainted into the framebuffer, from the
+        cached rasterization of each primitive, and only the changed region is
+        uploaded to the canvas image.
+
+        With a scheduler, the primitives are rasterized on a background thread
+        and the regions are painted and shown a few at a time from the event
+        loop, so the window stays responsive. A redraw requested before the
+        previous one finished supersedes it.
+
+        Returns:
+            None
+        """
+        if self.scheduler is None:
+            with self.profiler.frame("render"):
+                self.scene.render(self.framebuffer, PIXEL_SIZE, self.profiler)
+                with self.profiler.stage("paint"):
+                    self.framebuffer.present(self.photo)
+                self.profiler.record("items", len(self.canvas.find_all()))
+            self.showProfile()
+            return
+
+        primitives = self.scene.unrasterized()
+
+        def rasterize():
+            # The profiler is only used on the Tk thread, so the time is handed back
+            start = time.perf_counter()
+            self.scene.rasterize(primitives)
+            return primitives, time.perf_counter() - start
+
+        self.scheduler.submit(
+            "redraw",
+            rasterize,
+            self.paintDamage,
+            error=lambda e: messagebox.showerror("Error", str(e)),
+        )
+
+    def paintDamage(self, result):
+        """
+        Paints the damaged regions of the scene one at a time.
+
+        The background rasterization time is added to the first region's frame.
+
+        Args:
+            result (tuple): The primitives rasterized in the background and
+                the time it took in seconds.
+
+        Yields:
+            None: After each region is painted and uploaded to the canvas.
+        """
+        primitives, rasterize_time = result
+        self.scene.adopt(primitives)
+        while self.scene.damage:
+            region = self.scene.damage.pop(0)
+            with self.profiler.frame("render"):
+                self.profiler.add("rasterize_ms", rasterize_time * 1000)
+                rasterize_time = 0.0
+                self.scene.renderRegion(
+                    self.framebuffer, region, PIXEL_SIZE, self.profiler
+                )
+                with self.profiler.stage("paint"):
+                    self.framebuffer.present(self.photo)
+                self.profiler.record("items", len(self.canvas.find_all()))
+            yield
+        self.showProfile()
+
     def clear(self):
         """
-        Clears the canvas by deleting all items.
+        Clears the canvas by removing every primitive from the scene.
+        """
+        self.scene.clear()
+        self.transform_stacks = {}
+        self.setCurrentLine(None)
+        self.redraw()
+
+    def showProfile(self):
+        """
+        Draws the timings of the last profiled frame in the canvas' top-left corner.
+
+        The overlay shows the time spent in each stage, the number of pixels
+        painted and the number of items on the canvas.
+
+        Returns:
+            None
+        """
+        self.canvas.delete("profile")
+        if self.show_profile:
+            self.canvas.create_text(
+                5,
+                5,
+                anchor=NW,
+                text=self.profiler.summary(),
+                fill="gray",
+                font=("TkFixedFont", 8),
+                tags="profile",
+            )
+
+    def toggleProfile(self):
+        """
+        Shows or hides the profiling overlay.
+
+        Returns:
+            None
+        """
+        self.show_profile = not self.show_profile
+        self.showProfile()
+
+    def saveTrace(self):
+        """
+        Writes the recorded profiler frames to a CSV or JSON trace file.
+
+        Returns:
+            None
         """
-        self.canvas.delete("all")
+        path = filedialog.asksaveasfilename(
+            defaultextension=".csv",
+            filetypes=[("CSV trace", "*.csv"), ("JSON trace", "*.json")],
+        )
+        if not path:
+            return
+        try:
+            self.profiler.dump(path)
+        except Exception as e:
+            messagebox.showerror("Error", str(e))